@@ -1,29 +1,45 @@
 """
 API 依赖注入模块
 对齐 BACKEND_CONTEXT.md § 4.5 认证与权限
-- get_current_user: 从 Authorization 头解析 JWT 获取当前用户
-- require_permission: 细粒度权限检查 resource:action
+- get_current_user: 从 Authorization 头解析 JWT 获取当前用户 (Principal, 进程内 LRU + TTL 缓存)
+- require_permission: 细粒度权限检查 resource:action (查 permission_index, 支持 * 与 resource:*)
 """
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.principal import Principal, principal_cache
 from app.core.security import decode_access_token
-from app.db.session import get_db
+from app.core.tracing import span
+from app.db.session import LazySession, get_db
 from app.models.user import User
+from app.services.permission_index import permission_index
+from app.services.revocation import revocation_store
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
 async def get_current_user(
+    request: Request,
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
-    """从 JWT Token 中解析用户身份"""
+    db: Annotated[LazySession, Depends(get_db)],
+) -> Principal:
+    """
+    从 JWT Token 中解析用户身份
+    命中 principal_cache 时不访问数据库; 用户 / 角色变更通过 invalidation.bus 失效
+    吊销的令牌与禁用账号由 revocation_store 在内存中拒绝
+    """
+    with span("auth") as auth_span:
+        principal = await _authenticate(request, token, db)
+        if auth_span is not None:
+            auth_span.attrs["user"] = principal.id
+        return principal
+
+
+async def _authenticate(request: Request, token: str, db: LazySession) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭据",
@@ -36,14 +52,28 @@ async def get_current_user(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    # 已吊销令牌 / 已禁用账号 — 纯内存判定
+    if revocation_store.is_revoked(payload):
+        raise credentials_exception
+    # 供 get_read_db 判断读己之写
+    request.state.user_id = user_id
 
-    result = await db.execute(
-        select(User).where(User.id == user_id, User.is_deleted == False)
-    )
-    user = result.scalar_one_or_none()
-    if user is None:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    with span("auth.load_user"):
+        result = await db.execute(
+            select(User).where(User.id == user_id, User.is_deleted == False)
+        )
+        user = result.scalar_one_or_none()
+    if user is None or not user.is_active:
         raise credentials_exception
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(principal)
+    # 鉴权查询结束即归还连接, 不随后续 handler 逻辑一直占用
+    await db.release()
+    return principal
 
 
 def require_permission(permission_code: str):
@@ -52,10 +82,10 @@ def require_permission(permission_code: str):
     用法: Depends(require_permission('order:create'))
     admin 角色拥有所有权限
     """
-    async def _check(current_user: Annotated[User, Depends(get_current_user)]) -> User:
-        if current_user.role == "admin":
-            return current_user
-        if permission_code not in current_user.permission_list:
+    async def _check(current_user: Annotated[Principal, Depends(get_current_user)]) -> Principal:
+        if not permission_index.allows(
+            current_user.role, permission_code, fallback=current_user.permissions
+        ):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"权限不足: 需要 '{permission_code}' 权限",
@@ -69,7 +99,7 @@ def require_roles(allowed_roles: list[str]):
     角色依赖注入工厂
     用法: Depends(require_roles(['admin', 'sales_manager']))
     """
-    async def _check(current_user: Annotated[User, Depends(get_current_user)]) -> User:
+    async def _check(current_user: Annotated[Principal, Depends(get_current_user)]) -> Principal:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -4,10 +4,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 
 from app.api.deps import require_permission
+from app.core.invalidation import bus
+from app.core.principal import Principal
 from app.db.session import get_db
-from app.models.user import User, Role, Permission
+from app.models.user import Role, Permission
 from app.models.admin_model import Department, IpWhitelist, LogisticsCompany, SensitiveWord
 from app.schemas.response import success_response
+from app.services.permission_index import permission_index
 from app.schemas.admin_schema import (
     DepartmentCreate, DepartmentUpdate, DepartmentOut, 
     IpWhitelistCreate, IpWhitelistUpdate, IpWhitelistOut,
@@ -23,7 +26,7 @@ router = APIRouter(prefix="/admin", tags=["后台设置"])
 @router.get("/departments", response_model=Any)
 async def get_departments(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     result = await db.execute(select(Department).order_by(Department.created_at.desc()))
     items = result.scalars().all()
@@ -35,7 +38,7 @@ async def get_departments(
 async def create_department(
     data: DepartmentCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     obj = Department(**data.model_dump(by_alias=False))
     db.add(obj)
@@ -48,7 +51,7 @@ async def update_department(
     dept_id: str,
     data: DepartmentUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     res = await db.execute(select(Department).where(Department.id == dept_id))
     obj = res.scalar_one_or_none()
@@ -66,7 +69,7 @@ async def update_department(
 async def delete_department(
     dept_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     await db.execute(delete(Department).where(Department.id == dept_id))
     await db.commit()
@@ -76,7 +79,7 @@ async def delete_department(
 @router.get("/roles", response_model=Any)
 async def get_roles(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     result = await db.execute(select(Role).order_by(Role.created_at.asc()))
     items = result.scalars().all()
@@ -102,7 +105,7 @@ async def update_role(
     role_id: str,
     data: RoleUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     res = await db.execute(select(Role).where(Role.id == role_id))
     role = res.scalar_one_or_none()
@@ -118,13 +121,15 @@ async def update_role(
     role.name = data.name
     role.permissions = list(perm_objs)
     await db.commit()
+    permission_index.set_role(role.code, [p.code for p in perm_objs])
+    await bus.publish("role", role.code)
     return success_response(message="角色配置已更新")
 
 # ---------------------- 物流配置 ----------------------
 @router.get("/logistics", response_model=Any)
 async def get_logistics(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     res = await db.execute(select(LogisticsCompany).order_by(LogisticsCompany.created_at.asc()))
     items = res.scalars().all()
@@ -135,7 +140,7 @@ async def update_logistics_status(
     comp_id: str,
     status: bool,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     res = await db.execute(select(LogisticsCompany).where(LogisticsCompany.id == comp_id))
     comp = res.scalar_one_or_none()
@@ -148,7 +153,7 @@ async def update_logistics_status(
 @router.get("/ip-whitelist", response_model=Any)
 async def get_ip_whitelist(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     res = await db.execute(select(IpWhitelist).order_by(IpWhitelist.created_at.desc()))
     items = res.scalars().all()
@@ -158,7 +163,7 @@ async def get_ip_whitelist(
 async def add_ip_whitelist(
     data: IpWhitelistCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     obj = IpWhitelist(**data.model_dump())
     db.add(obj)
@@ -170,7 +175,7 @@ async def update_ip_whitelist(
     ip_id: str,
     data: IpWhitelistUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     res = await db.execute(select(IpWhitelist).where(IpWhitelist.id == ip_id))
     obj = res.scalar_one_or_none()
@@ -188,7 +193,7 @@ async def update_ip_whitelist(
 async def delete_ip_whitelist(
     ip_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     await db.execute(delete(IpWhitelist).where(IpWhitelist.id == ip_id))
     await db.commit()
@@ -199,7 +204,7 @@ async def update_ip_status(
     ip_id: str,
     status: bool,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     res = await db.execute(select(IpWhitelist).where(IpWhitelist.id == ip_id))
     obj = res.scalar_one_or_none()
@@ -212,7 +217,7 @@ async def update_ip_status(
 @router.get("/sensitive-words", response_model=Any)
 async def get_sensitive_words(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     res = await db.execute(select(SensitiveWord).order_by(SensitiveWord.created_at.desc()))
     items = res.scalars().all()
@@ -222,7 +227,7 @@ async def get_sensitive_words(
 async def add_sensitive_word(
     data: SensitiveWordCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     obj = SensitiveWord(**data.model_dump())
     db.add(obj)
@@ -233,7 +238,7 @@ async def add_sensitive_word(
 async def delete_sensitive_word(
     word_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))]
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))]
 ):
     await db.execute(delete(SensitiveWord).where(SensitiveWord.id == word_id))
     await db.commit()
@@ -14,9 +14,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, require_permission
+from app.core.principal import Principal
 from app.crud.crud_instances import crud_after_sale
-from app.db.session import get_db
-from app.models.user import User
+from app.db.session import get_db, get_read_db
 from app.models.after_sale import AfterSale
 from app.schemas.after_sale import AfterSaleCreate, AfterSaleUpdate, AfterSaleOut
 from app.schemas.response import success_response, paginated_response
@@ -36,8 +36,8 @@ def _to_out(a: AfterSale) -> dict:
 
 @router.get("")
 async def list_after_sales(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("finance:aftersale"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("finance:aftersale"))],
     page: int = 1,
     page_size: int = 20,
 ):
@@ -50,7 +50,7 @@ async def list_after_sales(
 async def create_after_sale(
     body: AfterSaleCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("finance:aftersale"))],
+    _: Annotated[Principal, Depends(require_permission("finance:aftersale"))],
 ):
     item = await crud_after_sale.create(db, obj_in=body)
     return success_response(data=_to_out(item), message="售后单创建成功")
@@ -60,7 +60,7 @@ async def create_after_sale(
 async def get_after_sale(
     item_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("finance:aftersale"))],
+    _: Annotated[Principal, Depends(require_permission("finance:aftersale"))],
 ):
     item = await crud_after_sale.get(db, item_id)
     if not item:
@@ -73,7 +73,7 @@ async def update_after_sale(
     item_id: str,
     body: AfterSaleUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("finance:aftersale"))],
+    _: Annotated[Principal, Depends(require_permission("finance:aftersale"))],
 ):
     item = await crud_after_sale.get(db, item_id)
     if not item:
@@ -87,7 +87,7 @@ async def put_after_sale(
     item_id: str,
     body: AfterSaleUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("finance:aftersale"))],
+    _: Annotated[Principal, Depends(require_permission("finance:aftersale"))],
 ):
     """PUT 全量更新售后单"""
     item = await crud_after_sale.get(db, item_id)
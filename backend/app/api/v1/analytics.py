@@ -9,8 +9,8 @@ from sqlalchemy import select, func
 from datetime import datetime, timedelta
 
 from app.api.deps import require_permission
+from app.core.principal import Principal
 from app.db.session import get_db
-from app.models.user import User
 from app.models.order import Order
 from app.models.customer import Customer
 from app.schemas.response import success_response
@@ -20,7 +20,7 @@ router = APIRouter(prefix="/analytics", tags=["数据报表"])
 @router.get("/performance")
 async def get_performance(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("office:analytics"))],
+    _: Annotated[Principal, Depends(require_permission("office:analytics"))],
     dimension: str = "今日",
 ):
     """大屏业绩数据接口"""
@@ -38,7 +38,7 @@ async def get_performance(
 @router.get("/trend")
 async def get_trend(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("office:analytics"))],
+    _: Annotated[Principal, Depends(require_permission("office:analytics"))],
     dimension: str = "今日",
 ):
     """趋势图数据"""
@@ -11,7 +11,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 from app.api.deps import require_permission
-from app.db.session import get_db
+from app.core.principal import Principal
+from app.db.session import get_read_db
 from app.models.user import User
 from app.models.audit_log import AuditLog
 from app.schemas.audit_log import AuditLogOut
@@ -57,8 +58,8 @@ async def _list_logs(db: AsyncSession, page: int, page_size: int, user_name: str
 
 @router.get("/audit-logs")
 async def list_audit_logs(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("operation:logs"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("operation:logs"))],
     page: int = 1,
     page_size: int = 20,
     user_name: str | None = None,
@@ -71,8 +72,8 @@ async def list_audit_logs(
 
 @router.get("/logs")
 async def list_logs_alias(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("operation:logs"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("operation:logs"))],
     page: int = 1,
     page_size: int = 20,
     user_name: str | None = None,
@@ -1,5 +1,8 @@
 """
-认证路由 — POST /api/v1/auth/login
+认证路由
+POST /api/v1/auth/login         — 登录
+POST /api/v1/auth/logout        — 登出 (吊销当前令牌)
+GET  /api/v1/auth/hasher-stats  — bcrypt 线程池指标 (settings:system)
 对齐 BACKEND_CONTEXT.md § 4.5 认证流程
 """
 from typing import Annotated
@@ -8,11 +11,19 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import verify_password, create_access_token
-from app.db.session import get_db
+from app.api.deps import get_current_user, oauth2_scheme, require_permission
+from app.core.principal import Principal
+from app.core.security import (
+    PasswordHasherBusyError,
+    create_access_token,
+    decode_access_token,
+    password_hasher,
+)
+from app.db.session import LazySession, get_db
 from app.models.user import User
 from app.schemas.user import LoginRequest, UserOut
 from app.schemas.response import success_response
+from app.services.revocation import revocation_store
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 
@@ -20,7 +31,7 @@ router = APIRouter(prefix="/auth", tags=["认证"])
 @router.post("/login")
 async def login(
     body: LoginRequest,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[LazySession, Depends(get_db)],
 ):
     """
     用户登录
@@ -33,11 +44,29 @@ async def login(
     )
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(body.password, user.hashed_password):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户名或密码错误",
+        )
+    # bcrypt 校验耗时 100ms 级, 期间不持有连接
+    await db.release()
+    try:
+        ok, new_hash = await password_hasher.verify(body.password, user.hashed_password)
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="登录请求过多，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
         )
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
 
     if not getattr(user, "is_active", True):
         raise HTTPException(
@@ -60,3 +89,20 @@ async def login(
     )
 
     return success_response(data={"token": token, "user": user_out.model_dump()})
+
+
+@router.post("/logout")
+async def logout(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    _: Annotated[Principal, Depends(get_current_user)],
+):
+    """登出 — 吊销当前令牌, 所有 worker 立即拒绝"""
+    await revocation_store.revoke_token(db, decode_access_token(token), reason="logout")
+    return success_response(message="已退出登录")
+
+
+@router.get("/hasher-stats")
+async def hasher_stats(_: Annotated[Principal, Depends(require_permission("settings:system"))]):
+    """bcrypt 线程池: 排队数 / 拒绝数 / 平均耗时 / 最大排队等待"""
+    return success_response(data=password_hasher.stats())
@@ -8,9 +8,9 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_read_db
 from app.api.deps import get_current_user
-from app.models.user import User
+from app.core.principal import Principal
 from app.models.order import Order
 from app.models.after_sale import AfterSale
 from app.models.notification import Notification
@@ -22,8 +22,8 @@ router = APIRouter(prefix="/badges", tags=["角标"])
 
 @router.get("")
 async def get_badge_counts(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """获取当前用户可见的各模块角标计数"""
 
@@ -19,7 +19,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.api.deps import get_current_user, require_permission
-from app.db.session import get_db
+from app.core.principal import Principal
+from app.db.session import get_db, get_read_db
 from app.models.user import User
 from app.models.im_conversation import IMConversation
 from app.models.im_message import IMMessage
@@ -50,8 +51,8 @@ def _user_to_employee(u: User, online_ids: set[str]) -> dict:
 
 @router.get("/employees")
 async def get_chat_employees(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:chat"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(require_permission("office:chat"))],
 ):
     """
     可聊天的员工列表
@@ -74,8 +75,8 @@ async def get_chat_employees(
 
 @router.get("/conversations")
 async def get_conversations(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:chat"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(require_permission("office:chat"))],
 ):
     """
     会话列表 — 返回当前用户相关的会话
@@ -152,8 +153,8 @@ async def get_conversations(
 
 @router.get("/groups")
 async def get_groups(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:chat"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(require_permission("office:chat"))],
 ):
     """群组列表"""
     result = await db.execute(
@@ -184,8 +185,8 @@ async def get_groups(
 
 @router.get("/messages")
 async def get_messages(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:chat"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(require_permission("office:chat"))],
     conversation_id: str = Query(None, description="会话ID"),
 ):
     """指定会话的消息记录"""
@@ -220,8 +221,8 @@ async def get_messages(
 
 @router.get("/messages/all")
 async def get_all_messages(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:chat"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(require_permission("office:chat"))],
 ):
     """所有会话的消息 (设置页面 IM 审计用) — 返回 {conversationId: messages[]}"""
     result = await db.execute(
@@ -263,7 +264,7 @@ class CreateGroupRequest(BaseModel):
 async def create_group(
     body: CreateGroupRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:chat"))],
+    current_user: Annotated[Principal, Depends(require_permission("office:chat"))],
 ):
     """
     创建群聊
@@ -310,7 +311,7 @@ class GetOrCreateConversationRequest(BaseModel):
 async def get_or_create_conversation(
     body: GetOrCreateConversationRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:chat"))],
+    current_user: Annotated[Principal, Depends(require_permission("office:chat"))],
 ):
     """
     获取或创建私聊会话
@@ -365,7 +366,7 @@ async def get_or_create_conversation(
 @router.delete("/reset-seed")
 async def reset_im_seed(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("settings:system"))],
+    current_user: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """
     重置 IM 种子数据 (仅管理员)
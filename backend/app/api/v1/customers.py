@@ -16,9 +16,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, require_permission
+from app.core.principal import Principal
 from app.crud.crud_instances import crud_customer
-from app.db.session import get_db
-from app.models.user import User
+from app.db.session import get_db, get_read_db
 from app.models.customer import Customer
 from app.schemas.customer import CustomerCreate, CustomerUpdate, CustomerOut
 from app.schemas.response import success_response, paginated_response
@@ -46,8 +46,8 @@ def _customer_to_out(c: Customer) -> dict:
 
 @router.get("")
 async def list_customers(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("customer:list"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(require_permission("customer:list"))],
     page: int = 1,
     page_size: int = 20,
 ):
@@ -65,7 +65,7 @@ async def list_customers(
 async def create_customer(
     body: CustomerCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("customer:list"))],
+    current_user: Annotated[Principal, Depends(require_permission("customer:list"))],
 ):
     """创建客户 — 默认归属当前销售"""
     owner = body.ownerId or current_user.id
@@ -77,7 +77,7 @@ async def create_customer(
 async def get_customer(
     customer_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("customer:list"))],
+    _: Annotated[Principal, Depends(require_permission("customer:list"))],
 ):
     customer = await crud_customer.get(db, customer_id)
     if not customer:
@@ -90,7 +90,7 @@ async def update_customer(
     customer_id: str,
     body: CustomerUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("customer:list"))],
+    _: Annotated[Principal, Depends(require_permission("customer:list"))],
 ):
     customer = await crud_customer.get(db, customer_id)
     if not customer:
@@ -104,7 +104,7 @@ async def put_customer(
     customer_id: str,
     body: CustomerUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("customer:list"))],
+    _: Annotated[Principal, Depends(require_permission("customer:list"))],
 ):
     """PUT 全量更新客户"""
     customer = await crud_customer.get(db, customer_id)
@@ -118,7 +118,7 @@ async def put_customer(
 async def delete_customer(
     customer_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("customer:list"))],
+    _: Annotated[Principal, Depends(require_permission("customer:list"))],
 ):
     deleted = await crud_customer.soft_delete(db, id=customer_id)
     if not deleted:
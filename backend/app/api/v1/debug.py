@@ -0,0 +1,134 @@
+"""
+运行时诊断路由 (仅系统管理员 settings:system)
+GET    /api/v1/debug/loop              — 事件循环延迟统计 + 最近卡顿堆栈
+GET    /api/v1/debug/traces            — 最近请求中最慢的 trace (span 树)
+POST   /api/v1/debug/profile           — 限时剖析: mode=sample (折叠栈文本) / cprofile (函数表)
+GET    /api/v1/debug/memory            — tracemalloc 状态
+POST   /api/v1/debug/memory/start      — 开始追踪内存分配
+POST   /api/v1/debug/memory/snapshot   — 拍摄快照并设为基线
+GET    /api/v1/debug/memory/diff       — 当前与基线的差异
+POST   /api/v1/debug/memory/stop       — 停止追踪
+
+剖析与内存接口需 DEBUG_PROFILING_ENABLED=true, 否则返回 404
+"""
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_permission
+from app.core.config import get_settings
+from app.core.principal import Principal
+from app.core.tracing import recorder
+from app.schemas.response import success_response
+from app.services.loop_monitor import loop_monitor
+from app.services.profiler import ProfilerBusyError, memory_tracker, run_cprofile, sample_stacks
+
+settings = get_settings()
+
+router = APIRouter(prefix="/debug", tags=["运行诊断"])
+
+
+async def require_profiling(
+    current_user: Annotated[Principal, Depends(require_permission("settings:system"))],
+) -> Principal:
+    """剖析类接口 — 配置未开启时当作不存在"""
+    if not settings.DEBUG_PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="诊断接口未启用")
+    return current_user
+
+
+@router.get("/loop")
+async def loop_stats(
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
+    limit: int = 10,
+):
+    """最近的事件循环卡顿 (新的在前), 每条含阻塞点堆栈"""
+    stalls = list(loop_monitor.stalls)[-limit:][::-1]
+    return success_response(data={**loop_monitor.stats(), "stalls": stalls})
+
+
+@router.post("/profile")
+async def profile(
+    _: Annotated[Principal, Depends(require_profiling)],
+    seconds: float = 5,
+    mode: Literal["sample", "cprofile"] = "sample",
+    interval_ms: float = 5,
+    top: int = 50,
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+):
+    """
+    限时剖析当前 worker
+    - sample: 返回 text/plain 折叠栈, 可直接交给 flamegraph.pl / speedscope
+    - cprofile: 返回 JSON 函数表
+    """
+    if not 0 < seconds <= settings.DEBUG_PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400, detail=f"seconds 取值范围 (0, {settings.DEBUG_PROFILE_MAX_SECONDS}]"
+        )
+    try:
+        if mode == "sample":
+            collapsed, count = await sample_stacks(seconds, interval_ms)
+            return PlainTextResponse(collapsed, headers={"X-Profile-Samples": str(count)})
+        return success_response(data=await run_cprofile(seconds, top, sort))
+    except ProfilerBusyError:
+        raise HTTPException(status_code=409, detail="已有剖析会话在运行")
+
+
+@router.get("/memory")
+async def memory_status(_: Annotated[Principal, Depends(require_profiling)]):
+    return success_response(data=memory_tracker.status())
+
+
+@router.post("/memory/start")
+async def memory_start(
+    _: Annotated[Principal, Depends(require_profiling)],
+    frames: int = 10,
+):
+    """开始追踪 — frames 为每次分配保留的调用栈深度, 越大开销越高"""
+    return success_response(data=memory_tracker.start(frames))
+
+
+@router.post("/memory/snapshot")
+async def memory_snapshot(
+    _: Annotated[Principal, Depends(require_profiling)],
+    top: int = 30,
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+):
+    if not memory_tracker.status()["tracing"]:
+        raise HTTPException(status_code=400, detail="请先开始内存追踪")
+    return success_response(data=memory_tracker.snapshot(top, group_by))
+
+
+@router.get("/memory/diff")
+async def memory_diff(
+    _: Annotated[Principal, Depends(require_profiling)],
+    top: int = 30,
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+):
+    if memory_tracker.baseline is None:
+        raise HTTPException(status_code=400, detail="请先拍摄基线快照")
+    return success_response(data=memory_tracker.diff(top, group_by))
+
+
+@router.post("/memory/stop")
+async def memory_stop(_: Annotated[Principal, Depends(require_profiling)]):
+    return success_response(data=memory_tracker.stop())
+
+
+@router.get("/traces")
+async def list_traces(
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
+    limit: int = 10,
+    min_ms: float = 0,
+    name: str | None = None,
+):
+    """
+    最近 TRACE_BUFFER_SIZE 条 trace 中最慢的 limit 条, 以 span 树返回
+    name: 按根 span 名称过滤, 如 "POST /api/v1/orders" 或 "ws im.message"
+    """
+    traces = recorder.slowest(limit, min_ms, name)
+    return success_response(data={
+        "buffered": len(recorder.traces),
+        "traces": [t.to_dict() for t in traces],
+    })
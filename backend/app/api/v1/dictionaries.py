@@ -9,9 +9,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.api.deps import get_current_user, require_permission
+from app.core.principal import Principal
 from app.crud.crud_instances import crud_dictionary
 from app.db.session import get_db
-from app.models.user import User
 from app.models.dictionary import Dictionary
 from app.schemas.dictionary import DictionaryCreate, DictionaryUpdate, DictionaryOut
 from app.schemas.response import success_response
@@ -21,7 +21,7 @@ router = APIRouter(prefix="/dictionaries", tags=["系统管理"])
 @router.get("")
 async def list_dictionaries(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    _: Annotated[Principal, Depends(get_current_user)],
     group: str | None = None,
 ):
     """获取字典列表 — 所有已登录用户均可读取"""
@@ -40,7 +40,7 @@ async def list_dictionaries(
 async def create_dictionary(
     body: DictionaryCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("operation:channel"))],
+    _: Annotated[Principal, Depends(require_permission("operation:channel"))],
 ):
     item = await crud_dictionary.create(db, obj_in=body)
     return success_response(data=DictionaryOut.model_validate(item).model_dump(), message="创建成功")
@@ -50,7 +50,7 @@ async def update_dictionary(
     id: str,
     body: DictionaryUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("operation:channel"))],
+    _: Annotated[Principal, Depends(require_permission("operation:channel"))],
 ):
     item = await crud_dictionary.get(db, id)
     if not item:
@@ -63,7 +63,7 @@ async def put_dictionary(
     id: str,
     body: DictionaryUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("operation:channel"))],
+    _: Annotated[Principal, Depends(require_permission("operation:channel"))],
 ):
     """PUT 全量更新字典项"""
     item = await crud_dictionary.get(db, id)
@@ -76,7 +76,7 @@ async def put_dictionary(
 async def delete_dictionary(
     id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("operation:channel"))],
+    _: Annotated[Principal, Depends(require_permission("operation:channel"))],
 ):
     await crud_dictionary.soft_delete(db, id=id)
     return success_response(message="删除成功")
@@ -13,9 +13,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update
 
 from app.api.deps import get_current_user
+from app.core.principal import Principal
 from app.crud.crud_instances import crud_notification
-from app.db.session import get_db
-from app.models.user import User
+from app.db.session import get_db, get_read_db
 from app.models.notification import Notification
 from app.schemas.notification import NotificationOut, NotificationUpdate
 from app.schemas.response import success_response, paginated_response
@@ -24,8 +24,8 @@ router = APIRouter(prefix="/notifications", tags=["消息中心"])
 
 @router.get("")
 async def list_notifications(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     page: int = 1,
     page_size: int = 20,
     only_unread: bool = False,
@@ -53,8 +53,8 @@ async def list_notifications(
 
 @router.get("/unread-count")
 async def get_unread_count(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """获取未读通知数量 — 前端角标功能使用"""
     query = select(func.count()).where(
@@ -70,7 +70,7 @@ async def get_unread_count(
 async def mark_as_read(
     id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """标记单条通知为已读"""
     item = await crud_notification.get(db, id)
@@ -83,7 +83,7 @@ async def mark_as_read(
 @router.post("/read-all")
 async def mark_all_as_read(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """全部标记为已读"""
     await db.execute(
@@ -17,9 +17,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.api.deps import get_current_user, require_permission
+from app.core.principal import Principal
 from app.crud.crud_instances import crud_opportunity
 from app.db.session import get_db
-from app.models.user import User
 from app.models.opportunity import Opportunity
 from app.models.order import Order
 from app.models.task import Task
@@ -31,7 +31,7 @@ router = APIRouter(prefix="/opportunities", tags=["商机管理"])
 @router.get("")
 async def list_opportunities(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("customer:list"))],
+    current_user: Annotated[Principal, Depends(require_permission("customer:list"))],
     page: int = 1,
     page_size: int = 20,
 ):
@@ -59,7 +59,7 @@ async def list_opportunities(
 async def create_opportunity(
     body: OpportunityCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("customer:list"))],
+    current_user: Annotated[Principal, Depends(require_permission("customer:list"))],
 ):
     data = body.model_dump()
     mapping = {
@@ -14,8 +14,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.api.deps import get_current_user
+from app.core.principal import Principal
 from app.db.session import get_db
-from app.models.user import User
 from app.models.task import Task
 from app.models.order import Order
 from app.models.opportunity import Opportunity
@@ -27,7 +27,7 @@ router = APIRouter(prefix="/opportunity", tags=["我的商机"])
 @router.get("/todo")
 async def get_todo(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """待办工单"""
     result = await db.execute(
@@ -52,7 +52,7 @@ async def get_todo(
 @router.get("/orders")
 async def get_my_orders(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """我的订单 (近期)"""
     result = await db.execute(
@@ -75,7 +75,7 @@ async def get_my_orders(
 @router.get("/approvals")
 async def get_approvals(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """待办审批"""
     filters = [Order.is_deleted == False]
@@ -104,7 +104,7 @@ async def get_approvals(
 @router.get("/list")
 async def get_opportunity_list(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """商机列表"""
     filters = [Opportunity.is_deleted == False]
@@ -4,6 +4,7 @@ GET    /api/v1/orders              — 订单列表
 POST   /api/v1/orders              — 创建订单
 GET    /api/v1/orders/audit        — 审批列表 (经理/财务)
 GET    /api/v1/orders/modifiable   — 可修改订单列表
+POST   /api/v1/orders/batch-status — 批量状态流转 (审核 / 发货 / 签收)
 GET    /api/v1/orders/{id}         — 订单详情
 PATCH  /api/v1/orders/{id}         — 部分更新订单
 PUT    /api/v1/orders/{id}         — 全量更新订单
@@ -12,26 +13,31 @@ DELETE /api/v1/orders/{id}         — 删除订单
 权限对齐 seed.py — 使用 order:create / order:modify / order:pending / order:shipped
                     / order:signed / finance:audit / finance:aftersale
 """
-import uuid
-from datetime import datetime, timezone
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from starlette import status as http_status
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.api.deps import get_current_user, require_permission
+from app.core.principal import Principal
 from app.crud.crud_instances import crud_order
-from app.db.session import get_db
-from app.models.user import User
+from app.db.session import get_db, get_read_db
 from app.models.order import Order, OrderItem
-from app.schemas.order import OrderCreate, OrderUpdate, OrderOut, OrderItemOut
+from app.schemas.order import OrderBatchStatus, OrderCreate, OrderUpdate, OrderOut, OrderItemOut
 from app.schemas.response import success_response, paginated_response
+from app.services import order_workflow, reservation_service
+from app.services.order_numbers import order_numbers
+from app.services.permission_index import permission_index
+from app.services.stock_service import StockError
 
 router = APIRouter(prefix="/orders", tags=["订单管理"])
 
 
-def _order_to_out(o: Order) -> dict:
+def _order_to_out(o: Order, sales_name: str | None = None) -> dict:
+    """sales_name: 调用方已知销售姓名时传入, 避免加载 creator 关联"""
     items_out = [
         OrderItemOut(
             productId=item.product_id,
@@ -57,24 +63,18 @@ def _order_to_out(o: Order) -> dict:
         signedAt=o.signed_at.isoformat() if o.signed_at else None,
         createdAt=o.created_at.isoformat() if o.created_at else "",
         createdBy=o.created_by,
-        salesName=o.creator.name if o.creator else None,
+        salesName=sales_name if sales_name is not None else (o.creator.name if o.creator else None),
     ).model_dump()
 
 
-def _generate_order_no() -> str:
-    """生成订单编号: NS + 年月日时分秒 + 4位随机"""
-    now = datetime.now(timezone.utc)
-    return f"NS{now.strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:4].upper()}"
-
-
 # ============================================================
 # 子路由 — 必须放在 /{order_id} 之前，避免路径冲突
 # ============================================================
 
 @router.get("/audit")
 async def list_audit_orders(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     page: int = 1,
     page_size: int = 20,
 ):
@@ -102,8 +102,8 @@ async def list_audit_orders(
 
 @router.get("/modifiable")
 async def list_modifiable_orders(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     page: int = 1,
     page_size: int = 20,
 ):
@@ -124,10 +124,46 @@ async def list_modifiable_orders(
 # 标准 CRUD
 # ============================================================
 
+def _can_advance(user: Principal, source: str) -> bool:
+    """审核两级按角色 (与审批列表一致), 发货 / 签收按权限码"""
+    if source == "manager_pending":
+        return user.role in ("sales_manager", "admin")
+    if source == "finance_pending":
+        return user.role in ("finance", "admin")
+    code = "order:pending" if source == "approved" else "order:signed"
+    return permission_index.allows(user.role, code, fallback=user.permissions)
+
+
+@router.post("/batch-status")
+async def batch_update_status(
+    body: OrderBatchStatus,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
+):
+    """
+    批量状态流转 — 一次校验 + 一条 UPDATE, 只推进处于前一状态的订单, 其余在 failed 中说明原因
+    发货时预占批量转出库, 库存不足整批回滚
+    """
+    source = order_workflow.TRANSITIONS[body.status]
+    if not _can_advance(current_user, source):
+        raise HTTPException(status_code=403, detail="权限不足: 无法执行该状态流转")
+    try:
+        result = await order_workflow.transition(db, body.ids, body.status, current_user.id)
+    except StockError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=e.message)
+    await db.commit()
+    await order_workflow.announce(result, current_user.id)
+    return success_response(
+        data=result.to_dict(),
+        message=f"已更新 {len(result.updated)} 个订单" + (f"，{len(result.failed)} 个未更新" if result.failed else ""),
+    )
+
+
 @router.get("")
 async def list_orders(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
     page: int = 1,
     page_size: int = 20,
     status: str | None = None,
@@ -148,14 +184,17 @@ async def list_orders(
 async def create_order(
     body: OrderCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("order:create"))],
+    current_user: Annotated[Principal, Depends(require_permission("order:create"))],
 ):
-    """创建订单 — 自动生成 orderNo, 设定 created_by"""
+    """
+    创建订单 — 订单号取自序列号段, 设定 created_by
+    明细行一条多行 INSERT ... RETURNING 写入并直接挂到订单上, 提交后不再 refresh
+    """
     # 状态逻辑：如果实际价格低于总价，则需要经理审核
     initial_status = "manager_pending" if (body.actualPrice and body.actualPrice < body.totalAmount) else "approved"
 
     order = Order(
-        order_no=_generate_order_no(),
+        order_no=await order_numbers.next(db),
         customer_id=body.customerId,
         customer_name=body.customerName,
         order_type=body.orderType,
@@ -175,28 +214,43 @@ async def create_order(
     db.add(order)
     await db.flush()
 
-    # 创建明细行
-    for item in body.items:
-        db.add(OrderItem(
-            order_id=order.id,
-            product_id=item.productId,
-            product_name=item.productName,
-            spec=item.spec,
-            price=item.price,
-            quantity=item.quantity,
-            subtotal=item.subtotal,
-        ))
+    # 创建明细行 — 单条多行 INSERT, RETURNING 直接得到 ORM 对象
+    items = []
+    if body.items:
+        result = await db.scalars(
+            insert(OrderItem).returning(OrderItem, sort_by_parameter_order=True),
+            [
+                {
+                    "order_id": order.id,
+                    "product_id": item.productId,
+                    "product_name": item.productName,
+                    "spec": item.spec,
+                    "price": item.price,
+                    "quantity": item.quantity,
+                    "subtotal": item.subtotal,
+                }
+                for item in body.items
+            ],
+        )
+        items = list(result)
+    set_committed_value(order, "items", items)
+
+    # 预占库存 — 可用库存不足时整单回滚, 避免超卖
+    try:
+        await reservation_service.reserve(db, order.id, body.items)
+    except StockError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=e.message)
 
     await db.commit()
-    await db.refresh(order)
-    return success_response(data=_order_to_out(order), message="订单创建成功")
+    return success_response(data=_order_to_out(order, current_user.name), message="订单创建成功")
 
 
 @router.get("/{order_id}")
 async def get_order(
     order_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    _: Annotated[Principal, Depends(get_current_user)],
 ):
     order = await crud_order.get(db, order_id)
     if not order:
@@ -224,20 +278,31 @@ def _apply_order_update(order: Order, update_data: dict):
             setattr(order, snake, update_data[camel])
 
 
+async def _sync_reservation(db: AsyncSession, order: Order, old_status: str, operator_id: str):
+    """状态流转后同步库存预占 (发货转出库 / 驳回取消释放 / 重新提交补占)"""
+    try:
+        await reservation_service.sync_status(db, order, old_status, operator_id)
+    except StockError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=e.message)
+
+
 @router.patch("/{order_id}")
 async def update_order(
     order_id: str,
     body: OrderUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """部分更新订单 — 含状态审核流转"""
     order = await crud_order.get(db, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="订单不存在")
 
+    old_status = order.status
     update_data = body.model_dump(exclude_unset=True)
     _apply_order_update(order, update_data)
+    await _sync_reservation(db, order, old_status, current_user.id)
 
     await db.commit()
     await db.refresh(order)
@@ -249,15 +314,17 @@ async def put_order(
     order_id: str,
     body: OrderUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """PUT 全量更新订单 — 与 PATCH 共享逻辑"""
     order = await crud_order.get(db, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="订单不存在")
 
+    old_status = order.status
     update_data = body.model_dump(exclude_unset=True)
     _apply_order_update(order, update_data)
+    await _sync_reservation(db, order, old_status, current_user.id)
 
     await db.commit()
     await db.refresh(order)
@@ -268,8 +335,10 @@ async def put_order(
 async def delete_order(
     order_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    _: Annotated[Principal, Depends(get_current_user)],
 ):
+    # 释放预占与软删除同一事务提交
+    await reservation_service.release(db, order_id)
     deleted = await crud_order.soft_delete(db, id=order_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="订单不存在")
@@ -20,9 +20,9 @@ from pydantic import BaseModel
 from sqlalchemy import select, delete, func
 
 from app.api.deps import get_current_user, require_permission
+from app.core.principal import Principal
 from app.crud.crud_instances import crud_product
-from app.db.session import get_db
-from app.models.user import User
+from app.db.session import get_db, get_read_db
 from app.models.product import Product
 from app.schemas.product import ProductCreate, ProductUpdate, ProductOut
 from app.schemas.response import success_response, paginated_response
@@ -45,8 +45,8 @@ def _product_to_out(p: Product) -> dict:
 
 @router.get("")
 async def list_products(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
     page: int = 1,
     page_size: int = 100,
     status_filter: str | None = None,
@@ -73,7 +73,7 @@ async def list_products(
 async def sort_product(
     body: SortAction,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     """商品排序调整"""
     product = await crud_product.get(db, body.id)
@@ -95,7 +95,7 @@ async def sort_product(
 async def bulk_delete_products(
     ids: list[str],
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     """批量删除"""
     for pid in ids:
@@ -107,7 +107,7 @@ async def bulk_delete_products(
 async def create_product(
     body: ProductCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     product = await crud_product.create(db, obj_in=body)
     return success_response(data=_product_to_out(product), message="创建成功")
@@ -117,7 +117,7 @@ async def create_product(
 async def get_product(
     product_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     product = await crud_product.get(db, product_id)
     if not product:
@@ -130,7 +130,7 @@ async def update_product(
     product_id: str,
     body: ProductUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     product = await crud_product.get(db, product_id)
     if not product:
@@ -144,7 +144,7 @@ async def put_product(
     product_id: str,
     body: ProductUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     """PUT 全量更新商品"""
     product = await crud_product.get(db, product_id)
@@ -158,7 +158,7 @@ async def put_product(
 async def delete_product(
     product_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     deleted = await crud_product.soft_delete(db, id=product_id)
     if not deleted:
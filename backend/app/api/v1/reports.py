@@ -12,8 +12,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 
 from app.api.deps import require_permission
+from app.core.principal import Principal
 from app.db.session import get_db
-from app.models.user import User
 from app.models.report import DailyReport
 from app.schemas.response import success_response
 from app.schemas.report import DailyReportCreate, DailyReportOut, DailyReportUpdate
@@ -23,7 +23,7 @@ router = APIRouter(prefix="/reports", tags=["工作日报"])
 @router.get("")
 async def list_reports(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:report"))],
+    current_user: Annotated[Principal, Depends(require_permission("office:report"))],
 ):
     """当前用户的日报列表"""
     result = await db.execute(
@@ -50,7 +50,7 @@ async def list_reports(
 async def create_report(
     body: DailyReportCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:report"))],
+    current_user: Annotated[Principal, Depends(require_permission("office:report"))],
 ):
     """新建日报或保存草稿"""
     res = await db.execute(select(DailyReport).where(DailyReport.user_id == current_user.id, DailyReport.date == body.date))
@@ -80,7 +80,7 @@ async def update_report(
     report_id: str,
     body: DailyReportUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("office:report"))],
+    current_user: Annotated[Principal, Depends(require_permission("office:report"))],
 ):
     """更新日报或草稿"""
     res = await db.execute(select(DailyReport).where(DailyReport.id == report_id, DailyReport.user_id == current_user.id))
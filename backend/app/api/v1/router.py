@@ -25,6 +25,7 @@ from app.api.v1.admin import router as admin_router
 from app.api.v1.reports import router as reports_router
 from app.api.v1.chat import router as chat_router
 from app.api.v1.badges import router as badges_router
+from app.api.v1.debug import router as debug_router
 
 v1_router = APIRouter(prefix="/api/v1")
 
@@ -49,3 +50,4 @@ v1_router.include_router(admin_router)
 v1_router.include_router(reports_router)
 v1_router.include_router(chat_router)
 v1_router.include_router(badges_router)
+v1_router.include_router(debug_router)
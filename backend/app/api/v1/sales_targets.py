@@ -8,8 +8,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.api.deps import get_current_user, require_permission
+from app.core.principal import Principal
 from app.db.session import get_db
-from app.models.user import User
 from app.models.sales_target import SalesTarget
 from app.schemas.response import success_response
 
@@ -18,7 +18,7 @@ router = APIRouter(prefix="/sales-targets", tags=["业绩管理"])
 @router.get("")
 async def list_targets(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("operation:channel"))],
+    _: Annotated[Principal, Depends(require_permission("operation:channel"))],
 ):
     """获取所有业绩目标"""
     result = await db.execute(select(SalesTarget).where(SalesTarget.is_deleted == False))
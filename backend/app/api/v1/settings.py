@@ -22,8 +22,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.api.deps import get_current_user, require_permission
+from app.core.principal import Principal
 from app.db.session import get_db
-from app.models.user import User
 from app.models.setting import SystemSetting
 from app.schemas.response import success_response
 
@@ -32,7 +32,7 @@ router = APIRouter(prefix="/settings", tags=["系统设置"])
 @router.get("")
 async def get_settings(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    _: Annotated[Principal, Depends(get_current_user)],
     group: str = "global",
 ):
     """获取指定分组的设置"""
@@ -45,7 +45,7 @@ async def get_settings(
 async def update_settings(
     body: dict[str, Any],
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
     group: str = "global",
 ):
     """批量更新设置"""
@@ -65,7 +65,7 @@ async def update_settings(
 async def batch_update_settings(
     body: dict,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     for key, val in body.items():
         res = await db.execute(select(SystemSetting).where(SystemSetting.key == key))
@@ -82,7 +82,7 @@ async def batch_update_settings(
 async def update_global_settings(
     body: dict[str, Any],
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """更新全局设置"""
     for key, val in body.items():
@@ -100,7 +100,7 @@ async def update_global_settings(
 async def update_security_settings(
     body: dict[str, Any],
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """更新安全选项"""
     for key, val in body.items():
@@ -123,7 +123,7 @@ async def update_security_settings(
 @router.get("/departments")
 async def get_departments_proxy(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """代理部门列表 — 前端 settings/index.tsx 使用"""
     from app.models.admin_model import Department
@@ -137,7 +137,7 @@ async def get_departments_proxy(
 @router.get("/logistics")
 async def get_logistics_proxy(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """代理物流公司列表"""
     from app.models.admin_model import LogisticsCompany
@@ -150,7 +150,7 @@ async def get_logistics_proxy(
 @router.get("/ip-whitelist")
 async def get_ip_whitelist_proxy(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """代理 IP 白名单"""
     from app.models.admin_model import IpWhitelist
@@ -163,7 +163,7 @@ async def get_ip_whitelist_proxy(
 @router.get("/sensitive-words")
 async def get_sensitive_words_proxy(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """代理敏感词列表"""
     from app.models.admin_model import SensitiveWord
@@ -176,7 +176,7 @@ async def get_sensitive_words_proxy(
 @router.get("/im-conversations")
 async def get_im_conversations(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """IM 会话列表 — 前端 settings/index.tsx 即时通讯审计使用"""
     from app.models.im_conversation import IMConversation
@@ -204,7 +204,7 @@ async def get_im_conversations(
 @router.get("/im-messages")
 async def get_im_messages(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """IM 消息列表 — 返回 {conversationId: messages[]}"""
     from app.models.im_message import IMMessage
@@ -240,7 +240,7 @@ async def update_logistics_status_proxy(
     comp_id: str,
     request_data: dict,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:system"))],
+    _: Annotated[Principal, Depends(require_permission("settings:system"))],
 ):
     """代理更新物流公司状态 — 前端 settings/index.tsx 使用"""
     from app.models.admin_model import LogisticsCompany
@@ -11,9 +11,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.api.deps import get_current_user
+from app.core.principal import Principal
 from app.crud.crud_instances import crud_task
 from app.db.session import get_db
-from app.models.user import User
 from app.models.task import Task
 from app.schemas.task import TaskCreate, TaskUpdate, TaskOut
 from app.schemas.response import success_response
@@ -23,7 +23,7 @@ router = APIRouter(prefix="/tasks", tags=["任务管理"])
 @router.get("/todo")
 async def list_todo(
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     """获取当前用户的待办任务"""
     query = select(Task).where(Task.user_id == current_user.id, Task.status == "pending", Task.is_deleted == False)
@@ -46,7 +46,7 @@ async def list_todo(
 async def create_task(
     body: TaskCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
 ):
     task = await crud_task.create(db, obj_in=body, user_id=current_user.id)
     return success_response(message="任务创建成功")
@@ -17,12 +17,15 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, require_permission
-from app.core.security import hash_password
+from app.core.invalidation import bus
+from app.core.principal import Principal
+from app.core.security import PasswordHasherBusyError, password_hasher
 from app.crud.crud_instances import crud_user
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserOut
 from app.schemas.response import success_response, paginated_response
+from app.services.revocation import revocation_store
 
 router = APIRouter(prefix="/users", tags=["用户管理"])
 
@@ -37,6 +40,18 @@ def _mask_password(pwd: str | None) -> str | None:
     return pwd[:2] + "*" * (len(pwd) - 4) + pwd[-2:]
 
 
+async def _hash_password(password: str) -> str:
+    """bcrypt 在线程池执行; 排队已满时返回 503"""
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+
+
 def _user_to_out(user: User) -> dict:
     """将 ORM User 转为前端 User 接口格式"""
     # 注册日期 — 从 created_at 取年月日
@@ -64,15 +79,21 @@ def _user_to_out(user: User) -> dict:
 
 
 @router.get("/me")
-async def get_me(current_user: Annotated[User, Depends(get_current_user)]):
-    """获取当前登录用户信息"""
-    return success_response(data=_user_to_out(current_user))
+async def get_me(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[Principal, Depends(get_current_user)],
+):
+    """获取当前登录用户信息 — Principal 只含鉴权字段, 完整资料从数据库读取"""
+    user = await crud_user.get(db, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    return success_response(data=_user_to_out(user))
 
 
 @router.get("")
 async def list_users(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    _: Annotated[Principal, Depends(get_current_user)],
     page: int = 1,
     page_size: int = 20,
 ):
@@ -86,13 +107,13 @@ async def list_users(
 async def create_user(
     body: UserCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))],
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))],
 ):
     """创建用户"""
     user = await crud_user.create(
         db,
         obj_in=body,
-        hashed_password=hash_password(body.password),
+        hashed_password=await _hash_password(body.password),
         plain_password=body.password,
     )
     return success_response(data=_user_to_out(user), message="创建成功")
@@ -102,7 +123,7 @@ async def create_user(
 async def get_user(
     user_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    _: Annotated[Principal, Depends(get_current_user)],
 ):
     """用户详情"""
     user = await crud_user.get(db, user_id)
@@ -116,13 +137,14 @@ async def update_user(
     user_id: str,
     body: UserUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))],
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))],
 ):
     """部分更新用户"""
     user = await crud_user.get(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     updated = await crud_user.update(db, db_obj=user, obj_in=body)
+    await bus.publish("user", user_id)
     return success_response(data=_user_to_out(updated), message="更新成功")
 
 
@@ -131,13 +153,14 @@ async def put_user(
     user_id: str,
     body: UserUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))],
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))],
 ):
     """PUT 全量更新用户"""
     user = await crud_user.get(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     updated = await crud_user.update(db, db_obj=user, obj_in=body)
+    await bus.publish("user", user_id)
     return success_response(data=_user_to_out(updated), message="更新成功")
 
 
@@ -145,7 +168,7 @@ async def put_user(
 async def delete_user(
     user_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))],
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))],
 ):
     """删除用户 (软删除)"""
     user = await crud_user.get(db, user_id)
@@ -154,6 +177,7 @@ async def delete_user(
     if user.username == "admin":
         raise HTTPException(status_code=403, detail="系统管理员账号禁止删除")
     deleted = await crud_user.soft_delete(db, id=user_id)
+    await bus.publish("user", user_id)
     return success_response(message="删除成功")
 
 
@@ -167,13 +191,13 @@ async def change_password(
     user_id: str,
     body: PasswordChangeRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))],
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))],
 ):
     """管理员重置用户密码"""
     user = await crud_user.get(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
-    user.hashed_password = hash_password(body.newPassword)
+    user.hashed_password = await _hash_password(body.newPassword)
     user.plain_password = body.newPassword
     await db.commit()
     return success_response(message="密码修改成功")
@@ -189,7 +213,7 @@ async def toggle_user_status(
     user_id: str,
     body: StatusChangeRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("settings:backend"))],
+    _: Annotated[Principal, Depends(require_permission("settings:backend"))],
 ):
     """启用/禁用用户 — 禁用时踢掉在线 WebSocket 连接"""
     user = await crud_user.get(db, user_id)
@@ -198,6 +222,12 @@ async def toggle_user_status(
 
     user.is_active = body.isActive
     await db.commit()
+    # 禁用: 吊销该用户全部令牌 (HTTP 立即失效); 启用: 撤销吊销
+    if body.isActive:
+        await revocation_store.restore_user(db, user_id)
+    else:
+        await revocation_store.revoke_user(db, user_id, reason="disabled")
+    await bus.publish("user", user_id)
 
     # 禁用时踢下线
     if not body.isActive:
@@ -4,27 +4,44 @@ GET    /api/v1/warehouses              — 仓库列表
 POST   /api/v1/warehouses              — 创建仓库
 GET    /api/v1/warehouses/stock        — 库存概览 (按商品聚合, 前端 stock-manage.tsx 使用)
 GET    /api/v1/warehouses/stocks       — 库存概览 (别名)
-GET    /api/v1/warehouses/returns      — 退货待入库列表 (前端 return-stock.tsx 使用)
+GET    /api/v1/warehouses/stock/as-of  — 历史时点库存 (快照 + 日志回放)
+GET    /api/v1/warehouses/snapshots    — 库存快照列表
+POST   /api/v1/warehouses/snapshots    — 立即拍摄库存快照
+POST   /api/v1/warehouses/reconciliation — 对账: 实时库存 vs 最新快照 + 之后日志
+GET    /api/v1/warehouses/valuation    — 库存估值 (按月, 移动加权平均 / 先进先出)
+GET    /api/v1/warehouses/returns      — 退货待入库列表 (前端 return-stock.tsx 使用, 键集分页)
+POST   /api/v1/warehouses/returns/receive — 退货入库 (批量, 单事务)
 POST   /api/v1/warehouses/operations   — 入库/出库/调库
+POST   /api/v1/warehouses/operations/batch — 批量入库/出库/调库 (单事务)
 GET    /api/v1/warehouses/logs         — 出入库记录
 
 权限对齐 seed.py — warehouse:product / warehouse:stock / warehouse:return / warehouse:records
 """
-from typing import Annotated
+import base64
+from datetime import datetime
+from typing import Annotated, Literal
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 
 from app.api.deps import get_current_user, require_permission
-from app.db.session import get_db
-from app.models.user import User
+from app.core.principal import Principal
+from app.db.session import get_db, get_read_db
 from app.models.warehouse import Warehouse
-from app.models.stock import Stock, StockLog
+from app.models.stock import Stock, StockLog, StockSnapshot
 from app.models.product import Product
 from app.models.after_sale import AfterSale
+from app.models.order import OrderItem
 from app.schemas.warehouse import WarehouseCreate, WarehouseUpdate, WarehouseOut
-from app.schemas.stock import StockOut, StockOperationRequest, StockLogOut
+from app.schemas.stock import (
+    StockOut, StockOperationRequest, StockBatchRequest, StockLogOut,
+    ReturnReceiveProduct, ReturnReceiveRequest,
+)
 from app.schemas.response import success_response, paginated_response
+from app.services import stock_history, stock_service
+from app.services.valuation import COLUMNS, valuation_engine
 
 router = APIRouter(prefix="/warehouses", tags=["仓储管理"])
 
@@ -32,8 +49,8 @@ router = APIRouter(prefix="/warehouses", tags=["仓储管理"])
 
 @router.get("")
 async def list_warehouses(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     result = await db.execute(select(Warehouse).where(Warehouse.is_deleted == False))
     items = result.scalars().all()
@@ -44,7 +61,7 @@ async def list_warehouses(
 async def create_warehouse(
     body: WarehouseCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:product"))],
+    _: Annotated[Principal, Depends(require_permission("warehouse:product"))],
 ):
     warehouse = Warehouse(name=body.name, address=body.address, is_default=body.isDefault)
     db.add(warehouse)
@@ -55,50 +72,73 @@ async def create_warehouse(
 # ========== 库存管理 ==========
 
 async def _get_stock_data(db: AsyncSession, page: int = 1, page_size: int = 100):
-    """内部方法: 获取库存数据 (按商品聚合)"""
-    result = await db.execute(
-        select(Product).where(Product.is_deleted == False).offset((page - 1) * page_size).limit(page_size)
+    """
+    内部方法: 获取库存数据 (按商品聚合)
+    单条语句: 商品分页子查询 LEFT JOIN stocks / warehouses, 按商品 GROUP BY,
+    各仓库存由 json_agg 聚合 — 不再逐个商品查询 stocks 并懒加载仓库
+    """
+    page_products = (
+        select(Product.id, Product.name, Product.spec, Product.status, Product.sort, Product.created_at)
+        .where(Product.is_deleted == False)
+        .order_by(Product.sort.asc(), Product.created_at.desc(), Product.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .subquery()
     )
-    products = result.scalars().all()
-
-    data = []
-    for p in products:
-        stock_res = await db.execute(select(Stock).where(Stock.product_id == p.id))
-        stocks = stock_res.scalars().all()
-
-        warehouse_stocks = []
-        total_current = 0
-        total_available = 0
-        warning_value = 50
-
-        for s in stocks:
-            warehouse_stocks.append({
-                "warehouseName": s.warehouse.name,
-                "current": s.current,
-                "available": s.available
-            })
-            total_current += s.current
-            total_available += s.available
-            warning_value = s.warning_value
-
-        data.append({
-            "id": p.id,
-            "productName": p.name,
-            "spec": p.spec,
-            "warehouseStocks": warehouse_stocks,
-            "currentStock": total_current,
-            "availableStock": total_available,
-            "warningValue": warning_value,
-            "status": p.status
-        })
-
-    return data
+    warehouse_stock = func.json_build_object(
+        "warehouseName", Warehouse.name,
+        "current", Stock.current,
+        "available", Stock.available,
+    )
+    query = (
+        select(
+            page_products.c.id,
+            page_products.c.name,
+            page_products.c.spec,
+            page_products.c.status,
+            func.coalesce(
+                func.json_agg(aggregate_order_by(warehouse_stock, Warehouse.name))
+                .filter(Stock.id.is_not(None)),
+                literal_column("'[]'::json"),
+            ).label("warehouse_stocks"),
+            func.coalesce(func.sum(Stock.current), 0).label("current"),
+            func.coalesce(func.sum(Stock.available), 0).label("available"),
+            func.coalesce(func.max(Stock.warning_value), 50).label("warning_value"),
+        )
+        .select_from(page_products)
+        .outerjoin(Stock, Stock.product_id == page_products.c.id)
+        .outerjoin(Warehouse, Warehouse.id == Stock.warehouse_id)
+        .group_by(
+            page_products.c.id,
+            page_products.c.name,
+            page_products.c.spec,
+            page_products.c.status,
+            page_products.c.sort,
+            page_products.c.created_at,
+        )
+        .order_by(page_products.c.sort.asc(), page_products.c.created_at.desc(), page_products.c.id)
+    )
+    result = await db.execute(query)
+
+    return [
+        {
+            "id": row.id,
+            "productName": row.name,
+            "spec": row.spec,
+            "warehouseStocks": row.warehouse_stocks,
+            "currentStock": row.current,
+            "availableStock": row.available,
+            "warningValue": row.warning_value,
+            "status": row.status,
+        }
+        for row in result
+    ]
 
 
 @router.get("/stock")
 async def list_stock(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:stock"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:stock"))],
     page: int = 1,
     page_size: int = 100,
 ):
@@ -109,8 +149,8 @@ async def list_stock(
 
 @router.get("/stocks")
 async def list_stocks(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:stock"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:stock"))],
     page: int = 1,
     page_size: int = 100,
 ):
@@ -119,96 +159,387 @@ async def list_stocks(
     return success_response(data=data)
 
 
+@router.get("/stock/as-of")
+async def stock_as_of(
+    at: datetime,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:records"))],
+    productId: str | None = None,
+    warehouseId: str | None = None,
+):
+    """
+    历史时点库存 — ?at=2026-03-31T23:59:59+08:00, 可按商品 / 仓库过滤
+    at 不带时区时按服务器本地时区解释; 晚于当前时间按当前时间计算
+    """
+    if at.tzinfo is None:
+        at = at.astimezone()
+    # 基准与日志须读自同一数据库快照
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    result = await stock_history.stock_as_of(db, at, productId, warehouseId)
+
+    product_ids = {p for p, _ in result.rows}
+    warehouse_ids = {w for _, w in result.rows}
+    products = dict((await db.execute(
+        select(Product.id, Product.name).where(Product.id.in_(product_ids))
+    )).all()) if product_ids else {}
+    warehouses = dict((await db.execute(
+        select(Warehouse.id, Warehouse.name).where(Warehouse.id.in_(warehouse_ids))
+    )).all()) if warehouse_ids else {}
+
+    items = [
+        {
+            "productId": p,
+            "productName": products.get(p, ""),
+            "warehouseId": w,
+            "warehouseName": warehouses.get(w, ""),
+            "current": current,
+        }
+        for (p, w), current in sorted(result.rows.items(), key=lambda kv: (products.get(kv[0][0], ""), warehouses.get(kv[0][1], "")))
+    ]
+    return success_response(data={
+        "asOf": result.at.isoformat(),
+        "base": result.base,
+        "baseAt": result.base_at.isoformat(),
+        "replayedLogs": result.replayed_logs,
+        "items": items,
+    })
+
+
+@router.get("/snapshots")
+async def list_snapshots(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:records"))],
+    page: int = 1,
+    page_size: int = 20,
+):
+    result = await db.execute(
+        select(StockSnapshot).order_by(StockSnapshot.taken_at.desc()).offset((page - 1) * page_size).limit(page_size)
+    )
+    total = (await db.execute(select(func.count()).select_from(StockSnapshot))).scalar()
+    data = [
+        {"id": s.id, "takenAt": s.taken_at.isoformat(), "rowCount": s.row_count, "totalQuantity": s.total_quantity}
+        for s in result.scalars()
+    ]
+    return paginated_response(data=data, total=total, page=page, page_size=page_size)
+
+
+@router.post("/snapshots")
+async def create_snapshot(
+    _: Annotated[Principal, Depends(require_permission("warehouse:stock"))],
+):
+    """立即拍摄库存快照 (拍摄期间短暂阻塞库存写入)"""
+    data = await stock_history.take_snapshot()
+    return success_response(data=data, message="快照已生成")
+
+
+@router.post("/reconciliation")
+async def run_reconciliation(
+    _: Annotated[Principal, Depends(require_permission("warehouse:records"))],
+):
+    """对账 — 返回实时库存与 "最新快照 + 之后日志" 不一致的 (商品, 仓库)"""
+    data = await stock_history.reconcile()
+    message = "对账一致" if not data["mismatches"] else f"发现 {len(data['mismatches'])} 处不一致"
+    return success_response(data=data, message=message)
+
+
+@router.get("/valuation")
+async def stock_valuation(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:records"))],
+    period: str | None = None,
+    method: Literal["wac", "fifo"] = "wac",
+    productId: str | None = None,
+    warehouseId: str | None = None,
+):
+    """
+    库存估值 — ?period=2026-03 (默认本月), method=wac (移动加权平均) / fifo (先进先出)
+    按 (商品, 仓库) 返回期初 / 入库 / 出库 (成本) / 期末的数量与金额
+    读主库: 结果会被缓存并作为后续增量计算的种子, 不能受复制延迟影响
+    """
+    period = period or datetime.now().strftime("%Y-%m")
+    try:
+        result = await valuation_engine.period(db, period)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="期间格式应为 YYYY-MM")
+
+    rows = result.totals.get(method, {})
+    if productId:
+        rows = {k: v for k, v in rows.items() if k[0] == productId}
+    if warehouseId:
+        rows = {k: v for k, v in rows.items() if k[1] == warehouseId}
+
+    product_ids = {p for p, _ in rows}
+    warehouse_ids = {w for _, w in rows}
+    products = dict((await db.execute(
+        select(Product.id, Product.name).where(Product.id.in_(product_ids))
+    )).all()) if product_ids else {}
+    warehouses = dict((await db.execute(
+        select(Warehouse.id, Warehouse.name).where(Warehouse.id.in_(warehouse_ids))
+    )).all()) if warehouse_ids else {}
+
+    items = []
+    summary = dict.fromkeys(COLUMNS, 0.0)
+    for (p, w), values in sorted(rows.items(), key=lambda kv: (products.get(kv[0][0], ""), warehouses.get(kv[0][1], ""))):
+        row = dict(zip(COLUMNS, (round(v, 2) for v in values)))
+        closing_qty = values[6]
+        row.update({
+            "productId": p,
+            "productName": products.get(p, ""),
+            "warehouseId": w,
+            "warehouseName": warehouses.get(w, ""),
+            "unitCost": round(values[7] / closing_qty, 4) if closing_qty > 0 else None,
+        })
+        items.append(row)
+        for name, v in zip(COLUMNS, values):
+            summary[name] += v
+
+    return success_response(data={
+        "period": result.period,
+        "method": method,
+        "closed": result.closed,
+        "computedThrough": datetime.fromtimestamp(result.running.at).astimezone().isoformat(),
+        "summary": {k: round(v, 2) for k, v in summary.items()},
+        "items": items,
+    })
+
+
+def _return_no(a: AfterSale) -> str:
+    return f"RT{a.id[:8]}"
+
+
+def _encode_cursor(created_at: datetime, id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+async def _order_items_by_order(db: AsyncSession, order_ids: set[str]) -> dict[str, list[OrderItem]]:
+    """一次 IN 查询取回全部订单明细, 按订单分组"""
+    grouped: dict[str, list[OrderItem]] = {}
+    if not order_ids:
+        return grouped
+    result = await db.execute(
+        select(OrderItem)
+        .where(OrderItem.order_id.in_(order_ids), OrderItem.is_deleted == False)
+        .order_by(OrderItem.order_id, OrderItem.created_at)
+    )
+    for item in result.scalars():
+        grouped.setdefault(item.order_id, []).append(item)
+    return grouped
+
+
 @router.get("/returns")
 async def list_returns(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:return"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:return"))],
+    status: Literal["pending", "completed"] | None = None,
+    cursor: str | None = None,
+    limit: int = 50,
 ):
-    """退货待入库列表 — 前端 return-stock.tsx 使用"""
+    """
+    退货待入库列表 — 前端 return-stock.tsx 使用
+    按创建时间倒序键集分页: 响应中的 nextCursor 作为下一页的 ?cursor=, 为空表示没有更多
+    商品明细通过一次 IN 查询批量取回
+    """
+    limit = max(1, min(limit, 200))
+    stmt = select(AfterSale).where(AfterSale.type == 'return', AfterSale.is_deleted == False)
+    if status == "pending":
+        stmt = stmt.where(AfterSale.status.in_(["pending", "approved"]))
+    elif status == "completed":
+        stmt = stmt.where(AfterSale.status.notin_(["pending", "approved"]))
+    if cursor:
+        created_at, last_id = _decode_cursor(cursor)
+        stmt = stmt.where(tuple_(AfterSale.created_at, AfterSale.id) < tuple_(created_at, last_id))
     result = await db.execute(
-        select(AfterSale).where(AfterSale.type == 'return', AfterSale.is_deleted == False)
+        stmt.order_by(AfterSale.created_at.desc(), AfterSale.id.desc()).limit(limit + 1)
     )
-    items = result.scalars().all()
+    rows = result.scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
+    items_by_order = await _order_items_by_order(db, {a.order_id for a in rows})
     data = []
-    for i in items:
+    for i in rows:
         data.append({
             "id": i.id,
-            "returnNo": f"RT{i.id[:8]}",
+            "returnNo": _return_no(i),
             "orderNo": i.order_no,
             "customerName": i.customer_name,
-            "products": [],  # 后续需连表 OrderItem 查询
+            "products": [
+                {"productId": it.product_id, "productName": it.product_name, "spec": it.spec, "quantity": it.quantity}
+                for it in items_by_order.get(i.order_id, [])
+            ],
             "reason": i.reason,
             "status": "pending" if i.status in ["pending", "approved"] else "completed",
             "createdAt": i.created_at.isoformat() if i.created_at else ""
         })
-    return success_response(data=data)
+    next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return success_response(data={"items": data, "nextCursor": next_cursor})
+
+
+@router.post("/returns/receive")
+async def receive_returns(
+    body: ReturnReceiveRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[Principal, Depends(require_permission("warehouse:return"))],
+):
+    """
+    退货入库 — 锁定退货单, 校验数量不超过订单明细, 经 stock_service.apply_batch
+    以 return 类型一次写入库存与日志, 并将退货单置为 completed; 全部在同一事务
+    严重损坏 (broken) 的商品只记入备注, 不增加库存
+    """
+    ids = [r.returnId for r in body.returns]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="退货单重复提交")
+    result = await db.execute(
+        select(AfterSale)
+        .where(AfterSale.id.in_(ids), AfterSale.type == "return", AfterSale.is_deleted == False)
+        .order_by(AfterSale.id)
+        .with_for_update()
+    )
+    by_id = {a.id: a for a in result.scalars()}
+    for rid in ids:
+        a = by_id.get(rid)
+        if a is None:
+            raise HTTPException(status_code=404, detail="退货单不存在")
+        if a.status not in ("pending", "approved"):
+            raise HTTPException(status_code=400, detail=f"退货单 {_return_no(a)} 已处理，不能重复入库")
+
+    items_by_order = await _order_items_by_order(db, {a.order_id for a in by_id.values()})
+    lines = []
+    not_restocked = []
+    for r in body.returns:
+        a = by_id[r.returnId]
+        ordered: dict[str, int] = {}
+        for it in items_by_order.get(a.order_id, []):
+            ordered[it.product_id] = ordered.get(it.product_id, 0) + it.quantity
+        products = r.products
+        if products is None:
+            products = [ReturnReceiveProduct(productId=p, quantity=q) for p, q in ordered.items()]
+
+        received: dict[str, int] = {}
+        for p in products:
+            if p.productId not in ordered:
+                raise HTTPException(status_code=400, detail=f"退货单 {_return_no(a)} 的订单不包含该商品")
+            received[p.productId] = received.get(p.productId, 0) + p.quantity
+            if received[p.productId] > ordered[p.productId]:
+                raise HTTPException(status_code=400, detail=f"退货单 {_return_no(a)} 入库数量超过订单数量")
+            if p.quantity == 0:
+                continue
+            if p.condition == "broken":
+                not_restocked.append({"returnId": a.id, "productId": p.productId, "quantity": p.quantity})
+                continue
+            remark = r.remark or body.remark
+            if p.condition == "damaged":
+                remark = f"轻微损坏; {remark}" if remark else "轻微损坏"
+            lines.append(stock_service.BatchLine(
+                type="return",
+                product_id=p.productId,
+                warehouse_id=body.warehouseId,
+                quantity=p.quantity,
+                related_no=_return_no(a),
+                remark=remark,
+            ))
+        a.status = "completed"
+
+    applied, results = await stock_service.apply_batch(db, lines, current_user.id, atomic=True)
+    failed = next((r for r in results if r.status == "failed"), None)
+    if failed is not None:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=failed.message or "退货入库失败")
+    await db.commit()
+    return success_response(
+        data={"returns": len(ids), "lines": len(lines), "notRestocked": not_restocked},
+        message="退货入库成功",
+    )
 
 
 @router.post("/operations")
 async def stock_operation(
     body: StockOperationRequest,
     db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[User, Depends(require_permission("warehouse:stock"))],
+    current_user: Annotated[Principal, Depends(require_permission("warehouse:stock"))],
 ):
-    """入库/出库/调库"""
-    stock_res = await db.execute(
-        select(Stock).where(Stock.product_id == body.productId, Stock.warehouse_id == body.warehouseId)
-    )
-    stock = stock_res.scalar_one_or_none()
-
-    if not stock:
-        if body.type == "in":
-            stock = Stock(product_id=body.productId, warehouse_id=body.warehouseId, current=0, available=0)
-            db.add(stock)
-        else:
-            raise HTTPException(400, "该仓库暂无该商品库存，无法操作")
-
-    if body.type == "in":
-        stock.current += body.quantity
-        stock.available += body.quantity
-    elif body.type == "out":
-        if stock.available < body.quantity:
-            raise HTTPException(400, "可用库存不足")
-        stock.current -= body.quantity
-        stock.available -= body.quantity
-    elif body.type == "transfer":
-        if stock.available < body.quantity:
-            raise HTTPException(400, "原仓库库存不足")
-        if not body.targetWarehouseId:
-            raise HTTPException(400, "必须指定目标仓库")
-
-        stock.current -= body.quantity
-        stock.available -= body.quantity
-
-        target_res = await db.execute(
-            select(Stock).where(Stock.product_id == body.productId, Stock.warehouse_id == body.targetWarehouseId)
+    """入库/出库/调库 — 原子条件更新, 并发出库不会超卖"""
+    try:
+        movement = await stock_service.apply_movement(
+            db,
+            type=body.type,
+            product_id=body.productId,
+            warehouse_id=body.warehouseId,
+            quantity=body.quantity,
+            operator_id=current_user.id,
+            unit_price=body.unitPrice,
+            target_warehouse_id=body.targetWarehouseId,
+            remark=body.remark,
         )
-        target_stock = target_res.scalar_one_or_none()
-        if not target_stock:
-            target_stock = Stock(product_id=body.productId, warehouse_id=body.targetWarehouseId, current=0, available=0)
-            db.add(target_stock)
-        target_stock.current += body.quantity
-        target_stock.available += body.quantity
-
-    log = StockLog(
-        product_id=body.productId,
-        warehouse_id=body.warehouseId,
-        type=body.type,
-        quantity=body.quantity,
-        unit_price=body.unitPrice,
-        operator_id=current_user.id,
-        remark=body.remark
-    )
-    db.add(log)
+    except stock_service.StockError as e:
+        raise HTTPException(400, e.message)
 
     await db.commit()
-    return success_response(message="操作成功")
+    return success_response(
+        data={"beforeStock": movement.before, "afterStock": movement.after},
+        message="操作成功",
+    )
+
+@router.post("/operations/batch")
+async def stock_operation_batch(
+    body: StockBatchRequest,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[Principal, Depends(require_permission("warehouse:stock"))],
+):
+    """
+    批量入库/出库/调库 — 整批一个事务, 返回逐行结果
+    atomic 模式下任一行失败返回 400, 库存不变
+    """
+    lines = [
+        stock_service.BatchLine(
+            type=item.type,
+            product_id=item.productId,
+            warehouse_id=item.warehouseId,
+            quantity=item.quantity,
+            unit_price=item.unitPrice,
+            target_warehouse_id=item.targetWarehouseId,
+            related_no=body.relatedNo,
+            remark=item.remark,
+        )
+        for item in body.lines
+    ]
+    atomic = body.mode == "atomic"
+    applied, results = await stock_service.apply_batch(db, lines, current_user.id, atomic=atomic)
+    failed = [r for r in results if r.status == "failed"]
+    data = {
+        "mode": body.mode,
+        "total": len(results),
+        "succeeded": sum(1 for r in results if r.ok),
+        "failed": len(failed),
+        "skipped": sum(1 for r in results if r.skipped),
+        "results": [r.to_dict() for r in results],
+    }
+    if atomic and failed:
+        await db.rollback()
+        first = failed[0]
+        more = f" 等 {len(failed)} 行失败" if len(failed) > 1 else ""
+        return JSONResponse(status_code=400, content={
+            "code": 400,
+            "message": f"第 {first.index + 1} 行: {first.message}{more}，整批未执行",
+            "data": data,
+        })
+    if applied:
+        await db.commit()
+    return success_response(data=data, message="操作成功" if not failed else "部分操作成功")
 
 @router.get("/logs")
 async def list_stock_logs(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permission("warehouse:records"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[Principal, Depends(require_permission("warehouse:records"))],
     page: int = 1,
     page_size: int = 20,
 ):
@@ -1,6 +1,7 @@
 """
 WebSocket 路由
-接入点: ws://<host>/api/v1/ws/connect?token=<jwt>
+接入点: ws://<host>/api/v1/ws/connect?token=<jwt>[&batch=true][&format=msgpack]
+统计:   GET /api/v1/ws/stats — 在线连接数 / 超时清扫计数 (settings:system)
 对齐 BACKEND_CONTEXT.md § 4.4, § 4.6
 
 IM 消息流:
@@ -12,223 +13,298 @@ IM 消息流:
     4. 群聊 → 转发给所有 member_ids (排除发送者)
     5. 回执给发送者 im.ack
 """
-import json
 import time
+from typing import Annotated
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Query
 from jose import JWTError
 from sqlalchemy import select
 
+from app.api.deps import require_permission
+from app.core.config import get_settings
+from app.core.invalidation import bus
+from app.core.principal import Principal
 from app.core.security import decode_access_token
+from app.core.tracing import start_trace
 from app.db.session import AsyncSessionLocal
 from app.models.user import User
 from app.models.im_conversation import IMConversation
 from app.models.im_message import IMMessage
-from app.services.ws_manager import manager
+from app.schemas.response import success_response
+from app.services.revocation import revocation_store
+from app.services.ws_manager import WS_FORMATS, WS_MESSAGES_RECEIVED, manager
+
+settings = get_settings()
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
 
+# 上行消息类型 — 指标标签只取已知值, 防止客户端任意 type 撑爆标签基数
+WS_MESSAGE_TYPES = frozenset({
+    "ping", "screen.v1.init", "screen.v2.init", "screen.ranking.init", "im.message",
+})
+
+# 发送者资料缓存: user_id -> (过期时间, sender_info) — 重连风暴时避免每次握手都查 users 表
+_profile_cache: dict[str, tuple[float, dict]] = {}
+_PROFILE_CACHE_MAX = 10000
+
+
+async def _get_sender_info(user_id: str) -> dict:
+    """读取消息冗余字段 (姓名/工号/部门/头像), 命中缓存时不访问数据库"""
+    now = time.monotonic()
+    cached = _profile_cache.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    sender_info = {"name": "", "ext": "", "dept": "", "avatar": ""}
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(User.name, User.employee_no, User.department, User.avatar)
+                .where(User.id == user_id)
+            )
+            row = result.one_or_none()
+    except Exception:
+        return sender_info
+
+    if row:
+        sender_info = {
+            "name": row.name or "",
+            "ext": row.employee_no or "",
+            "dept": row.department or "",
+            "avatar": row.avatar or "",
+        }
+        if len(_profile_cache) >= _PROFILE_CACHE_MAX:
+            _profile_cache.clear()
+        _profile_cache[user_id] = (now + settings.WS_PROFILE_CACHE_TTL, sender_info)
+    return sender_info
+
+
+def invalidate_sender_info(user_id: str | None = None):
+    """用户资料变更后清除缓存 (不传 user_id 时全部清除)"""
+    if user_id is None:
+        _profile_cache.clear()
+    else:
+        _profile_cache.pop(user_id, None)
+
+
+bus.subscribe("user", invalidate_sender_info)
+
 
 @router.websocket("/connect")
-async def ws_connect(websocket: WebSocket, token: str = Query(...)):
+async def ws_connect(
+    websocket: WebSocket,
+    token: str = Query(...),
+    batch: bool = Query(False),
+    fmt: str = Query("json", alias="format"),
+):
     """
     WebSocket 入口
     1. 握手阶段校验 JWT (Code 1008: Policy Violation)
     2. 互踢 (§ 4.6)
     3. 消息循环: 处理 ping / im.message / screen.*
+    batch=true 时启用帧合并: 同一 tick 内的多个事件合并为一个 batch 帧下发
+    format=msgpack 时下发 MessagePack 二进制帧, 入站帧文本 / 二进制均可
+    (Code 1003: 不支持的 format)
+    握手阶段受并发准入控制, 超限时以 1013 关闭, reason = "retry_after=<ms>"
     """
-    # === 鉴权 ===
-    try:
-        payload = decode_access_token(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            await websocket.close(code=1008)
-            return
-    except JWTError:
+    if fmt not in WS_FORMATS:
         await websocket.accept()
-        await websocket.close(code=1008)
+        await websocket.close(code=1003)
+        return
+
+    # === 握手准入 (重连风暴保护, Code 1013: Try Again Later, reason 携带建议重试延迟) ===
+    if not await manager.gate.acquire():
+        await websocket.accept()
+        await websocket.close(code=1013, reason=f"retry_after={manager.gate.retry_after_ms()}")
         return
 
-    # === 查询用户信息 (用于消息冗余字段) ===
-    sender_info = {"name": "", "ext": "", "dept": "", "avatar": ""}
     try:
-        async with AsyncSessionLocal() as db:
-            result = await db.execute(select(User).where(User.id == user_id))
-            user = result.scalar_one_or_none()
-            if user:
-                sender_info = {
-                    "name": user.name or "",
-                    "ext": user.employee_no or "",
-                    "dept": user.department or "",
-                    "avatar": user.avatar or "",
-                }
-    except Exception:
-        pass
+        # === 鉴权 ===
+        try:
+            payload = decode_access_token(token)
+            user_id = payload.get("sub")
+            if not user_id or revocation_store.is_revoked(payload):
+                await websocket.accept()
+                await websocket.close(code=1008)
+                return
+        except JWTError:
+            await websocket.accept()
+            await websocket.close(code=1008)
+            return
+
+        # === 查询用户信息 (用于消息冗余字段, 带 TTL 缓存) ===
+        sender_info = await _get_sender_info(user_id)
 
-    # === 建立连接 (含互踢) ===
-    await manager.connect(user_id, websocket)
+        # === 建立连接 (含互踢) ===
+        conn = await manager.connect(user_id, websocket, batch=batch, fmt=fmt)
+    finally:
+        manager.gate.release()
 
     try:
-        # 上线通知
-        await manager.broadcast(
-            "status.change",
-            {"userId": user_id, "status": "online"},
-            exclude=user_id,
-        )
+        # 上线通知 (风暴期延迟合并)
+        await manager.presence.announce(user_id, "online")
 
         # === 消息循环 ===
         while True:
-            raw = await websocket.receive_text()
-            msg = json.loads(raw)
+            msg = await conn.receive()
+            manager.touch(user_id)
             msg_type = msg.get("type", "")
+            label = msg_type if msg_type in WS_MESSAGE_TYPES else "other"
+            WS_MESSAGES_RECEIVED.inc(label)
 
             # 心跳
             if msg_type == "ping":
-                await websocket.send_json(manager._build_event("pong", {}))
+                await conn.send(manager._build_event("pong", {}))
                 continue
 
-            # 大屏初始数据请求
-            if msg_type == "screen.v1.init":
-                from app.services.screen_service import screen_service
-                data = await screen_service.get_v1_data()
-                await websocket.send_json(manager._build_event("screen.v1.update", data))
-                continue
-
-            if msg_type == "screen.v2.init":
-                from app.services.screen_service import screen_service
-                data = await screen_service.get_v2_data()
-                await websocket.send_json(manager._build_event("screen.v2.update", data))
-                continue
+            # 其余消息各自作为一条 trace 记录 (心跳过于频繁, 不记录)
+            with start_trace(f"ws {label}", user=user_id):
+                # 大屏初始数据请求
+                if msg_type == "screen.v1.init":
+                    from app.services.screen_service import screen_service
+                    data = await screen_service.get_v1_data()
+                    await conn.send(manager._build_event("screen.v1.update", data))
+                    continue
 
-            if msg_type == "screen.ranking.init":
-                from app.services.screen_service import screen_service
-                data = await screen_service.get_ranking_data()
-                await websocket.send_json(manager._build_event("screen.ranking.update", data))
-                continue
+                if msg_type == "screen.v2.init":
+                    from app.services.screen_service import screen_service
+                    data = await screen_service.get_v2_data()
+                    await conn.send(manager._build_event("screen.v2.update", data))
+                    continue
 
-            # ============================================================
-            # IM 消息转发 + 持久化
-            # ============================================================
-            if msg_type == "im.message":
-                data = msg.get("data", {})
-                conversation_id = data.get("conversationId", "")
-                content = data.get("content", "")
-                content_type = data.get("contentType", "text")
-                file_name = data.get("fileName")
-                file_size = data.get("fileSize")
-
-                if not conversation_id or not content:
+                if msg_type == "screen.ranking.init":
+                    from app.services.screen_service import screen_service
+                    data = await screen_service.get_ranking_data()
+                    await conn.send(manager._build_event("screen.ranking.update", data))
                     continue
 
-                # 查询会话信息 (判断私聊/群聊, 获取接收者列表)
-                conv = None
-                async with AsyncSessionLocal() as db:
-                    result = await db.execute(
-                        select(IMConversation).where(IMConversation.id == conversation_id)
-                    )
-                    conv = result.scalar_one_or_none()
-
-                if not conv:
-                    # 会话不存在, 跳过
-                    await websocket.send_json(manager._build_event("im.error", {
-                        "message": "会话不存在",
+                # ============================================================
+                # IM 消息转发 + 持久化
+                # ============================================================
+                if msg_type == "im.message":
+                    data = msg.get("data", {})
+                    conversation_id = data.get("conversationId", "")
+                    content = data.get("content", "")
+                    content_type = data.get("contentType", "text")
+                    file_name = data.get("fileName")
+                    file_size = data.get("fileSize")
+
+                    if not conversation_id or not content:
+                        continue
+
+                    # 查询会话信息 (判断私聊/群聊, 获取接收者列表)
+                    conv = None
+                    async with AsyncSessionLocal() as db:
+                        result = await db.execute(
+                            select(IMConversation).where(IMConversation.id == conversation_id)
+                        )
+                        conv = result.scalar_one_or_none()
+
+                    if not conv:
+                        # 会话不存在, 跳过
+                        await conn.send(manager._build_event("im.error", {
+                            "message": "会话不存在",
+                            "conversationId": conversation_id,
+                        }))
+                        continue
+
+                    scene = "group" if conv.type == "group" else "private"
+                    display_time = time.strftime("%H:%M", time.localtime())
+
+                    # 持久化到数据库
+                    msg_id = ""
+                    async with AsyncSessionLocal() as db:
+                        im_msg = IMMessage(
+                            conversation_id=conversation_id,
+                            sender_id=user_id,
+                            receiver_id=conversation_id,  # 统一用 conversation_id
+                            sender_name=sender_info["name"],
+                            sender_ext=sender_info["ext"],
+                            sender_dept=sender_info["dept"],
+                            sender_avatar=sender_info["avatar"],
+                            direction="sent",
+                            content=content,
+                            content_type=content_type,
+                            file_name=file_name,
+                            file_size=file_size,
+                            scene=scene,
+                            status="sent",
+                            display_time=display_time,
+                        )
+                        db.add(im_msg)
+
+                        # 更新会话的最后消息和时间
+                        conv_result = await db.execute(
+                            select(IMConversation).where(IMConversation.id == conversation_id)
+                        )
+                        conv_obj = conv_result.scalar_one_or_none()
+                        if conv_obj:
+                            # 群聊前缀显示发送者姓名
+                            if conv_obj.type == "group":
+                                conv_obj.last_message = f"{sender_info['name']}: {content[:50]}"
+                            else:
+                                conv_obj.last_message = content[:50]
+                            conv_obj.last_time = display_time
+
+                        await db.commit()
+                        msg_id = im_msg.id
+
+                    # 构建转发给接收者的消息体
+                    forward_payload = {
+                        "id": msg_id,
                         "conversationId": conversation_id,
-                    }))
-                    continue
+                        "senderId": user_id,
+                        "senderName": sender_info["name"],
+                        "senderExt": sender_info["ext"],
+                        "senderDept": sender_info["dept"],
+                        "senderAvatar": sender_info["avatar"],
+                        "direction": "received",  # 对接收方来说是 received
+                        "type": content_type,
+                        "content": content,
+                        "time": display_time,
+                        "fileName": file_name,
+                        "fileSize": file_size,
+                    }
 
-                scene = "group" if conv.type == "group" else "private"
-                display_time = time.strftime("%H:%M", time.localtime())
-
-                # 持久化到数据库
-                msg_id = ""
-                async with AsyncSessionLocal() as db:
-                    im_msg = IMMessage(
-                        conversation_id=conversation_id,
-                        sender_id=user_id,
-                        receiver_id=conversation_id,  # 统一用 conversation_id
-                        sender_name=sender_info["name"],
-                        sender_ext=sender_info["ext"],
-                        sender_dept=sender_info["dept"],
-                        sender_avatar=sender_info["avatar"],
-                        direction="sent",
-                        content=content,
-                        content_type=content_type,
-                        file_name=file_name,
-                        file_size=file_size,
-                        scene=scene,
-                        status="sent",
-                        display_time=display_time,
-                    )
-                    db.add(im_msg)
-
-                    # 更新会话的最后消息和时间
-                    conv_result = await db.execute(
-                        select(IMConversation).where(IMConversation.id == conversation_id)
-                    )
-                    conv_obj = conv_result.scalar_one_or_none()
-                    if conv_obj:
-                        # 群聊前缀显示发送者姓名
-                        if conv_obj.type == "group":
-                            conv_obj.last_message = f"{sender_info['name']}: {content[:50]}"
+                    # 根据会话类型转发
+                    if conv.type == "single":
+                        # 私聊: 找到对方用户 ID
+                        peer_id = None
+                        if conv.peer_user_id == user_id:
+                            peer_id = conv.created_by
                         else:
-                            conv_obj.last_message = content[:50]
-                        conv_obj.last_time = display_time
-
-                    await db.commit()
-                    msg_id = im_msg.id
-
-                # 构建转发给接收者的消息体
-                forward_payload = {
-                    "id": msg_id,
-                    "conversationId": conversation_id,
-                    "senderId": user_id,
-                    "senderName": sender_info["name"],
-                    "senderExt": sender_info["ext"],
-                    "senderDept": sender_info["dept"],
-                    "senderAvatar": sender_info["avatar"],
-                    "direction": "received",  # 对接收方来说是 received
-                    "type": content_type,
-                    "content": content,
-                    "time": display_time,
-                    "fileName": file_name,
-                    "fileSize": file_size,
-                }
-
-                # 根据会话类型转发
-                if conv.type == "single":
-                    # 私聊: 找到对方用户 ID
-                    peer_id = None
-                    if conv.peer_user_id == user_id:
-                        peer_id = conv.created_by
-                    else:
-                        peer_id = conv.peer_user_id
-
-                    if peer_id:
-                        await manager.send_personal(peer_id, "im.message", forward_payload)
-
-                elif conv.type == "group":
-                    # 群聊: 转发给所有成员 (排除发送者)
-                    member_ids = conv.member_ids or []
-                    for member_id in member_ids:
-                        if member_id != user_id:
-                            await manager.send_personal(member_id, "im.message", forward_payload)
-
-                # 回执给发送者
-                await websocket.send_json(manager._build_event("im.ack", {
-                    "messageId": msg_id,
-                    "conversationId": conversation_id,
-                    "status": "sent",
-                    "time": display_time,
-                }))
+                            peer_id = conv.peer_user_id
+
+                        if peer_id:
+                            await manager.send_personal(peer_id, "im.message", forward_payload)
+
+                    elif conv.type == "group":
+                        # 群聊: 转发给所有成员 (排除发送者)
+                        member_ids = conv.member_ids or []
+                        for member_id in member_ids:
+                            if member_id != user_id:
+                                await manager.send_personal(member_id, "im.message", forward_payload)
+
+                    # 回执给发送者
+                    await conn.send(manager._build_event("im.ack", {
+                        "messageId": msg_id,
+                        "conversationId": conversation_id,
+                        "status": "sent",
+                        "time": display_time,
+                    }))
 
     except WebSocketDisconnect:
         pass
     except Exception as e:
         print(f"[WS] Error for user {user_id}: {e}")
     finally:
-        manager.disconnect(user_id)
-        # 下线通知
-        await manager.broadcast(
-            "status.change",
-            {"userId": user_id, "status": "offline"},
-        )
+        manager.disconnect(user_id, conn)
+        # 下线通知 — 已被新连接互踢替换时用户仍在线, 不广播; 风暴期延迟合并
+        if not manager.is_online(user_id):
+            await manager.presence.announce(user_id, "offline")
+
+
+@router.get("/stats")
+async def ws_stats(_: Annotated[Principal, Depends(require_permission("settings:system"))]):
+    """连接数与心跳超时清扫统计"""
+    return success_response(data=manager.stats())
@@ -31,6 +31,89 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_DAYS: int = 7
 
+    # SQL 日志 (SQLAlchemy echo) — 与 DEBUG 解耦, 默认关闭
+    DB_ECHO: bool = False
+    # 每请求 SQL 统计: Server-Timing 头 / 调试日志 / N+1 检测 (同一语句形态重复 ≥ 阈值次)
+    SQL_INSTRUMENTATION: bool = True
+    SQL_REQUEST_LOG: bool = False
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # 事件循环延迟监控 — 采样周期 (秒) / 卡顿阈值 (毫秒) / 保留的卡顿堆栈条数
+    LOOP_MONITOR_INTERVAL: float = 0.1
+    LOOP_STALL_THRESHOLD_MS: int = 200
+    LOOP_STALL_HISTORY: int = 50
+
+    # 进程内请求追踪 — 环形缓冲保留最近 N 条 trace, 单条 trace 最多记录的 span 数
+    TRACING_ENABLED: bool = True
+    TRACE_BUFFER_SIZE: int = 200
+    TRACE_MAX_SPANS: int = 256
+    # 超过该耗时 (毫秒) 的 trace 打印到日志, 0 = 不打印
+    TRACE_LOG_SLOW_MS: int = 0
+
+    # 在线性能剖析 / tracemalloc 诊断接口 — 默认关闭, 开启后仍需 settings:system 权限
+    DEBUG_PROFILING_ENABLED: bool = False
+    DEBUG_PROFILE_MAX_SECONDS: int = 30
+
+    # 只读副本 — 为空时所有读请求走主库
+    DATABASE_REPLICA_URL: str | None = None
+    # 读己之写: 用户写入后该时长 (秒) 内的读请求固定走主库, 规避复制延迟
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # bcrypt 线程池 — 哈希 / 校验不占用事件循环; 排队超过上限时返回 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    # 登录时若哈希参数已过时 (如 rounds 调整) 则重新哈希并回写
+    PASSWORD_REHASH_ON_LOGIN: bool = True
+
+    # 鉴权主体缓存 (get_current_user) — LRU 容量 / TTL 秒
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: int = 60
+    # 令牌吊销布隆过滤器 — 预估容量 / 误判率 (误判只会多查一次内存精确集合)
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    # 缓存失效跨 worker 通道: local (仅进程内) / postgres (LISTEN/NOTIFY)
+    INVALIDATION_CHANNEL: str = "local"
+
+    # 订单库存预占 — 下单扣可用库存, 发货转出库; 超时未发货的预占由清扫任务按批回收
+    STOCK_RESERVATION_ENABLED: bool = True
+    STOCK_RESERVATION_TTL_HOURS: int = 72
+    STOCK_RESERVATION_SWEEP_INTERVAL: int = 60
+    STOCK_RESERVATION_SWEEP_BATCH: int = 500
+
+    # 库存快照 — 每 N 小时拍一次 stocks 紧凑快照 (拍摄期间短暂阻塞库存写入), 拍摄前先对账
+    STOCK_SNAPSHOT_ENABLED: bool = True
+    STOCK_SNAPSHOT_INTERVAL_HOURS: int = 24
+    STOCK_SNAPSHOT_CHECK_INTERVAL: int = 600
+
+    # 库存估值 (移动加权平均 / 先进先出) — 缓存的月份数; 缓存水位滞后 now 的秒数 (应远大于最长事务耗时,
+    # 窗口内的日志每次重新计算); 全量重算间隔
+    VALUATION_CACHE_PERIODS: int = 24
+    VALUATION_LATE_WINDOW_SECONDS: float = 900.0
+    VALUATION_REBUILD_HOURS: float = 24.0
+
+    # WebSocket 心跳超时 — 客户端 30s 发送 ping, 默认容忍错过两次
+    WS_HEARTBEAT_TIMEOUT: int = 75
+    WS_REAPER_TICK: float = 5.0
+    # 批量模式 (?batch=true) 帧合并窗口与单帧事件上限
+    WS_BATCH_TICK_MS: int = 20
+    WS_BATCH_MAX_EVENTS: int = 64
+    # 重连风暴保护 — 握手并发上限 / 排队等待 / 建议重试延迟 (1013 关闭码携带)
+    WS_HANDSHAKE_CONCURRENCY: int = 32
+    WS_HANDSHAKE_WAIT_MS: int = 500
+    WS_RETRY_BASE_MS: int = 1000
+    WS_RETRY_MAX_MS: int = 15000
+    # 窗口内握手数达到阈值视为风暴, 上下线广播延迟到平息后 settle 秒再合并发送
+    WS_STORM_THRESHOLD: int = 50
+    WS_STORM_WINDOW: float = 5.0
+    WS_PRESENCE_SETTLE: float = 3.0
+    # 握手时加载的发送者资料缓存 (秒)
+    WS_PROFILE_CACHE_TTL: int = 300
+    # permessage-deflate — 小于阈值 (字节) 的消息不压缩, 避免 pong / ack 等小帧白白消耗 CPU
+    WS_PER_MESSAGE_DEFLATE: bool = True
+    WS_DEFLATE_MIN_SIZE: int = 128
+    WS_DEFLATE_LEVEL: int = 6
+
     # CORS
     CORS_ORIGINS: list[str] = ["*"]
 
@@ -0,0 +1,131 @@
+"""
+缓存失效事件总线
+- 进程内: subscribe(topic, handler) 注册处理函数, publish(topic, key) 同步通知所有订阅者
+- 集群: 可挂载跨 worker 通道 (INVALIDATION_CHANNEL=postgres 时使用 PostgreSQL LISTEN/NOTIFY),
+        本 worker 发布的事件会广播给其他 worker, 收到后在本地重放
+主题约定:
+  user  — key = user_id, 用户资料 / 状态 / 角色变更
+  role  — key = role code, 角色权限变更 (key 为空表示全部)
+  revocation — key = 吊销条目 (见 services/revocation.py)
+  badge — key = 角标增量 JSON (见 services/order_workflow.py), 各 worker 推送给在线连接
+"""
+import asyncio
+import json
+import uuid
+from collections import defaultdict
+from typing import Callable, Protocol
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+Handler = Callable[[str | None], None]
+
+
+class InvalidationChannel(Protocol):
+    """跨 worker 广播通道接口 — 实现方负责把 payload 送达其他 worker 的 on_message"""
+
+    async def start(self, on_message: Callable[[str], None]) -> None: ...
+
+    async def publish(self, payload: str) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class PostgresNotifyChannel:
+    """基于 PostgreSQL LISTEN/NOTIFY 的广播通道 — 复用现有数据库, 无需额外中间件"""
+
+    CHANNEL = "netsale_invalidation"
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._conn = None
+        # asyncpg 单连接不允许并发执行语句
+        self._lock = asyncio.Lock()
+
+    async def start(self, on_message: Callable[[str], None]) -> None:
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(
+            self.CHANNEL, lambda _conn, _pid, _channel, payload: on_message(payload)
+        )
+
+    async def publish(self, payload: str) -> None:
+        if self._conn is None:
+            return
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.CHANNEL, payload)
+
+    async def stop(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+class InvalidationBus:
+    """失效事件总线 — 全局单例 bus"""
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+        self._remote_handlers: dict[str, list[Handler]] = defaultdict(list)
+        self.channel: InvalidationChannel | None = None
+
+    def subscribe(self, topic: str, handler: Handler, remote_only: bool = False):
+        """
+        注册处理函数
+        remote_only: 仅处理其他 worker 发来的事件 — 适用于发布方已在本地直接更新状态的场景
+        """
+        (self._remote_handlers if remote_only else self._handlers)[topic].append(handler)
+
+    def dispatch(self, topic: str, key: str | None = None, remote: bool = False):
+        """仅在本进程内通知订阅者"""
+        handlers = self._handlers.get(topic, [])
+        if remote:
+            handlers = handlers + self._remote_handlers.get(topic, [])
+        for handler in handlers:
+            try:
+                handler(key)
+            except Exception as e:
+                print(f"[Invalidation] handler error on {topic}: {e}")
+
+    async def publish(self, topic: str, key: str | None = None):
+        """本进程立即失效, 并通过集群通道通知其他 worker"""
+        self.dispatch(topic, key)
+        if self.channel is None:
+            return
+        payload = json.dumps({"o": self.origin, "t": topic, "k": key})
+        try:
+            await self.channel.publish(payload)
+        except Exception as e:
+            # 通道故障时其他 worker 依赖各自缓存 TTL 兜底
+            print(f"[Invalidation] publish failed: {e}")
+
+    def _on_remote(self, payload: str):
+        try:
+            msg = json.loads(payload)
+        except ValueError:
+            return
+        if msg.get("o") == self.origin:
+            return
+        self.dispatch(msg.get("t", ""), msg.get("k"), remote=True)
+
+    async def start(self, channel: InvalidationChannel | None = None):
+        """挂载集群通道 — 由 main.lifespan 调用; 未配置时只做进程内失效"""
+        if channel is None and settings.INVALIDATION_CHANNEL == "postgres":
+            channel = PostgresNotifyChannel(
+                settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+            )
+        if channel is None:
+            return
+        await channel.start(self._on_remote)
+        self.channel = channel
+
+    async def stop(self):
+        if self.channel is not None:
+            await self.channel.stop()
+            self.channel = None
+
+
+bus = InvalidationBus()
@@ -0,0 +1,189 @@
+"""
+进程内指标注册表 — Prometheus 文本格式, 无外部依赖
+- Counter / Gauge / Histogram, 标签值为元组, 按标签组合存储
+- Gauge 可注册回调 (set_function), 在导出时取值, 适合连接池 / WebSocket 等现成状态
+- MetricsMiddleware: 按路由模板记录 HTTP 请求数 / 耗时直方图 / 5xx 与异常
+导出: GET /metrics (main.py)
+多 worker 部署时每个 worker 独立计数, 由 Prometheus 按实例聚合
+"""
+import math
+import time
+from bisect import bisect_left
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._fn: Callable[[], float | dict[tuple, float]] | None = None
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_function(self, fn: Callable[[], float | dict[tuple, float]]):
+        """导出时调用 fn 取值 (已有状态直接暴露, 请求路径零开销); 有标签时 fn 返回 {标签元组: 值}"""
+        self._fn = fn
+        return self
+
+    def samples(self):
+        values = self._values
+        if self._fn is not None:
+            try:
+                result = self._fn()
+            except Exception:
+                return
+            values = result if isinstance(result, dict) else {(): result}
+        for labels, v in values.items():
+            yield self.name, labels, "", v
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def dec(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # 标签 -> [各桶计数 (非累计, 末位为 +Inf), sum, count]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                yield f"{self.name}_bucket", labels, f'le="{_format_value(bound)}"', cumulative
+            yield f"{self.name}_sum", labels, "", total
+            yield f"{self.name}_count", labels, "", count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, extra, value in metric.samples():
+                lines.append(
+                    f"{name}{_format_labels(metric.labelnames, labels, extra)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter(
+    "netsale_http_requests_total", "HTTP 请求数", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "netsale_http_request_duration_seconds", "HTTP 请求耗时", ("method", "route")
+)
+HTTP_ERRORS = registry.counter(
+    "netsale_http_request_errors_total", "HTTP 5xx 与未捕获异常", ("method", "route")
+)
+HTTP_IN_FLIGHT = registry.gauge("netsale_http_requests_in_flight", "处理中的 HTTP 请求")
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件 — 路由模板在路由匹配后写入 scope["route"], 未匹配的请求归为 <unmatched>"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, route)
+            HTTP_REQUESTS.inc(method, route, status_code)
+            if status_code >= 500:
+                HTTP_ERRORS.inc(method, route)
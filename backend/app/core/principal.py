@@ -0,0 +1,96 @@
+"""
+已认证主体 (Principal) 与进程内缓存
+get_current_user 每次请求都要解析 JWT 并查询 users (selectin 连带 role / permissions / role.users),
+这里把鉴权所需的最小信息冻结为 Principal, 按 user_id 做 LRU + TTL 缓存。
+失效: 订阅 invalidation.bus 的 user / role 主题, users.py 与 admin.update_role 写入后发布。
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import get_settings
+from app.core.invalidation import bus
+from app.core.metrics import registry
+
+settings = get_settings()
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """当前用户的鉴权视图 — 不持有 ORM 对象, 可安全跨请求共享"""
+    id: str
+    role: str
+    permissions: frozenset[str]
+    name: str
+    department: str | None = None
+
+    @property
+    def permission_list(self) -> list[str]:
+        """兼容 User.permission_list"""
+        return sorted(self.permissions)
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            role=user.role,
+            permissions=frozenset(user.permission_list),
+            name=user.name,
+            department=user.department,
+        )
+
+
+class PrincipalCache:
+    """
+    LRU + TTL 缓存: user_id -> Principal
+    - 命中时移动到队尾, 超过 maxsize 从队首淘汰
+    - TTL 兜底跨 worker 失效通道不可用的情况
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Principal | None:
+        entry = self._data.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[user_id]
+            self.misses += 1
+            return None
+        self._data.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, principal: Principal):
+        self._data[principal.id] = (time.monotonic() + self.ttl, principal)
+        self._data.move_to_end(principal.id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: str | None = None):
+        if user_id is None:
+            self._data.clear()
+        else:
+            self._data.pop(user_id, None)
+
+    def invalidate_role(self, role_code: str | None = None):
+        if role_code is None:
+            self._data.clear()
+            return
+        for uid in [uid for uid, (_, p) in self._data.items() if p.role == role_code]:
+            del self._data[uid]
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
+bus.subscribe("user", principal_cache.invalidate)
+bus.subscribe("role", principal_cache.invalidate_role)
+registry.counter("netsale_principal_cache_total", "鉴权主体缓存查询", ("result",)).set_function(
+    lambda: {("hit",): principal_cache.hits, ("miss",): principal_cache.misses}
+)
@@ -1,7 +1,13 @@
 """
 安全模块 — JWT Token 生成 / 验证 / 密码哈希
 对齐 BACKEND_CONTEXT.md § 4.5 认证流程
+- hash_password / verify_password: 同步版本, 供 seed 等脚本使用
+- password_hasher: 请求路径使用, bcrypt 在专用线程池执行, 不阻塞事件循环
 """
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -9,11 +15,14 @@ from jose import jwt, JWTError
 from passlib.context import CryptContext
 
 from app.core.config import get_settings
+from app.core.metrics import registry
 
 settings = get_settings()
 
-# 密码哈希
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密码哈希 — rounds 变化后旧哈希会被标记为需要更新 (needs_update)
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
 
 
 def hash_password(password: str) -> str:
@@ -24,10 +33,118 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasherBusyError(Exception):
+    """bcrypt 线程池排队已满"""
+
+
+class PasswordHasher:
+    """
+    有界 bcrypt 执行器
+    - 固定 PASSWORD_HASH_WORKERS 个线程 (bcrypt 释放 GIL, 可真正并行)
+    - 排队 + 执行中的任务超过 PASSWORD_HASH_MAX_PENDING 时立即拒绝, 避免登录高峰无限堆积
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+        self.pending = 0
+        self.completed_total = 0
+        self.rejected_total = 0
+        self.rehashed_total = 0
+        self.busy_seconds = 0.0
+        self.max_wait_ms = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected_total += 1
+            raise PasswordHasherBusyError()
+        self.pending += 1
+        submitted = time.perf_counter()
+
+        def _timed():
+            started = time.perf_counter()
+            result = fn(*args)
+            return started, time.perf_counter(), result
+
+        try:
+            loop = asyncio.get_running_loop()
+            started, finished, result = await loop.run_in_executor(self.executor, _timed)
+        finally:
+            self.pending -= 1
+        self.completed_total += 1
+        self.busy_seconds += finished - started
+        self.max_wait_ms = max(self.max_wait_ms, (started - submitted) * 1000)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """
+        校验密码, 返回 (是否通过, 新哈希)
+        PASSWORD_REHASH_ON_LOGIN 开启且旧哈希参数过时时, 新哈希非空, 调用方负责回写
+        """
+        if not settings.PASSWORD_REHASH_ON_LOGIN:
+            return await self._run(pwd_context.verify, password, hashed), None
+        ok, new_hash = await self._run(pwd_context.verify_and_update, password, hashed)
+        if new_hash:
+            self.rehashed_total += 1
+        return ok, new_hash
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "maxPending": self.max_pending,
+            "pending": self.pending,
+            "completedTotal": self.completed_total,
+            "rejectedTotal": self.rejected_total,
+            "rehashedTotal": self.rehashed_total,
+            "avgHashMs": round(self.busy_seconds / self.completed_total * 1000, 2)
+            if self.completed_total else 0,
+            "maxWaitMs": round(self.max_wait_ms, 2),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+registry.gauge("netsale_password_hash_pending", "bcrypt 排队 + 执行中").set_function(
+    lambda: password_hasher.pending
+)
+registry.counter("netsale_password_hash_total", "bcrypt 任务", ("result",)).set_function(
+    lambda: {
+        ("completed",): password_hasher.completed_total,
+        ("rejected",): password_hasher.rejected_total,
+    }
+)
+
+
 def create_access_token(subject: str, role: str, extra: dict[str, Any] | None = None) -> str:
-    """签发 JWT，Payload 包含 sub (user_id), role — 对齐 § 4.5"""
-    expire = datetime.now(timezone.utc) + timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
-    payload = {"sub": subject, "role": role, "exp": expire}
+    """
+    签发 JWT，Payload 包含 sub (user_id), role — 对齐 § 4.5
+    jti / iat 供 revocation_store 按令牌或签发时间吊销
+    """
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
+    payload = {
+        "sub": subject,
+        "role": role,
+        "exp": expire,
+        "iat": int(now.timestamp()),
+        "jti": str(uuid.uuid4()),
+    }
     if extra:
         payload.update(extra)
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -0,0 +1,233 @@
+"""
+进程内请求追踪
+- trace: 一次 HTTP 请求 (TracingMiddleware) 或一条 WebSocket 上行消息 (ws_connect) 为根
+- span: 通过 contextvar 自动挂到当前 span 下; 不在 trace 内时 span() 为空操作
+- 埋点: 鉴权 (deps) / CRUD / 每条 SQL (instrumentation) / WS 推送 (ws_manager)
+- 完成的 trace 进入环形缓冲 (TRACE_BUFFER_SIZE), 并交给已注册的 exporter
+导出: GET /api/v1/debug/traces — 最近 trace 中最慢的若干条, 以 span 树返回
+"""
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Protocol
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_trace_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children", "trace")
+
+    def __init__(self, name: str, attrs: dict, trace: "Trace", start: float | None = None):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter() if start is None else start
+        self.end: float | None = None
+        self.children: list[Span] = []
+        self.trace = trace
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def _children_covered_ms(self) -> float:
+        """子 span 时间区间的并集 — 并发子 span (gather) 不重复计算"""
+        covered, cur_start, cur_end = 0.0, None, None
+        for child in sorted(self.children, key=lambda c: c.start):
+            end = child.start + child.duration_ms / 1000
+            if cur_end is None or child.start > cur_end:
+                if cur_end is not None:
+                    covered += cur_end - cur_start
+                cur_start, cur_end = child.start, end
+            else:
+                cur_end = max(cur_end, end)
+        if cur_end is not None:
+            covered += cur_end - cur_start
+        return covered * 1000
+
+    def to_dict(self, origin: float) -> dict:
+        duration = self.duration_ms
+        return {
+            "name": self.name,
+            "startMs": round((self.start - origin) * 1000, 3),
+            "durationMs": round(duration, 3),
+            # 未被子 span 覆盖的时间 — 序列化 / 业务计算等
+            "selfMs": round(duration - self._children_covered_ms(), 3),
+            "attrs": self.attrs,
+            "children": [c.to_dict(origin) for c in self.children],
+        }
+
+
+class Trace:
+    __slots__ = ("id", "root", "started_at", "span_count", "dropped")
+
+    def __init__(self, name: str, attrs: dict):
+        self.id = next(_trace_ids)
+        self.started_at = time.time()
+        self.span_count = 1
+        self.dropped = 0
+        self.root = Span(name, attrs, self)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": self.id,
+            "name": self.root.name,
+            "startedAt": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            "durationMs": round(self.duration_ms, 3),
+            "spans": self.span_count,
+            "droppedSpans": self.dropped,
+            "root": self.root.to_dict(self.root.start),
+        }
+
+
+class TraceExporter(Protocol):
+    """trace 导出接口 — 在请求路径同步调用, 实现方需自行排队 / 批量发送, 不得阻塞"""
+
+    def export(self, trace: Trace) -> None: ...
+
+
+class SlowTraceLogExporter:
+    """超过阈值的 trace 打印摘要 (一行) 到日志"""
+
+    def __init__(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+
+    def export(self, trace: Trace) -> None:
+        if trace.duration_ms < self.threshold_ms:
+            return
+        top = sorted(trace.root.children, key=lambda s: s.duration_ms, reverse=True)[:3]
+        detail = ", ".join(f"{s.name} {s.duration_ms:.1f}ms" for s in top)
+        print(f"[Trace] slow {trace.root.name} {trace.duration_ms:.1f}ms ({detail})")
+
+
+class TraceRecorder:
+    """全局单例 recorder — 完成的 trace 环形缓冲 + exporter 分发"""
+
+    def __init__(self, size: int):
+        self.traces: deque[Trace] = deque(maxlen=size)
+        self.exporters: list[TraceExporter] = []
+
+    def add_exporter(self, exporter: TraceExporter):
+        self.exporters.append(exporter)
+
+    def record(self, trace: Trace):
+        self.traces.append(trace)
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                print(f"[Trace] exporter error: {e}")
+
+    def slowest(self, limit: int, min_ms: float = 0, name: str | None = None) -> list[Trace]:
+        candidates = [
+            t for t in list(self.traces)
+            if t.duration_ms >= min_ms and (name is None or name in t.root.name)
+        ]
+        candidates.sort(key=lambda t: t.duration_ms, reverse=True)
+        return candidates[:limit]
+
+
+recorder = TraceRecorder(settings.TRACE_BUFFER_SIZE)
+if settings.TRACE_LOG_SLOW_MS > 0:
+    recorder.add_exporter(SlowTraceLogExporter(settings.TRACE_LOG_SLOW_MS))
+
+_current_span: ContextVar[Span | None] = ContextVar("trace_current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """开启根 span; 已处于 trace 中时退化为普通 span"""
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    if _current_span.get() is not None:
+        with span(name, **attrs) as s:
+            yield s
+        return
+    trace = Trace(name, attrs)
+    token = _current_span.set(trace.root)
+    try:
+        yield trace.root
+    finally:
+        trace.root.end = time.perf_counter()
+        _current_span.reset(token)
+        recorder.record(trace)
+
+
+def _attach(parent: Span, name: str, attrs: dict, start: float | None = None) -> Span | None:
+    trace = parent.trace
+    if trace.span_count >= settings.TRACE_MAX_SPANS:
+        trace.dropped += 1
+        return None
+    trace.span_count += 1
+    child = Span(name, attrs, trace, start)
+    parent.children.append(child)
+    return child
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """子 span — 不在 trace 内或超过 TRACE_MAX_SPANS 时不记录"""
+    parent = _current_span.get()
+    child = _attach(parent, name, attrs) if parent is not None else None
+    if child is None:
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def record_span(name: str, start: float, end: float, **attrs):
+    """事后补记一个已结束的叶子 span (如 SQL 事件钩子中测得的耗时)"""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    child = _attach(parent, name, attrs, start)
+    if child is not None:
+        child.end = end
+
+
+class TracingMiddleware:
+    """纯 ASGI 中间件 — 每个 HTTP 请求一个 trace, 路由匹配后根 span 改名为路由模板"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        method = scope.get("method", "")
+        with start_trace(f"{method} {scope.get('path', '')}") as root:
+            status = {"code": 500}
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status["code"] = message["status"]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    root.name = f"{method} {route.path}"
+                root.attrs["status"] = status["code"]
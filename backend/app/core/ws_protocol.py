@@ -0,0 +1,68 @@
+"""
+WebSocket 协议层配置 — permessage-deflate 压缩阈值
+uvicorn 内置的 permessage-deflate 会压缩每一条消息, 包括十几字节的 pong / im.ack,
+压缩后体积几乎不变却要付出 zlib 的 CPU 开销。
+这里替换协商出的扩展: 小于 WS_DEFLATE_MIN_SIZE 的消息直接以未压缩帧发送 (RFC 7692 允许逐条选择)。
+仅在通过 `python -m app.main` 启动时生效 (uvicorn.run(ws=...))。
+"""
+from typing import Any
+
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+from websockets.frames import BINARY, TEXT, Frame
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """小消息不压缩的 permessage-deflate 扩展"""
+
+    def __init__(self, *args: Any, min_size: int = 0, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def encode(self, frame: Frame) -> Frame:
+        # 仅跳过单帧完整消息; 分片消息的续帧必须与首帧保持一致, 交给父类处理
+        if frame.opcode in (TEXT, BINARY) and frame.fin and len(frame.data) < self.min_size:
+            return frame
+        return super().encode(frame)
+
+
+class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    """协商逻辑沿用 websockets 默认实现, 只把生成的扩展替换为带阈值的版本"""
+
+    def __init__(self, min_size: int, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, ext = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdPerMessageDeflate(
+            ext.remote_no_context_takeover,
+            ext.local_no_context_takeover,
+            ext.remote_max_window_bits,
+            ext.local_max_window_bits,
+            ext.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+class NetSaleWebSocketProtocol(WebSocketProtocol):
+    """uvicorn websockets 协议实现 — 按 Settings 配置 permessage-deflate"""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        if settings.WS_PER_MESSAGE_DEFLATE:
+            self.available_extensions = [
+                ThresholdDeflateFactory(
+                    min_size=settings.WS_DEFLATE_MIN_SIZE,
+                    compress_settings={"level": settings.WS_DEFLATE_LEVEL, "memLevel": 5},
+                )
+            ]
+        else:
+            self.available_extensions = []
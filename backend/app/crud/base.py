@@ -8,6 +8,7 @@ from pydantic import BaseModel
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import span
 from app.db.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -25,10 +26,11 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.model = model
 
     async def get(self, db: AsyncSession, id: str) -> ModelType | None:
-        result = await db.execute(
-            select(self.model).where(self.model.id == id, self.model.is_deleted == False)
-        )
-        return result.scalar_one_or_none()
+        with span(f"crud.{self.model.__name__}.get"):
+            result = await db.execute(
+                select(self.model).where(self.model.id == id, self.model.is_deleted == False)
+            )
+            return result.scalar_one_or_none()
 
     async def get_multi(
         self,
@@ -47,15 +49,16 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 query = query.where(f)
                 count_query = count_query.where(f)
 
-        # 总条数
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
+        with span(f"crud.{self.model.__name__}.get_multi", page=page, page_size=page_size):
+            # 总条数
+            total_result = await db.execute(count_query)
+            total = total_result.scalar()
 
-        # 分页数据
-        offset = (page - 1) * page_size
-        query = query.order_by(self.model.created_at.desc()).offset(offset).limit(page_size)
-        result = await db.execute(query)
-        items = list(result.scalars().all())
+            # 分页数据
+            offset = (page - 1) * page_size
+            query = query.order_by(self.model.created_at.desc()).offset(offset).limit(page_size)
+            result = await db.execute(query)
+            items = list(result.scalars().all())
 
         return items, total
 
@@ -71,9 +74,10 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             snake_data[snake_key] = value
 
         db_obj = self.model(**snake_data)
-        db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        with span(f"crud.{self.model.__name__}.create"):
+            db.add(db_obj)
+            await db.commit()
+            await db.refresh(db_obj)
         return db_obj
 
     async def update(self, db: AsyncSession, *, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
@@ -83,18 +87,20 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             snake_key = self._to_snake_case(key)
             if hasattr(db_obj, snake_key):
                 setattr(db_obj, snake_key, value)
-        await db.commit()
-        await db.refresh(db_obj)
+        with span(f"crud.{self.model.__name__}.update"):
+            await db.commit()
+            await db.refresh(db_obj)
         return db_obj
 
     async def soft_delete(self, db: AsyncSession, *, id: str) -> bool:
         """软删除"""
-        obj = await self.get(db, id)
-        if obj:
-            obj.is_deleted = True
-            await db.commit()
-            return True
-        return False
+        with span(f"crud.{self.model.__name__}.soft_delete"):
+            obj = await self.get(db, id)
+            if obj:
+                obj.is_deleted = True
+                await db.commit()
+                return True
+            return False
 
     @staticmethod
     def _to_snake_case(name: str) -> str:
@@ -0,0 +1,147 @@
+"""
+每请求 SQL 统计
+- SQLAlchemy before/after_cursor_execute 事件记录每条语句耗时, 归集到 contextvar 中的 QueryStats
+- SQLInstrumentationMiddleware 为每个 HTTP 请求创建 QueryStats, 响应头追加 Server-Timing
+- 同一语句形态 (参数占位与 IN 列表归一化后) 在单个请求内重复 ≥ SQL_N_PLUS_ONE_THRESHOLD 次视为 N+1
+请求之外的语句 (后台任务) 只计入全局计数
+请求内的每条语句同时记为当前 trace 的 db span
+"""
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.core.metrics import registry
+from app.core.tracing import current_span, record_span
+
+settings = get_settings()
+
+_PARAM_LIST = re.compile(r"(\$\d+|%\(\w+\)s|\?)(\s*,\s*(\$\d+|%\(\w+\)s|\?))*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """归一化 SQL: 占位符 / IN 列表折叠为 ?, 空白压缩"""
+    return _WHITESPACE.sub(" ", _PARAM_LIST.sub("?", statement)).strip()
+
+
+class QueryStats:
+    __slots__ = ("count", "total_ms", "shapes", "shape_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter[str] = Counter()
+        self.shape_ms: Counter[str] = Counter()
+
+    def record(self, shape: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.shapes[shape] += 1
+        self.shape_ms[shape] += elapsed_ms
+
+    def repeated(self, threshold: int) -> list[tuple[str, int, float]]:
+        """N+1 候选: (语句形态, 次数, 累计耗时 ms)"""
+        return [
+            (shape, n, self.shape_ms[shape])
+            for shape, n in self.shapes.most_common()
+            if n >= threshold
+        ]
+
+
+current_stats: ContextVar[QueryStats | None] = ContextVar("sql_query_stats", default=None)
+
+# 全局计数 (含后台任务)
+totals = {"queries": 0, "ms": 0.0, "nPlusOneRequests": 0}
+registry.counter("netsale_db_queries_total", "执行的 SQL 语句数").set_function(
+    lambda: totals["queries"]
+)
+registry.counter("netsale_db_query_seconds_total", "SQL 累计耗时").set_function(
+    lambda: totals["ms"] / 1000
+)
+registry.counter("netsale_db_n_plus_one_requests_total", "疑似 N+1 的请求数").set_function(
+    lambda: totals["nPlusOneRequests"]
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_query_start")
+    if not starts:
+        return
+    start = starts.pop()
+    end = time.perf_counter()
+    elapsed_ms = (end - start) * 1000
+    totals["queries"] += 1
+    totals["ms"] += elapsed_ms
+    stats = current_stats.get()
+    if stats is None and current_span() is None:
+        return
+    shape = statement_shape(statement)
+    if stats is not None:
+        stats.record(shape, elapsed_ms)
+    record_span("db", start, end, sql=shape[:160])
+
+
+class SQLInstrumentationMiddleware:
+    """纯 ASGI 中间件 — 只处理 http 请求, WebSocket 直接透传"""
+
+    # 已报告过的 (路由, 语句形态), 避免同一 N+1 刷屏
+    _reported: set[tuple[str, str]] = set()
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and stats.count:
+                # 依赖清理 (会话关闭) 在响应开始前完成, 此时统计已完整
+                value = (
+                    f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries", '
+                    f"app;dur={(time.perf_counter() - started) * 1000:.1f}"
+                )
+                message.setdefault("headers", []).append((b"server-timing", value.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
+            self._report(scope, stats, (time.perf_counter() - started) * 1000)
+
+    def _report(self, scope, stats: QueryStats, elapsed_ms: float):
+        if not stats.count:
+            return
+        route = scope.get("route")
+        path = getattr(route, "path", scope.get("path", ""))
+        repeated = stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+        if settings.SQL_REQUEST_LOG:
+            print(f"[SQL] {scope.get('method')} {path} {stats.count} queries "
+                  f"{stats.total_ms:.1f}ms / {elapsed_ms:.1f}ms")
+        if not repeated:
+            return
+        totals["nPlusOneRequests"] += 1
+        for shape, n, ms in repeated:
+            key = (path, shape)
+            if key in self._reported:
+                continue
+            self._reported.add(key)
+            print(f"[SQL] N+1 suspected on {scope.get('method')} {path}: "
+                  f"{n}x {ms:.1f}ms — {shape[:200]}")
@@ -1,15 +1,27 @@
 """
 异步数据库会话管理
 使用 AsyncSession + asyncpg 连接池 — 对齐 BACKEND_CONTEXT.md § 2
+- get_db 注入 LazySession: 首次使用时才创建 AsyncSession, 首条语句执行时才从连接池取连接
+- LazySession.release(): 只读阶段结束后立即归还连接 (例如查询完成后还要等待 bcrypt / 外部调用)
+- get_read_db: 只读接口使用; 配置 DATABASE_REPLICA_URL 时路由到副本,
+               用户写入后 READ_YOUR_WRITES_SECONDS 内固定走主库 (读己之写)
 """
+import time
+
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+
 from app.core.config import get_settings
+from app.core.invalidation import bus
+from app.core.metrics import registry
 
 settings = get_settings()
 
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=settings.DEBUG,
+    echo=settings.DB_ECHO,
     pool_size=20,
     max_overflow=10,
     pool_pre_ping=True,
@@ -21,11 +33,176 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+replica_engine = (
+    create_async_engine(
+        settings.DATABASE_REPLICA_URL,
+        echo=settings.DB_ECHO,
+        pool_size=20,
+        max_overflow=10,
+        pool_pre_ping=True,
+    )
+    if settings.DATABASE_REPLICA_URL
+    else None
+)
+
+ReplicaSessionLocal = (
+    async_sessionmaker(bind=replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine is not None
+    else AsyncSessionLocal
+)
+
+
+class ReadYourWrites:
+    """user_id -> 固定走主库的截止时间 (monotonic)"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._pins: dict[str, float] = {}
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def pin(self, user_id: str | None):
+        if not user_id:
+            return
+        now = time.monotonic()
+        self._pins[user_id] = now + self.window
+        # 顺带清理过期条目, 避免字典无限增长
+        if len(self._pins) > 1024:
+            self._pins = {uid: t for uid, t in self._pins.items() if t > now}
+
+    def is_pinned(self, user_id: str | None) -> bool:
+        if not user_id:
+            return False
+        deadline = self._pins.get(user_id)
+        return deadline is not None and deadline > time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "replicaConfigured": replica_engine is not None,
+            "pinned": sum(1 for t in self._pins.values() if t > time.monotonic()),
+            "primaryReads": self.primary_reads,
+            "replicaReads": self.replica_reads,
+        }
+
+
+read_your_writes = ReadYourWrites(settings.READ_YOUR_WRITES_SECONDS)
+
+
+def _pool_stats(attr: str) -> dict[tuple, float]:
+    engines = {"primary": engine, "replica": replica_engine}
+    return {
+        (name,): getattr(e.pool, attr)()
+        for name, e in engines.items()
+        if e is not None and hasattr(e.pool, attr)
+    }
+
+
+registry.gauge("netsale_db_pool_size", "连接池容量", ("engine",)).set_function(
+    lambda: _pool_stats("size")
+)
+registry.gauge("netsale_db_pool_checked_out", "已借出连接", ("engine",)).set_function(
+    lambda: _pool_stats("checkedout")
+)
+registry.gauge("netsale_db_pool_overflow", "溢出连接 (超出 pool_size 的部分)", ("engine",)).set_function(
+    # QueuePool.overflow() 以 -pool_size 为起点计数
+    lambda: {k: max(0, v) for k, v in _pool_stats("overflow").items()}
+)
+registry.counter("netsale_db_reads_total", "get_read_db 路由结果", ("target",)).set_function(
+    lambda: {
+        ("primary",): read_your_writes.primary_reads,
+        ("replica",): read_your_writes.replica_reads,
+    }
+)
+# 其他 worker 上的写入同样需要固定 (请求可能被负载均衡到任意 worker)
+bus.subscribe("rw_pin", read_your_writes.pin)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush_write(session, _flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_dml_write(orm_execute_state):
+    # session.execute(update(...)) 等 DML 不经过 flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+class LazySession:
+    """
+    AsyncSession 代理 — 按需创建, 其余属性全部透传
+    依赖 get_db 的接口若命中缓存或提前返回 (鉴权失败等), 不会构造会话也不会占用连接
+    """
+    __slots__ = ("_factory", "_session")
+
+    def __init__(self, factory: async_sessionmaker = AsyncSessionLocal):
+        self._factory = factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    async def release(self):
+        """
+        结束只读事务并归还连接, 会话仍可继续使用 (下一条语句重新取连接)
+        用 commit 而非 rollback: expire_on_commit=False, 已加载的对象不会过期;
+        会话发生过写入时不做任何处理: flush 或 Core DML (session.execute(update(...))) 之后
+        new / dirty / deleted 均为空, 只能以 info["wrote"] 判断, 避免替调用方提交写了一半的事务
+        """
+        session = self._session
+        if session is None or not session.in_transaction():
+            return
+        if session.info.get("wrote") or session.new or session.dirty or session.deleted:
+            return
+        await session.commit()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+async def get_db(request: Request) -> AsyncSession:
+    """FastAPI 依赖注入 — 提供数据库会话 (LazySession, 接口与 AsyncSession 一致)"""
+    session = LazySession()
+    try:
+        yield session
+    finally:
+        wrote = session.started and session.info.get("wrote", False)
+        await session.close()
+        # 有写入时固定该用户的后续读请求到主库 (user_id 由 get_current_user 写入 request.state)
+        user_id = getattr(request.state, "user_id", None)
+        if wrote and user_id and replica_engine is not None:
+            await bus.publish("rw_pin", user_id)
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    只读接口的数据库会话
+    路由在首次使用时决定 — 此时鉴权依赖已执行, request.state.user_id 可用
+    """
+    def _factory() -> AsyncSession:
+        if replica_engine is None or read_your_writes.is_pinned(
+            getattr(request.state, "user_id", None)
+        ):
+            read_your_writes.primary_reads += 1
+            return AsyncSessionLocal()
+        read_your_writes.replica_reads += 1
+        return ReplicaSessionLocal()
 
-async def get_db() -> AsyncSession:
-    """FastAPI 依赖注入 — 提供数据库会话"""
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+    session = LazySession(_factory)
+    try:
+        yield session
+    finally:
+        await session.close()
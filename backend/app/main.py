@@ -5,11 +5,15 @@ FastAPI 应用入口
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.tracing import TracingMiddleware
 from app.api.v1.router import v1_router
-from app.db.session import engine
+from app.db.instrumentation import SQLInstrumentationMiddleware
+from app.db.session import engine, replica_engine
 from app.db.base import Base
 
 settings = get_settings()
@@ -23,7 +27,17 @@ async def lifespan(app: FastAPI):
         # 导入所有模型确保注册到 Base.metadata
         import app.models  # noqa
         await conn.run_sync(Base.metadata.create_all)
-    
+
+    # 角色权限索引 — require_permission 只查内存
+    from app.services.permission_index import permission_index
+    await permission_index.load()
+    # 令牌吊销表 — 布隆过滤器 + 精确集合
+    from app.services.revocation import revocation_store
+    await revocation_store.load()
+    # 低库存预警状态 — 已低于预警值的行不重复通知
+    from app.services.stock_alerts import stock_alerts
+    await stock_alerts.load()
+
     # 启动大屏数据定时推送逻辑
     import asyncio
     from app.services.screen_service import screen_service
@@ -36,10 +50,42 @@ async def lifespan(app: FastAPI):
             await asyncio.sleep(10) # 每 10s 推送一次
             
     update_task = asyncio.create_task(periodic_updates())
-    
+
+    # 心跳超时清扫 (时间轮, 全进程一个任务)
+    from app.services.ws_manager import manager
+    reaper_task = asyncio.create_task(manager.run_reaper())
+
+    # 过期库存预占回收
+    from app.services.reservation_service import reservation_sweeper
+    sweeper_task = asyncio.create_task(reservation_sweeper.run())
+
+    # 每日库存快照 (拍摄前先对账)
+    snapshot_task = None
+    if settings.STOCK_SNAPSHOT_ENABLED:
+        from app.services.stock_history import snapshot_scheduler
+        snapshot_task = asyncio.create_task(snapshot_scheduler.run())
+
+    # 事件循环延迟监控 (探针协程 + 看门狗线程)
+    from app.services.loop_monitor import loop_monitor
+    loop_monitor.start()
+
+    # 缓存失效总线 — 多 worker 部署时挂载跨进程通道
+    from app.core.invalidation import bus
+    await bus.start()
+
     yield
     update_task.cancel()
+    reaper_task.cancel()
+    sweeper_task.cancel()
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+    loop_monitor.stop()
+    await bus.stop()
+    from app.core.security import password_hasher
+    password_hasher.shutdown()
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 
 app = FastAPI(
@@ -60,6 +106,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 每请求 SQL 统计 (Server-Timing / N+1 检测)
+app.add_middleware(SQLInstrumentationMiddleware)
+# 请求指标 (路由模板维度的耗时直方图 / 错误计数)
+app.add_middleware(MetricsMiddleware)
+# 请求追踪 (span 树, /api/v1/debug/traces)
+app.add_middleware(TracingMiddleware)
+
 # 注册路由
 app.include_router(v1_router)
 
@@ -67,3 +120,24 @@ app.include_router(v1_router)
 @app.get("/health", tags=["系统"])
 async def health_check():
     return {"status": "ok", "app": settings.APP_NAME}
+
+
+@app.get("/metrics", tags=["系统"], include_in_schema=False)
+async def metrics():
+    """Prometheus 文本格式指标 (本 worker)"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    # 通过 python -m app.main 启动, 以便挂载自定义 WebSocket 协议 (permessage-deflate 阈值)
+    import uvicorn
+    from app.core.ws_protocol import NetSaleWebSocketProtocol
+
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=settings.DEBUG,
+        ws=NetSaleWebSocketProtocol,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
+    )
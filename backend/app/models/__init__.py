@@ -8,11 +8,12 @@ from app.models.im_message import IMMessage
 from app.models.im_conversation import IMConversation
 from app.models.admin_model import Department, IpWhitelist, LogisticsCompany, SensitiveWord
 from app.models.report import DailyReport
+from app.models.revoked_token import RevokedToken
 
 __all__ = [
     "User", "Role", "Permission", "role_permissions",
     "Customer", "Product", "Order", "OrderItem",
     "AfterSale", "Notification", "IMMessage", "IMConversation",
     "Department", "IpWhitelist", "LogisticsCompany", "SensitiveWord",
-    "DailyReport",
+    "DailyReport", "RevokedToken",
 ]
@@ -2,7 +2,7 @@
 售后 ORM 模型
 对齐前端 types/index.ts: AfterSale
 """
-from sqlalchemy import String, ForeignKey, Text, ARRAY
+from sqlalchemy import String, ForeignKey, Text, ARRAY, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import ARRAY as PG_ARRAY
 
@@ -18,6 +18,10 @@ class AfterSale(Base, AuditMixin):
     状态枚举: pending | approved | rejected | completed
     """
     __tablename__ = "after_sales"
+    __table_args__ = (
+        # 退货入库列表按 (created_at, id) 键集分页
+        Index("ix_after_sales_type_created", "type", "created_at", "id"),
+    )
 
     order_id: Mapped[str] = mapped_column(String(36), ForeignKey("orders.id"), nullable=False)
     order_no: Mapped[str] = mapped_column(String(30), nullable=False, comment="冗余订单编号")
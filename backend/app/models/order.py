@@ -3,11 +3,16 @@
 对齐前端 types/index.ts: Order, OrderItem
 """
 from datetime import datetime
-from sqlalchemy import String, Float, Integer, Boolean, ForeignKey, Text, DateTime
+from sqlalchemy import String, Float, Integer, Boolean, ForeignKey, Text, DateTime, Sequence
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base, AuditMixin
 
+# 订单号序列 — 每次 nextval 领取一段 ORDER_NO_BLOCK_SIZE 个号码, 由各 worker 在内存中顺序发放
+# (见 app/services/order_numbers.py). 步长建表时固定, 调整需 ALTER SEQUENCE
+ORDER_NO_BLOCK_SIZE = 100
+order_no_seq = Sequence("order_no_seq", increment=ORDER_NO_BLOCK_SIZE, start=1, metadata=Base.metadata)
+
 
 class OrderItem(Base, AuditMixin):
     """
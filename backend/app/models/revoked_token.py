@@ -0,0 +1,29 @@
+"""
+令牌吊销 ORM 模型
+两类记录:
+- 单个令牌: jti 非空 — 主动登出等, expires_at 为令牌原过期时间, 过期后可清理
+- 用户级: jti 为空 — issued_before 之前签发的该用户令牌全部失效; issued_before 为空表示全部 (账号禁用)
+"""
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base, AuditMixin
+
+
+class RevokedToken(Base, AuditMixin):
+    """吊销记录 — 启动时加载到 revocation_store (布隆过滤器 + 精确集合)"""
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[str | None] = mapped_column(
+        String(36), nullable=True, unique=True, comment="令牌ID (JWT jti)"
+    )
+    user_id: Mapped[str] = mapped_column(String(36), nullable=False, index=True)
+    issued_before: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, comment="用户级: 早于此时间签发的令牌失效, 空=全部"
+    )
+    expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, comment="令牌级: 原令牌过期时间"
+    )
+    reason: Mapped[str] = mapped_column(String(50), default="", comment="logout/disabled/...")
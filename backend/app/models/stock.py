@@ -1,4 +1,6 @@
-from sqlalchemy import String, Float, Integer, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import String, Float, Integer, ForeignKey, UniqueConstraint, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base, AuditMixin
@@ -8,6 +10,10 @@ class Stock(Base, AuditMixin):
     库存明细模型 (具体到每个仓库每个商品)
     """
     __tablename__ = "stocks"
+    __table_args__ = (
+        # 每个 (商品, 仓库) 仅一行 — 入库 upsert 的冲突目标; 唯一索引同时服务库存概览的分组连接
+        UniqueConstraint("product_id", "warehouse_id", name="uq_stocks_product_warehouse"),
+    )
 
     product_id: Mapped[str] = mapped_column(String(36), ForeignKey("products.id"), nullable=False)
     warehouse_id: Mapped[str] = mapped_column(String(36), ForeignKey("warehouses.id"), nullable=False)
@@ -25,6 +31,10 @@ class StockLog(Base, AuditMixin):
     出入库记录模型
     """
     __tablename__ = "stock_logs"
+    __table_args__ = (
+        # 历史时点库存按时间窗口回放日志
+        Index("ix_stock_logs_created_at", "created_at"),
+    )
 
     product_id: Mapped[str] = mapped_column(String(36), ForeignKey("products.id"), nullable=False)
     warehouse_id: Mapped[str] = mapped_column(String(36), ForeignKey("warehouses.id"), nullable=False)
@@ -46,3 +56,50 @@ class StockLog(Base, AuditMixin):
     warehouse: Mapped["Warehouse"] = relationship("Warehouse", foreign_keys=[warehouse_id], lazy="selectin")
     target_warehouse: Mapped["Warehouse | None"] = relationship("Warehouse", foreign_keys=[target_warehouse_id], lazy="selectin")
     operator: Mapped["User"] = relationship("User", lazy="selectin")
+
+
+class StockReservation(Base, AuditMixin):
+    """
+    库存预占记录 — 下单时从 Stock.available 扣除, 发货时转为实际出库 (扣 current)
+    状态: active (占用中) / converted (已发货) / released (取消/驳回释放) / expired (超时回收)
+    """
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # 过期清扫按 (status, expires_at) 取批
+        Index("ix_stock_reservations_status_expires", "status", "expires_at"),
+    )
+
+    order_id: Mapped[str] = mapped_column(String(36), ForeignKey("orders.id"), nullable=False, index=True)
+    product_id: Mapped[str] = mapped_column(String(36), ForeignKey("products.id"), nullable=False)
+    warehouse_id: Mapped[str] = mapped_column(String(36), ForeignKey("warehouses.id"), nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False, comment="预占数量")
+    status: Mapped[str] = mapped_column(String(20), default="active", comment="active/converted/released/expired")
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, comment="预占过期时间")
+
+class StockSnapshot(Base, AuditMixin):
+    """
+    库存快照头 — 某一时刻 stocks.current 的紧凑副本 (明细只保存非零行)
+    历史时点库存 = 最近快照 ± 两者之间的 StockLog
+    """
+    __tablename__ = "stock_snapshots"
+
+    taken_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, unique=True, comment="快照时点"
+    )
+    row_count: Mapped[int] = mapped_column(Integer, default=0, comment="明细行数")
+    total_quantity: Mapped[int] = mapped_column(Integer, default=0, comment="库存总量")
+
+
+class StockSnapshotItem(Base, AuditMixin):
+    """库存快照明细 — 只追加不修改"""
+    __tablename__ = "stock_snapshot_items"
+    __table_args__ = (
+        Index("ix_stock_snapshot_items_lookup", "snapshot_id", "product_id", "warehouse_id"),
+    )
+
+    snapshot_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("stock_snapshots.id", ondelete="CASCADE"), nullable=False
+    )
+    product_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    warehouse_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    current: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -2,7 +2,9 @@
 订单 Pydantic Schema
 对齐前端 types/index.ts: Order, OrderItem
 """
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 class OrderItemCreate(BaseModel):
@@ -58,6 +60,12 @@ class OrderUpdate(BaseModel):
     signedAt: str | None = None
 
 
+class OrderBatchStatus(BaseModel):
+    """批量状态流转 — 每个订单只能从 status 的前一状态推进 (见 services/order_workflow.py)"""
+    ids: list[str] = Field(min_length=1, max_length=5000)
+    status: Literal["finance_pending", "approved", "shipped", "signed"]
+
+
 class OrderOut(BaseModel):
     """
     对齐前端 Order 接口
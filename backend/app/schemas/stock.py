@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Any
+from pydantic import BaseModel, Field
+from typing import Any, Literal
 
 class StockBase(BaseModel):
     productId: str
@@ -26,6 +26,28 @@ class StockOperationRequest(BaseModel):
     targetWarehouseId: str | None = None # for transfer
     remark: str | None = None
 
+class StockBatchRequest(BaseModel):
+    """批量出入库 — mode: atomic (任一行失败整批不执行) / best_effort (跳过失败行)"""
+    mode: Literal["atomic", "best_effort"] = "atomic"
+    lines: list[StockOperationRequest] = Field(min_length=1, max_length=2000)
+    relatedNo: str | None = None  # 整批共用的关联单号 (如采购单号)
+
+class ReturnReceiveProduct(BaseModel):
+    productId: str
+    quantity: int = Field(ge=0)
+    condition: Literal["good", "damaged", "broken"] = "good"  # broken 不入可售库存
+
+class ReturnReceiveItem(BaseModel):
+    returnId: str
+    products: list[ReturnReceiveProduct] | None = None  # 为空时按订单明细全部入库
+    remark: str | None = None
+
+class ReturnReceiveRequest(BaseModel):
+    """退货入库 — 一次可提交多张退货单, 库存 / 日志 / 退货单状态同一事务"""
+    warehouseId: str
+    returns: list[ReturnReceiveItem] = Field(min_length=1, max_length=200)
+    remark: str | None = None
+
 class StockLogOut(BaseModel):
     id: str
     productId: str
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
 
 class WarehouseBase(BaseModel):
     name: str
@@ -15,6 +15,8 @@ class WarehouseUpdate(BaseModel):
 
 class WarehouseOut(WarehouseBase):
     id: str
+    # ORM 字段为 is_default
+    isDefault: bool = Field(default=False, validation_alias=AliasChoices("is_default", "isDefault"))
 
     class Config:
         from_attributes = True
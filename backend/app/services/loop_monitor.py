@@ -0,0 +1,124 @@
+"""
+事件循环延迟监控 + 阻塞调用检测
+- 探针协程: 每 LOOP_MONITOR_INTERVAL 秒 sleep 一次, 实际唤醒时间与预期之差即循环延迟, 写入直方图
+- 看门狗线程: 探针心跳超过 LOOP_STALL_THRESHOLD_MS 未更新, 说明循环正被同步代码占用,
+             通过 sys._current_frames() 抓取事件循环线程当前堆栈 (即阻塞点), 存入环形缓冲
+- 卡顿结束后由探针回填实际持续时长
+导出: /metrics (netsale_event_loop_*) 与 GET /api/v1/debug/loop
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from app.core.config import get_settings
+from app.core.metrics import registry
+
+settings = get_settings()
+
+LOOP_LAG = registry.histogram(
+    "netsale_event_loop_lag_seconds",
+    "事件循环调度延迟",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = registry.counter("netsale_event_loop_stalls_total", "超过阈值的事件循环卡顿")
+
+
+class LoopMonitor:
+    """全局单例 loop_monitor — 由 main.lifespan 启停"""
+
+    def __init__(self, interval: float, threshold_ms: int, history: int):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.stalls: deque[dict] = deque(maxlen=history)
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._beat = time.monotonic()
+        self._open_stall: dict | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._probe())
+        self._thread = threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _probe(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._beat = now
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+            stall = self._open_stall
+            if stall is not None:
+                # 看门狗已抓取堆栈, 回填卡顿实际时长
+                stall["durationMs"] = round(lag * 1000, 1)
+                self._open_stall = None
+
+    def _watchdog(self):
+        check = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(check):
+            stalled_for = time.monotonic() - self._beat - self.interval
+            if stalled_for < self.threshold or self._open_stall is not None:
+                continue
+            self._open_stall = self._capture(stalled_for)
+            self.stalls.append(self._open_stall)
+            LOOP_STALLS.inc()
+
+    def _capture(self, stalled_for: float) -> dict:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        task_name = None
+        try:
+            # 跨线程读取当前任务仅用于诊断, 允许偶发不一致
+            task = asyncio.tasks._current_tasks.get(self._loop)
+            if task is not None:
+                task_name = task.get_name()
+                coro = task.get_coro()
+                task_name = f"{task_name} ({getattr(coro, '__qualname__', coro)})"
+        except Exception:
+            pass
+        return {
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "detectedAfterMs": round(stalled_for * 1000, 1),
+            "durationMs": None,
+            "task": task_name,
+            "stack": [line.rstrip() for line in stack],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "intervalMs": self.interval * 1000,
+            "thresholdMs": self.threshold * 1000,
+            "lastLagMs": round(self.last_lag * 1000, 2),
+            "maxLagMs": round(self.max_lag * 1000, 2),
+            "stallsRecorded": len(self.stalls),
+            "running": self._task is not None,
+        }
+
+
+loop_monitor = LoopMonitor(
+    settings.LOOP_MONITOR_INTERVAL, settings.LOOP_STALL_THRESHOLD_MS, settings.LOOP_STALL_HISTORY
+)
+registry.gauge("netsale_event_loop_lag_max_seconds", "进程启动以来最大循环延迟").set_function(
+    lambda: loop_monitor.max_lag
+)
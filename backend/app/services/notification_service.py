@@ -1,6 +1,8 @@
 from datetime import datetime, timezone
 from typing import Any
 
+from sqlalchemy import insert
+
 from app.db.session import AsyncSessionLocal
 from app.models.notification import Notification
 from app.services.ws_manager import manager
@@ -48,4 +50,47 @@ class NotificationService:
             
         return notification
 
+    async def notify_many(
+        self,
+        user_ids: list[str],
+        title: str,
+        content: str,
+        type: str = "info"
+    ) -> int:
+        """同一条通知发给多个用户 — 一次批量插入, 在线用户逐个推送"""
+        return await self.notify_batch([(uid, title, content) for uid in user_ids], type)
+
+    async def notify_batch(
+        self,
+        messages: list[tuple[str, str, str]],
+        type: str = "info"
+    ) -> int:
+        """每个用户各自的通知 [(user_id, title, content)] — 一次批量插入, 在线用户逐个推送"""
+        if not messages:
+            return 0
+        created_at = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                insert(Notification).returning(Notification.id, sort_by_parameter_order=True),
+                [
+                    {"user_id": uid, "title": title, "content": content, "type": type,
+                     "read": False, "created_at": created_at, "updated_at": created_at}
+                    for uid, title, content in messages
+                ],
+            )
+            ids = result.scalars().all()
+            await db.commit()
+
+        for notif_id, (user_id, title, content) in zip(ids, messages):
+            if manager.is_online(user_id):
+                await manager.send_personal(user_id, "sys.notification", {
+                    "id": notif_id,
+                    "title": title,
+                    "content": content,
+                    "type": type,
+                    "read": False,
+                    "createdAt": created_at.isoformat()
+                })
+        return len(ids)
+
 notification_service = NotificationService()
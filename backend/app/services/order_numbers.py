@@ -0,0 +1,47 @@
+"""
+订单号分配 — 数据库序列 + 每 worker 号段
+- order_no_seq 以 ORDER_NO_BLOCK_SIZE 为步长, 一次 nextval 领取 [v, v + BLOCK) 整段号码
+- 号段在进程内顺序发放, 每 BLOCK 个订单才访问一次序列; 序列不受事务回滚影响, 号码全局唯一
+- 订单号: NS + 本地日期 + 8 位以上流水号. 唯一性只依赖流水号, 日期仅便于人工识别
+同一 worker 内单调递增; 多 worker 之间按号段交错, 允许出现空号
+"""
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.order import ORDER_NO_BLOCK_SIZE, order_no_seq
+
+
+class OrderNumberAllocator:
+    """全局单例 order_numbers"""
+
+    def __init__(self, block_size: int = ORDER_NO_BLOCK_SIZE):
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+        self.blocks_fetched = 0
+
+    async def next_serial(self, fetch_block: Callable[[], Awaitable[int]]) -> int:
+        async with self._lock:
+            if self._next >= self._end:
+                start = await fetch_block()
+                self._next, self._end = start, start + self.block_size
+                self.blocks_fetched += 1
+            serial = self._next
+            self._next += 1
+            return serial
+
+    async def next(self, db: AsyncSession) -> str:
+        """分配一个订单号; 号段用尽时用调用方会话领取下一段 (nextval 不参与事务)"""
+        serial = await self.next_serial(lambda: db.scalar(order_no_seq.next_value()))
+        return format_order_no(serial)
+
+
+def format_order_no(serial: int, now: datetime | None = None) -> str:
+    return f"NS{(now or datetime.now()).strftime('%Y%m%d')}{serial:08d}"
+
+
+order_numbers = OrderNumberAllocator()
@@ -0,0 +1,172 @@
+"""
+订单批量状态流转 — 批量审核 / 发货 / 签收
+- 主链: manager_pending → finance_pending → approved → shipped → signed, 每次只前进一步
+- transition: 一次查询校验全部订单的当前状态, 再以单条 UPDATE ... WHERE id = ANY(...) AND status = 源状态
+  RETURNING 落库; 校验之后被并发修改的订单不满足 status 条件, 记为跳过
+- 发货经 reservation_service.convert_many 批量把预占转出库, 库存不足由调用方整批回滚
+- announce: 提交后按创建人汇总, 一次批量写入通知; 角标增量经失效总线广播, 各 worker 推送 badge.delta
+不提交, 由调用方 commit 后再调用 announce
+"""
+import asyncio
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import String, any_, bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.invalidation import bus
+from app.models.order import Order
+from app.services import reservation_service
+
+# 目标状态 → 源状态
+TRANSITIONS = {
+    "finance_pending": "manager_pending",
+    "approved": "finance_pending",
+    "shipped": "approved",
+    "signed": "shipped",
+}
+
+# 角标 → 计入的订单状态, 与 api/v1/badges.py 一致
+BADGE_STATUSES = {
+    "audit": ("manager_pending", "finance_pending"),
+    "pending": ("approved",),
+    "shipped": ("shipped",),
+}
+
+NOTIFY_TITLES = {
+    "finance_pending": "订单已通过经理审核",
+    "approved": "订单审核通过",
+    "shipped": "订单已发货",
+    "signed": "订单已签收",
+}
+
+# 单条通知内最多列出的订单号
+NOTIFY_MAX_NOS = 20
+
+
+@dataclass(slots=True)
+class TransitionResult:
+    source: str
+    target: str
+    updated: list[tuple[str, str, str]] = field(default_factory=list)  # (id, order_no, created_by)
+    failed: list[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.target,
+            "updated": [order_id for order_id, _, _ in self.updated],
+            "failed": self.failed,
+        }
+
+
+def _ids_param(ids: list[str]):
+    # 整个列表作为一个数组参数传入, 不受绑定参数个数上限影响
+    return any_(bindparam("order_ids", ids, type_=ARRAY(String)))
+
+
+async def transition(db: AsyncSession, ids: list[str], target: str, operator_id: str) -> TransitionResult:
+    """把 ids 中处于 target 前一状态的订单推进到 target"""
+    source = TRANSITIONS[target]
+    result = TransitionResult(source=source, target=target)
+    ids = list(dict.fromkeys(ids))
+
+    current = dict((await db.execute(
+        select(Order.id, Order.status)
+        .where(Order.id == _ids_param(ids), Order.is_deleted == False)
+    )).all())
+    eligible = []
+    for order_id in ids:
+        status = current.get(order_id)
+        if status is None:
+            result.failed.append({"id": order_id, "message": "订单不存在"})
+        elif status != source:
+            result.failed.append({"id": order_id, "message": f"当前状态 {status} 不能变更为 {target}"})
+        else:
+            eligible.append(order_id)
+    if not eligible:
+        return result
+
+    values = {"status": target}
+    if target == "shipped":
+        values["shipped_at"] = func.coalesce(Order.shipped_at, datetime.now())
+    elif target == "signed":
+        values["signed_at"] = func.coalesce(Order.signed_at, datetime.now())
+    rows = await db.execute(
+        update(Order)
+        .where(Order.id == _ids_param(eligible), Order.status == source, Order.is_deleted == False)
+        .values(**values)
+        .returning(Order.id, Order.order_no, Order.created_by)
+        .execution_options(synchronize_session=False)
+    )
+    result.updated = [tuple(r) for r in rows]
+
+    done = {order_id for order_id, _, _ in result.updated}
+    result.failed += [
+        {"id": order_id, "message": "订单状态已被其他操作变更"}
+        for order_id in eligible if order_id not in done
+    ]
+
+    if target == "shipped" and result.updated:
+        await reservation_service.convert_many(
+            db, {order_id: order_no for order_id, order_no, _ in result.updated}, operator_id
+        )
+    return result
+
+
+def badge_delta(source: str, target: str, count: int) -> dict[str, int]:
+    delta = {}
+    for badge, statuses in BADGE_STATUSES.items():
+        change = (target in statuses) - (source in statuses)
+        if change:
+            delta[badge] = change * count
+    return delta
+
+
+async def announce(result: TransitionResult, operator_id: str):
+    """提交后调用: 通知订单创建人 + 广播角标增量; 失败只记录日志, 不影响已提交的流转"""
+    from app.services.notification_service import notification_service
+
+    if not result.updated:
+        return
+    try:
+        delta = badge_delta(result.source, result.target, len(result.updated))
+        if delta:
+            await bus.publish("badge", json.dumps(delta))
+
+        by_creator: dict[str, list[str]] = defaultdict(list)
+        for _, order_no, created_by in result.updated:
+            if created_by != operator_id:
+                by_creator[created_by].append(order_no)
+        title = NOTIFY_TITLES[result.target]
+        messages = []
+        for user_id, order_nos in by_creator.items():
+            listed = "、".join(order_nos[:NOTIFY_MAX_NOS])
+            if len(order_nos) > NOTIFY_MAX_NOS:
+                listed += f" 等 {len(order_nos)} 个订单"
+            messages.append((user_id, title, f"订单 {listed} {title[2:]}"))
+        await notification_service.notify_batch(messages, "success")
+    except Exception as e:
+        print(f"[OrderWorkflow] announce failed: {e}")
+
+
+_tasks: set[asyncio.Task] = set()
+
+
+def _on_badge(payload: str | None):
+    """本 worker 与其他 worker 的角标增量都经此推送给本 worker 的在线连接"""
+    from app.services.ws_manager import manager
+
+    if not payload:
+        return
+    try:
+        task = asyncio.get_running_loop().create_task(manager.broadcast("badge.delta", json.loads(payload)))
+    except RuntimeError:
+        return
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+bus.subscribe("badge", _on_badge)
@@ -0,0 +1,103 @@
+"""
+角色 → 权限索引
+启动时从 roles / role_permissions 一次性加载, 每个角色编译为:
+  exact    — frozenset 精确权限码
+  prefixes — frozenset 通配资源前缀 (order:* -> "order")
+  allow_all — 拥有 "*" (admin 角色恒为 True)
+require_permission 只查询此索引, 不再访问 ORM 关系。
+更新: admin.update_role 调用 set_role 原子替换; 其他 worker 收到 invalidation.bus 的 role 主题后重新加载。
+"""
+import asyncio
+from dataclasses import dataclass
+
+from sqlalchemy import select
+
+from app.core.invalidation import bus
+from app.db.session import AsyncSessionLocal
+from app.models.user import Role
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRole:
+    exact: frozenset[str]
+    prefixes: frozenset[str]
+    allow_all: bool
+
+    @classmethod
+    def compile(cls, codes) -> "CompiledRole":
+        exact, prefixes, allow_all = set(), set(), False
+        for code in codes:
+            if code == "*":
+                allow_all = True
+            elif code.endswith(":*"):
+                prefixes.add(code[:-2])
+            else:
+                exact.add(code)
+        return cls(frozenset(exact), frozenset(prefixes), allow_all)
+
+    def allows(self, permission_code: str) -> bool:
+        if self.allow_all or permission_code in self.exact:
+            return True
+        resource, _, _ = permission_code.partition(":")
+        return resource in self.prefixes
+
+
+ADMIN = CompiledRole(frozenset(), frozenset(), True)
+
+
+class PermissionIndex:
+    """全局单例 permission_index — 读路径无锁, 写路径整体替换字典引用"""
+
+    def __init__(self):
+        self._roles: dict[str, CompiledRole] = {"admin": ADMIN}
+        self.loaded = False
+
+    async def load(self):
+        """从数据库加载全部角色 — 由 main.lifespan 调用"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Role).where(Role.is_deleted == False))
+            roles = {
+                role.code: CompiledRole.compile(p.code for p in role.permissions)
+                for role in result.scalars().all()
+            }
+        roles["admin"] = ADMIN
+        self._roles = roles
+        self.loaded = True
+
+    async def reload(self):
+        try:
+            await self.load()
+        except Exception as e:
+            print(f"[PermissionIndex] reload failed: {e}")
+
+    def set_role(self, role_code: str, permission_codes):
+        roles = dict(self._roles)
+        roles[role_code] = ADMIN if role_code == "admin" else CompiledRole.compile(permission_codes)
+        self._roles = roles
+
+    def get(self, role_code: str) -> CompiledRole | None:
+        return self._roles.get(role_code)
+
+    def allows(self, role_code: str, permission_code: str, fallback=()) -> bool:
+        """
+        检查角色是否拥有权限
+        fallback: 索引中不存在该角色时 (启动后新增角色) 使用 Principal 自带的权限码
+        """
+        compiled = self._roles.get(role_code)
+        if compiled is None:
+            compiled = CompiledRole.compile(fallback)
+        return compiled.allows(permission_code)
+
+    def roles_with(self, permission_code: str) -> list[str]:
+        """拥有某权限的全部角色码 (按角色推送通知时使用)"""
+        return [code for code, compiled in self._roles.items() if compiled.allows(permission_code)]
+
+    def _on_role_changed(self, _role_code: str | None):
+        try:
+            asyncio.get_running_loop().create_task(self.reload())
+        except RuntimeError:
+            pass
+
+
+permission_index = PermissionIndex()
+bus.subscribe("role", permission_index._on_role_changed, remote_only=True)
@@ -0,0 +1,169 @@
+"""
+按需性能剖析 + 内存快照
+- sample:   后台线程按固定间隔抓取事件循环线程堆栈, 输出折叠栈 (flamegraph.pl / speedscope 可直接读取)
+- cprofile: 在事件循环线程启用 cProfile, 期间运行的所有协程都会被统计, 输出按累计耗时排序的函数表
+- tracemalloc: 启动 / 快照 / 与基线快照对比
+同一时刻只允许一个剖析会话; 剖析期间接口协程只是 sleep, 不阻塞事件循环
+"""
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+_session_lock = asyncio.Lock()
+
+
+class ProfilerBusyError(Exception):
+    """已有剖析会话在运行"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+async def sample_stacks(seconds: float, interval_ms: float) -> tuple[str, int]:
+    """
+    堆栈采样 — 返回 (折叠栈文本, 采样次数)
+    每行格式: frame1;frame2;...;frameN count (根在左)
+    """
+    if _session_lock.locked():
+        raise ProfilerBusyError()
+    async with _session_lock:
+        target = threading.get_ident()
+        samples: Counter[str] = Counter()
+        stop = threading.Event()
+        interval = max(interval_ms, 1) / 1000
+
+        def _sampler():
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(target)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                samples[";".join(reversed(stack))] += 1
+
+        thread = threading.Thread(target=_sampler, name="stack-sampler", daemon=True)
+        thread.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(thread.join)
+
+    # 剖析接口自身的 sleep 栈 (循环空闲) 也会被采到, 保留以反映空闲占比
+    lines = [f"{stack} {count}" for stack, count in samples.most_common()]
+    return "\n".join(lines) + "\n", sum(samples.values())
+
+
+async def run_cprofile(seconds: float, top: int, sort: str = "cumulative") -> dict:
+    """cProfile — 返回排序后的前 top 个函数"""
+    if _session_lock.locked():
+        raise ProfilerBusyError()
+    async with _session_lock:
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats(sort)
+    rows = []
+    for func in stats.fcn_list[:top]:
+        cc, nc, tt, ct, _callers = stats.stats[func]
+        filename, lineno, name = func
+        rows.append({
+            "function": f"{filename}:{lineno}({name})",
+            "calls": nc,
+            "primitiveCalls": cc,
+            "totalTimeMs": round(tt * 1000, 3),
+            "cumulativeTimeMs": round(ct * 1000, 3),
+        })
+    return {"seconds": round(elapsed, 3), "sort": sort, "functions": rows}
+
+
+class MemoryTracker:
+    """tracemalloc 会话 — baseline 为最近一次 snapshot(), diff() 与其对比"""
+
+    def __init__(self):
+        self.baseline: tracemalloc.Snapshot | None = None
+        self.baseline_at: str | None = None
+
+    @staticmethod
+    def _filtered(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def start(self, frames: int) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> dict:
+        tracemalloc.stop()
+        self.baseline = None
+        self.baseline_at = None
+        return self.status()
+
+    def snapshot(self, top: int, group_by: str) -> dict:
+        snap = self._filtered(tracemalloc.take_snapshot())
+        self.baseline = snap
+        self.baseline_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        stats = snap.statistics(group_by)
+        return {
+            **self.status(),
+            "top": [
+                {
+                    "location": self._location(s.traceback),
+                    "sizeKb": round(s.size / 1024, 1),
+                    "count": s.count,
+                }
+                for s in stats[:top]
+            ],
+        }
+
+    def diff(self, top: int, group_by: str) -> dict:
+        snap = self._filtered(tracemalloc.take_snapshot())
+        stats = snap.compare_to(self.baseline, group_by)
+        return {
+            **self.status(),
+            "top": [
+                {
+                    "location": self._location(s.traceback),
+                    "sizeDiffKb": round(s.size_diff / 1024, 1),
+                    "sizeKb": round(s.size / 1024, 1),
+                    "countDiff": s.count_diff,
+                }
+                for s in stats[:top]
+            ],
+        }
+
+    @staticmethod
+    def _location(tb: tracemalloc.Traceback) -> list[str]:
+        return [f"{f.filename}:{f.lineno}" for f in tb]
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "tracedKb": round(current / 1024, 1),
+            "peakKb": round(peak / 1024, 1),
+            "baselineAt": self.baseline_at,
+        }
+
+
+memory_tracker = MemoryTracker()
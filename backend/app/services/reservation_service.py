@@ -0,0 +1,246 @@
+"""
+订单库存预占 — 建立在 stock_service 的条件更新原语之上
+- reserve: 下单时按商品汇总明细, 以 product_id 顺序逐个 hold (统一加锁顺序), 批量写入 StockReservation
+- convert / convert_many: 发货时把 active 预占原子地改为 converted (UPDATE ... RETURNING, 与清扫任务互斥),
+           按 (商品, 仓库) 扣 current 并写出库 StockLog; 预占与订单明细比对, 已过期 (含部分过期)
+           或历史订单无预占的部分当场 hold 后出库
+- release: 取消 / 驳回 / 作废 / 删除时 active → released, 归还 available
+- sync_status: 订单状态流转钩子, 由订单路由调用
+- ReservationSweeper: 定时回收过期预占, FOR UPDATE SKIP LOCKED 按批领取, 多 worker 并行互不阻塞
+除清扫任务外均不提交, 由调用方 commit; 库存不足抛出 StockError
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.order import OrderItem
+from app.models.stock import StockLog, StockReservation
+from app.services import stock_service
+from app.services.stock_service import StockError
+
+settings = get_settings()
+
+# 进入这些状态时释放预占
+RELEASE_STATUSES = frozenset({"manager_rejected", "finance_rejected", "voided", "cancelled"})
+# 处于这些状态的订单应持有预占 (驳回后重新提交时补占)
+HOLD_STATUSES = frozenset({"manager_pending", "finance_pending", "approved"})
+
+
+def _demand(items: Iterable) -> dict[str, tuple[int, str]]:
+    """明细按商品汇总 → {product_id: (数量, 商品名)}; 兼容 OrderItem 与 OrderItemCreate"""
+    demand: dict[str, tuple[int, str]] = {}
+    for item in items:
+        product_id = getattr(item, "product_id", None) or item.productId
+        name = getattr(item, "product_name", None) or getattr(item, "productName", "")
+        qty = demand.get(product_id, (0, name))[0] + item.quantity
+        demand[product_id] = (qty, name)
+    return demand
+
+
+async def _hold_all(db: AsyncSession, items: Iterable) -> list[tuple[str, str, int]]:
+    return await _hold_demand(db, _demand(items))
+
+
+async def _hold_demand(db: AsyncSession, demand: dict[str, tuple[int, str]]) -> list[tuple[str, str, int]]:
+    held = []
+    for product_id in sorted(demand):
+        qty, name = demand[product_id]
+        if qty <= 0:
+            continue
+        try:
+            warehouse_id = await stock_service.hold(db, product_id, qty)
+        except StockError:
+            raise StockError(f"商品「{name}」可用库存不足")
+        held.append((product_id, warehouse_id, qty))
+    return held
+
+
+async def reserve(db: AsyncSession, order_id: str, items: Iterable) -> int:
+    """为订单预占库存, 已持有 active 预占时不重复占用; 返回预占行数"""
+    if not settings.STOCK_RESERVATION_ENABLED:
+        return 0
+    existing = await db.execute(
+        select(StockReservation.id)
+        .where(StockReservation.order_id == order_id, StockReservation.status == "active")
+        .limit(1)
+    )
+    if existing.scalar_one_or_none() is not None:
+        return 0
+    held = await _hold_all(db, items)
+    if held:
+        expires_at = datetime.now(timezone.utc) + timedelta(hours=settings.STOCK_RESERVATION_TTL_HOURS)
+        await db.execute(insert(StockReservation), [
+            {"order_id": order_id, "product_id": p, "warehouse_id": w,
+             "quantity": q, "status": "active", "expires_at": expires_at}
+            for p, w, q in held
+        ])
+    return len(held)
+
+
+async def release(db: AsyncSession, order_id: str) -> int:
+    """释放订单的 active 预占, 返回释放行数"""
+    result = await db.execute(
+        update(StockReservation)
+        .where(StockReservation.order_id == order_id, StockReservation.status == "active")
+        .values(status="released")
+        .returning(StockReservation.product_id, StockReservation.warehouse_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    rows = [tuple(r) for r in result]
+    await stock_service.unhold(db, rows)
+    return len(rows)
+
+
+async def convert(db: AsyncSession, order, operator_id: str) -> int:
+    """发货: 预占转实际出库并写 StockLog, 返回出库行数"""
+    return await convert_many(db, {order.id: order.order_no}, operator_id)
+
+
+async def convert_many(db: AsyncSession, orders: dict[str, str], operator_id: str) -> int:
+    """
+    批量发货 — orders: {order_id: order_no}
+    一次 UPDATE 领取全部 active 预占, 按 (商品, 仓库) 汇总后逐行扣 current, StockLog 按订单明细批量写入
+    """
+    if not settings.STOCK_RESERVATION_ENABLED or not orders:
+        return 0
+    result = await db.execute(
+        update(StockReservation)
+        .where(StockReservation.order_id.in_(list(orders)), StockReservation.status == "active")
+        .values(status="converted")
+        .returning(
+            StockReservation.order_id, StockReservation.product_id,
+            StockReservation.warehouse_id, StockReservation.quantity,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    held = [tuple(r) for r in result]
+
+    # 与订单明细比对, 预占不足的部分以当前可用库存补占: 预占已被清扫回收 (清扫按批提交,
+    # 同一订单的预占行可能只被回收一部分), 或订单早于预占上线
+    items = defaultdict(list)
+    for item in await db.scalars(
+        select(OrderItem).where(OrderItem.order_id.in_(list(orders)), OrderItem.is_deleted == False)
+    ):
+        items[item.order_id].append(item)
+    covered: dict[tuple[str, str], int] = defaultdict(int)
+    for order_id, product_id, _, qty in held:
+        covered[(order_id, product_id)] += qty
+    for order_id in sorted(orders):
+        shortfall = {
+            product_id: (qty - covered[(order_id, product_id)], name)
+            for product_id, (qty, name) in _demand(items[order_id]).items()
+            if qty > covered[(order_id, product_id)]
+        }
+        if not shortfall:
+            continue
+        try:
+            held += [(order_id, p, w, q) for p, w, q in await _hold_demand(db, shortfall)]
+        except StockError as e:
+            raise StockError(f"订单 {orders[order_id]}: {e.message}")
+
+    totals: dict[tuple[str, str], int] = defaultdict(int)
+    for _, product_id, warehouse_id, qty in held:
+        totals[(product_id, warehouse_id)] += qty
+    # 出库前库存 = 扣减后 + 汇总数量, 再按订单顺序摊回每条日志
+    running = {}
+    for key in sorted(totals):
+        running[key] = await stock_service.consume_hold(db, *key, totals[key]) + totals[key]
+
+    logs = []
+    for order_id, product_id, warehouse_id, qty in sorted(held):
+        before = running[(product_id, warehouse_id)]
+        running[(product_id, warehouse_id)] = before - qty
+        logs.append({
+            "product_id": product_id,
+            "warehouse_id": warehouse_id,
+            "type": "out",
+            "quantity": qty,
+            "before_stock": before,
+            "after_stock": before - qty,
+            "related_no": orders[order_id],
+            "operator_id": operator_id,
+            "remark": "订单发货",
+        })
+    if logs:
+        await db.execute(insert(StockLog), logs)
+    return len(logs)
+
+
+async def sync_status(db: AsyncSession, order, old_status: str, operator_id: str):
+    """订单状态变更后调用 (order.status 已是新状态)"""
+    new_status = order.status
+    if new_status == old_status:
+        return
+    if new_status == "shipped":
+        await convert(db, order, operator_id)
+    elif new_status in RELEASE_STATUSES:
+        await release(db, order.id)
+    elif new_status in HOLD_STATUSES and old_status in RELEASE_STATUSES | {"draft"}:
+        await reserve(db, order.id, order.items or [])
+
+
+class ReservationSweeper:
+    """全局单例 reservation_sweeper — 由 main.lifespan 启动"""
+
+    def __init__(self, interval: int, batch: int):
+        self.interval = interval
+        self.batch = batch
+        self.expired_total = 0
+        self.last_run: datetime | None = None
+
+    async def sweep_once(self) -> int:
+        """回收全部已过期预占; 每批独立事务, 其他 worker 已领取的行被 SKIP LOCKED 跳过"""
+        total = 0
+        while True:
+            now = datetime.now(timezone.utc)
+            claim = (
+                select(StockReservation.id)
+                .where(StockReservation.status == "active", StockReservation.expires_at < now)
+                .order_by(StockReservation.expires_at)
+                .limit(self.batch)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    update(StockReservation)
+                    .where(StockReservation.id.in_(claim), StockReservation.status == "active")
+                    .values(status="expired")
+                    .returning(StockReservation.product_id, StockReservation.warehouse_id, StockReservation.quantity)
+                    .execution_options(synchronize_session=False)
+                )
+                rows = [tuple(r) for r in result]
+                await stock_service.unhold(db, rows)
+                await db.commit()
+            total += len(rows)
+            self.expired_total += len(rows)
+            if len(rows) < self.batch:
+                break
+        self.last_run = datetime.now(timezone.utc)
+        return total
+
+    async def run(self):
+        while True:
+            try:
+                await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ReservationSweeper] sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+reservation_sweeper = ReservationSweeper(
+    settings.STOCK_RESERVATION_SWEEP_INTERVAL, settings.STOCK_RESERVATION_SWEEP_BATCH
+)
+
+registry.counter(
+    "netsale_stock_reservations_expired_total", "清扫任务回收的过期预占行数"
+).set_function(lambda: reservation_sweeper.expired_total)
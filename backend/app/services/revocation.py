@@ -0,0 +1,192 @@
+"""
+令牌吊销存储
+- 持久化: revoked_tokens 表 (models/revoked_token.py)
+- 内存: 布隆过滤器 + 精确集合; 绝大多数请求的令牌未被吊销, 布隆过滤器一次判定即可放行,
+        命中 (含误判) 时再查精确集合
+- 同步: 吊销 / 恢复后通过 invalidation.bus 的 revocation 主题广播, 其他 worker 直接应用, 不回查数据库
+条目编码 (bus key):
+  t:<jti>:<exp>           单个令牌
+  u:<user_id>:<issued_before|空>   用户级 (空 = 全部令牌)
+  r:<user_id>             恢复用户 (删除用户级条目)
+"""
+import hashlib
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.invalidation import bus
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.revoked_token import RevokedToken
+
+settings = get_settings()
+
+
+class BloomFilter:
+    """定长位图布隆过滤器 — blake2b 双重哈希生成 k 个位置"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationStore:
+    """全局单例 revocation_store"""
+
+    def __init__(self):
+        self._tokens: dict[str, float] = {}           # jti -> 令牌过期时间 (epoch)
+        self._users: dict[str, float | None] = {}     # user_id -> issued_before (epoch), None = 全部
+        self._bloom = self._new_bloom(0)
+        self.bloom_hits = 0
+        self.rejected_total = 0
+
+    @staticmethod
+    def _new_bloom(n: int) -> BloomFilter:
+        return BloomFilter(
+            max(settings.REVOCATION_BLOOM_CAPACITY, n * 2), settings.REVOCATION_BLOOM_ERROR_RATE
+        )
+
+    # ---------- 查询 (请求路径) ----------
+
+    def is_revoked(self, payload: dict) -> bool:
+        jti = payload.get("jti")
+        user_id = payload.get("sub")
+        token_hit = jti is not None and f"t:{jti}" in self._bloom
+        user_hit = user_id is not None and f"u:{user_id}" in self._bloom
+        if not token_hit and not user_hit:
+            return False
+        self.bloom_hits += 1
+        revoked = False
+        if token_hit and jti in self._tokens:
+            revoked = True
+        elif user_hit and user_id in self._users:
+            issued_before = self._users[user_id]
+            revoked = issued_before is None or payload.get("iat", 0) < issued_before
+        if revoked:
+            self.rejected_total += 1
+        return revoked
+
+    # ---------- 本地状态 ----------
+
+    def _apply(self, entry: str):
+        kind, _, rest = entry.partition(":")
+        if kind == "t":
+            jti, _, exp = rest.rpartition(":")
+            self._tokens[jti] = float(exp or 0)
+            self._bloom.add(f"t:{jti}")
+        elif kind == "u":
+            user_id, _, before = rest.partition(":")
+            self._users[user_id] = float(before) if before else None
+            self._bloom.add(f"u:{user_id}")
+        elif kind == "r":
+            # 布隆过滤器不支持删除, 残留位只会让该用户多查一次精确集合, 下次 load 时重建
+            self._users.pop(rest, None)
+
+    async def _publish(self, entry: str):
+        self._apply(entry)
+        await bus.publish("revocation", entry)
+
+    async def load(self):
+        """从数据库重建 — 由 main.lifespan 调用, 顺带清理已过期的令牌级记录"""
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(RevokedToken).where(
+                    RevokedToken.jti.is_not(None), RevokedToken.expires_at < now
+                )
+            )
+            await db.commit()
+            result = await db.execute(select(RevokedToken))
+            rows = result.scalars().all()
+
+        tokens: dict[str, float] = {}
+        users: dict[str, float | None] = {}
+        bloom = self._new_bloom(len(rows))
+        for row in rows:
+            if row.jti:
+                tokens[row.jti] = row.expires_at.timestamp() if row.expires_at else 0
+                bloom.add(f"t:{row.jti}")
+            else:
+                users[row.user_id] = row.issued_before.timestamp() if row.issued_before else None
+                bloom.add(f"u:{row.user_id}")
+        self._tokens, self._users, self._bloom = tokens, users, bloom
+
+    # ---------- 写入 ----------
+
+    async def revoke_token(self, db: AsyncSession, payload: dict, reason: str = "logout"):
+        """吊销单个令牌 (需包含 jti)"""
+        jti = payload.get("jti")
+        if not jti:
+            return
+        exp = float(payload.get("exp", 0))
+        db.add(RevokedToken(
+            jti=jti,
+            user_id=payload.get("sub", ""),
+            expires_at=datetime.fromtimestamp(exp, timezone.utc) if exp else None,
+            reason=reason,
+        ))
+        await db.commit()
+        await self._publish(f"t:{jti}:{exp}")
+
+    async def revoke_user(
+        self, db: AsyncSession, user_id: str, reason: str = "disabled", all_tokens: bool = True
+    ):
+        """
+        用户级吊销
+        all_tokens=True 时该用户所有令牌失效 (账号禁用), 否则仅当前时刻之前签发的令牌失效
+        """
+        issued_before = None if all_tokens else datetime.now(timezone.utc)
+        await db.execute(
+            delete(RevokedToken).where(
+                RevokedToken.user_id == user_id, RevokedToken.jti.is_(None)
+            )
+        )
+        db.add(RevokedToken(user_id=user_id, issued_before=issued_before, reason=reason))
+        await db.commit()
+        before = "" if issued_before is None else str(int(issued_before.timestamp()))
+        await self._publish(f"u:{user_id}:{before}")
+
+    async def restore_user(self, db: AsyncSession, user_id: str):
+        """撤销用户级吊销 (重新启用账号)"""
+        await db.execute(
+            delete(RevokedToken).where(
+                RevokedToken.user_id == user_id, RevokedToken.jti.is_(None)
+            )
+        )
+        await db.commit()
+        await self._publish(f"r:{user_id}")
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self._tokens),
+            "users": len(self._users),
+            "bloomBits": self._bloom.size,
+            "bloomHashes": self._bloom.hashes,
+            "bloomHits": self.bloom_hits,
+            "rejectedTotal": self.rejected_total,
+        }
+
+
+revocation_store = RevocationStore()
+bus.subscribe("revocation", revocation_store._apply, remote_only=True)
+registry.counter("netsale_revoked_token_rejections_total", "因吊销被拒绝的令牌").set_function(
+    lambda: revocation_store.rejected_total
+)
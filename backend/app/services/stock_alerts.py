@@ -0,0 +1,153 @@
+"""
+低库存预警 — 在库存变动路径上增量检测, 不轮询全表
+- stock_service 的每个条件更新都 RETURNING (available, warning_value), 经 record_levels 记入会话 info
+- 会话提交后 (after_commit) 把本事务触及的行交给 stock_alerts.process; 回滚的事务不产生预警
+- 告警状态缓存: 处于预警中的 (商品, 仓库) 集合. 仅在 "正常 → 低于预警值" 时通知一次,
+  持续低位的后续变动不重复通知, 回升到预警值及以上后解除, 下次跌破再通知
+- 状态变化经失效总线广播, 多 worker 共享去重结果
+- 通知对象: 拥有 warehouse:stock 权限角色下的启用用户, 经 notification_service 批量写入 + 推送
+启动时一次性加载当前已低于预警值的行作为初始状态, 重启不会重发
+"""
+import asyncio
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import bus
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.product import Product
+from app.models.stock import Stock
+from app.models.user import Role, User
+from app.models.warehouse import Warehouse
+
+ALERT_PERMISSION = "warehouse:stock"
+
+Key = tuple[str, str]
+
+
+def record_levels(db, rows):
+    """记录变动后的库存水位 [(product_id, warehouse_id, available, warning_value)], 提交后统一检测"""
+    levels = db.info.setdefault("stock_levels", {})
+    for p, w, available, warning in rows:
+        levels[(p, w)] = (available, warning)
+
+
+class StockAlertEngine:
+    """全局单例 stock_alerts — main.lifespan 中 load"""
+
+    def __init__(self):
+        self.alerting: set[Key] = set()
+        self.alerts_total = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Stock.product_id, Stock.warehouse_id)
+                .where(Stock.available < Stock.warning_value)
+            )
+            self.alerting = {(p, w) for p, w in result}
+
+    def schedule(self, levels: dict[Key, tuple[int, int]]):
+        """after_commit 钩子中调用 (同步上下文), 检测与通知放到后台任务"""
+        crossed = self._apply(levels)
+        if not crossed:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._notify(crossed))
+        except RuntimeError:
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _apply(self, levels: dict[Key, tuple[int, int]]) -> list[tuple[Key, int, int]]:
+        """更新缓存状态, 返回新跌破预警值的行; 状态变化广播到其他 worker"""
+        crossed = []
+        for key, (available, warning) in levels.items():
+            low = warning is not None and available < warning
+            if low and key not in self.alerting:
+                self.alerting.add(key)
+                crossed.append((key, available, warning))
+                self._broadcast(key, True)
+            elif not low and key in self.alerting:
+                self.alerting.discard(key)
+                self._broadcast(key, False)
+        return crossed
+
+    def _broadcast(self, key: Key, low: bool):
+        try:
+            asyncio.get_running_loop().create_task(
+                bus.publish("stock_alert", f"{key[0]}|{key[1]}|{int(low)}")
+            )
+        except RuntimeError:
+            pass
+
+    def _on_remote(self, payload: str | None):
+        if not payload:
+            return
+        product_id, warehouse_id, low = payload.split("|")
+        key = (product_id, warehouse_id)
+        if low == "1":
+            self.alerting.add(key)
+        else:
+            self.alerting.discard(key)
+
+    async def _notify(self, crossed: list[tuple[Key, int, int]]):
+        from app.services.notification_service import notification_service
+        from app.services.permission_index import permission_index
+
+        try:
+            async with AsyncSessionLocal() as db:
+                product_ids = {k[0] for k, _, _ in crossed}
+                warehouse_ids = {k[1] for k, _, _ in crossed}
+                products = dict((await db.execute(
+                    select(Product.id, Product.name).where(Product.id.in_(product_ids))
+                )).all())
+                warehouses = dict((await db.execute(
+                    select(Warehouse.id, Warehouse.name).where(Warehouse.id.in_(warehouse_ids))
+                )).all())
+                recipients = list((await db.execute(
+                    select(User.id)
+                    .join(Role, Role.id == User.role_id)
+                    .where(
+                        Role.code.in_(permission_index.roles_with(ALERT_PERMISSION)),
+                        User.is_active == True,
+                        User.is_deleted == False,
+                    )
+                )).scalars())
+            if not recipients:
+                return
+
+            lines = [
+                f"{products.get(p, p)} @ {warehouses.get(w, w)}: 可用 {available} (预警值 {warning})"
+                for (p, w), available, warning in crossed
+            ]
+            title = "低库存预警" if len(lines) == 1 else f"低库存预警 ({len(lines)} 项)"
+            await notification_service.notify_many(recipients, title, "\n".join(lines), "warning")
+            self.alerts_total += len(crossed)
+        except Exception as e:
+            print(f"[StockAlert] notify failed: {e}")
+
+
+stock_alerts = StockAlertEngine()
+bus.subscribe("stock_alert", stock_alerts._on_remote, remote_only=True)
+
+registry.gauge(
+    "netsale_stock_low_rows", "低于预警值的 (商品, 仓库) 行数"
+).set_function(lambda: len(stock_alerts.alerting))
+registry.counter(
+    "netsale_stock_alerts_total", "已发送的低库存预警项数"
+).set_function(lambda: stock_alerts.alerts_total)
+
+
+@event.listens_for(Session, "after_commit")
+def _check_after_commit(session):
+    levels = session.info.pop("stock_levels", None)
+    if levels:
+        stock_alerts.schedule(levels)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("stock_levels", None)
@@ -0,0 +1,283 @@
+"""
+历史时点库存 — 库存快照 + StockLog 回放
+- take_snapshot: 事务内先 LOCK TABLE stocks IN SHARE MODE (等待进行中的库存写事务提交, 并暂挡新写入),
+  再 INSERT ... SELECT 复制非零行. 所有库存写入都是先改 stocks 再写日志, 因此锁内取得的 taken_at
+  晚于快照已包含的全部日志, 早于快照未包含的全部日志
+- stock_as_of: 在 "前一快照 / 后一快照 / 实时库存" 中取离目标时点最近的基准, 向前或向后回放区间内日志;
+  日志在 SQL 中按 (商品, 仓库) 聚合, 成本只与区间内日志量有关, 不随历史总量增长
+- reconcile: 可重复读事务内比较实时 stocks 与 "最新快照 + 之后日志", 返回不一致的行
+- SnapshotScheduler: 定时检查, 距上次快照超过 STOCK_SNAPSHOT_INTERVAL_HOURS 则先对账再拍摄;
+  多 worker 以 advisory lock 保证同一时刻只有一个执行
+"""
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import String, case, false, func, insert, literal, literal_column, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal, engine
+from app.models.stock import Stock, StockLog, StockSnapshot, StockSnapshotItem
+from app.services.stock_service import STOCK_IN_TYPES
+
+settings = get_settings()
+
+# pg_try_advisory_lock 键 — 任意常量, 仅需在本库内唯一
+SNAPSHOT_LOCK_KEY = 0x5354_4B53
+
+Key = tuple[str, str]
+
+
+@dataclass(slots=True)
+class AsOfResult:
+    at: datetime
+    base: str  # snapshot / live
+    base_at: datetime
+    replayed_logs: int
+    rows: dict[Key, int] = field(default_factory=dict)
+
+
+def _window(start: datetime | None, end: datetime | None) -> list:
+    conds = []
+    if start is not None:
+        conds.append(StockLog.created_at > start)
+    if end is not None:
+        conds.append(StockLog.created_at <= end)
+    return conds
+
+
+async def _log_deltas(
+    db: AsyncSession,
+    start: datetime | None,
+    end: datetime | None,
+    product_id: str | None = None,
+    warehouse_id: str | None = None,
+) -> tuple[dict[Key, int], int]:
+    """(start, end] 内日志对 current 的净影响 → ({(商品, 仓库): 净变化}, 日志条数)"""
+    window = _window(start, end)
+    signed = case((StockLog.type.in_(STOCK_IN_TYPES), StockLog.quantity), else_=-StockLog.quantity)
+    # 调库日志记在原仓库, 目标仓库的调入单独展开
+    moves = union_all(
+        select(
+            StockLog.product_id.label("product_id"),
+            StockLog.warehouse_id.label("warehouse_id"),
+            signed.label("delta"),
+            literal_column("1").label("n"),
+        ).where(*window),
+        select(
+            StockLog.product_id,
+            StockLog.target_warehouse_id,
+            StockLog.quantity,
+            literal_column("0"),
+        ).where(*window, StockLog.type == "transfer"),
+    ).subquery()
+    stmt = select(
+        moves.c.product_id, moves.c.warehouse_id, func.sum(moves.c.delta), func.sum(moves.c.n)
+    ).group_by(moves.c.product_id, moves.c.warehouse_id)
+    if product_id:
+        stmt = stmt.where(moves.c.product_id == product_id)
+    if warehouse_id:
+        stmt = stmt.where(moves.c.warehouse_id == warehouse_id)
+
+    deltas: dict[Key, int] = {}
+    count = 0
+    for p, w, delta, n in await db.execute(stmt):
+        deltas[(p, w)] = int(delta)
+        count += int(n)
+    return deltas, count
+
+
+async def _snapshot_rows(
+    db: AsyncSession, snapshot_id: str, product_id: str | None = None, warehouse_id: str | None = None
+) -> dict[Key, int]:
+    stmt = select(
+        StockSnapshotItem.product_id, StockSnapshotItem.warehouse_id, StockSnapshotItem.current
+    ).where(StockSnapshotItem.snapshot_id == snapshot_id)
+    if product_id:
+        stmt = stmt.where(StockSnapshotItem.product_id == product_id)
+    if warehouse_id:
+        stmt = stmt.where(StockSnapshotItem.warehouse_id == warehouse_id)
+    return {(p, w): c for p, w, c in await db.execute(stmt)}
+
+
+async def _live_rows(
+    db: AsyncSession, product_id: str | None = None, warehouse_id: str | None = None
+) -> dict[Key, int]:
+    stmt = select(Stock.product_id, Stock.warehouse_id, Stock.current)
+    if product_id:
+        stmt = stmt.where(Stock.product_id == product_id)
+    if warehouse_id:
+        stmt = stmt.where(Stock.warehouse_id == warehouse_id)
+    return {(p, w): c for p, w, c in await db.execute(stmt)}
+
+
+def _merge(base: dict[Key, int], deltas: dict[Key, int], sign: int) -> dict[Key, int]:
+    rows = dict(base)
+    for key, delta in deltas.items():
+        rows[key] = rows.get(key, 0) + sign * delta
+    # 区间内新出现又归零的组合不输出
+    return {k: v for k, v in rows.items() if v != 0 or k in base}
+
+
+async def stock_as_of(
+    db: AsyncSession, at: datetime, product_id: str | None = None, warehouse_id: str | None = None
+) -> AsOfResult:
+    """
+    计算 at 时点的库存 (current)
+    调用方应在可重复读事务中调用, 使基准与日志处于同一数据库快照
+    """
+    now = datetime.now(timezone.utc)
+    at = min(at, now)
+    before = (await db.execute(
+        select(StockSnapshot.id, StockSnapshot.taken_at)
+        .where(StockSnapshot.taken_at <= at)
+        .order_by(StockSnapshot.taken_at.desc())
+        .limit(1)
+    )).first()
+    after = (await db.execute(
+        select(StockSnapshot.id, StockSnapshot.taken_at)
+        .where(StockSnapshot.taken_at > at)
+        .order_by(StockSnapshot.taken_at.asc())
+        .limit(1)
+    )).first()
+
+    # 候选基准: (距离, 类型, 快照ID, 基准时点); 实时库存视为 now 时刻的快照
+    candidates = [(now - at, "live", None, now)]
+    if before:
+        candidates.append((at - before.taken_at, "snapshot", before.id, before.taken_at))
+    if after:
+        candidates.append((after.taken_at - at, "snapshot", after.id, after.taken_at))
+    _, kind, snapshot_id, base_at = min(candidates, key=lambda c: c[0])
+
+    if kind == "live":
+        base = await _live_rows(db, product_id, warehouse_id)
+    else:
+        base = await _snapshot_rows(db, snapshot_id, product_id, warehouse_id)
+
+    if base_at <= at:
+        deltas, count = await _log_deltas(db, base_at, at, product_id, warehouse_id)
+        rows = _merge(base, deltas, 1)
+    else:
+        deltas, count = await _log_deltas(db, at, base_at, product_id, warehouse_id)
+        rows = _merge(base, deltas, -1)
+    return AsOfResult(at=at, base=kind, base_at=base_at, replayed_logs=count, rows=rows)
+
+
+async def take_snapshot() -> dict:
+    """拍摄一次库存快照 (独立事务), 返回快照头信息"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("LOCK TABLE stocks IN SHARE MODE"))
+        taken_at = datetime.now(timezone.utc)
+        snapshot = StockSnapshot(taken_at=taken_at)
+        db.add(snapshot)
+        await db.flush()
+        await db.execute(
+            insert(StockSnapshotItem).from_select(
+                ["id", "snapshot_id", "product_id", "warehouse_id", "current",
+                 "created_at", "updated_at", "is_deleted"],
+                select(
+                    func.gen_random_uuid().cast(String),
+                    literal(snapshot.id),
+                    Stock.product_id,
+                    Stock.warehouse_id,
+                    Stock.current,
+                    literal(taken_at),
+                    literal(taken_at),
+                    false(),
+                ).where(Stock.current != 0),
+            )
+        )
+        count, total = (await db.execute(
+            select(func.count(), func.coalesce(func.sum(StockSnapshotItem.current), 0))
+            .where(StockSnapshotItem.snapshot_id == snapshot.id)
+        )).one()
+        snapshot.row_count = count
+        snapshot.total_quantity = total
+        await db.commit()
+        return {"id": snapshot.id, "takenAt": taken_at.isoformat(), "rowCount": count, "totalQuantity": total}
+
+
+async def reconcile() -> dict:
+    """实时库存 vs 最新快照 + 之后日志; 可重复读事务保证两侧读到同一数据库快照"""
+    async with AsyncSessionLocal() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        latest = (await db.execute(
+            select(StockSnapshot.id, StockSnapshot.taken_at)
+            .order_by(StockSnapshot.taken_at.desc())
+            .limit(1)
+        )).first()
+        checked_at = datetime.now(timezone.utc)
+        if latest is None:
+            return {"checkedAt": checked_at.isoformat(), "snapshotAt": None, "checked": 0, "mismatches": []}
+
+        base = await _snapshot_rows(db, latest.id)
+        deltas, count = await _log_deltas(db, latest.taken_at, None)
+        expected = _merge(base, deltas, 1)
+        live = await _live_rows(db)
+        await db.rollback()
+
+    mismatches = []
+    for key in sorted(expected.keys() | live.keys()):
+        want, have = expected.get(key, 0), live.get(key, 0)
+        if want != have:
+            mismatches.append({
+                "productId": key[0], "warehouseId": key[1],
+                "expected": want, "actual": have, "diff": have - want,
+            })
+    return {
+        "checkedAt": checked_at.isoformat(),
+        "snapshotAt": latest.taken_at.isoformat(),
+        "replayedLogs": count,
+        "checked": len(expected.keys() | live.keys()),
+        "mismatches": mismatches,
+    }
+
+
+class SnapshotScheduler:
+    """全局单例 snapshot_scheduler — 由 main.lifespan 启动"""
+
+    def __init__(self, interval_hours: int, check_interval: int):
+        self.interval = timedelta(hours=interval_hours)
+        self.check_interval = check_interval
+        self.last_snapshot: dict | None = None
+        self.last_reconcile: dict | None = None
+
+    async def tick(self) -> bool:
+        """到期则对账 + 拍摄, 返回是否执行"""
+        # 会话级 advisory lock 绑定在执行它的连接上: 整轮持有同一连接, 加锁与解锁在同一连接执行,
+        # 提交只结束事务不归还连接. 其他 worker 拿不到锁直接跳过
+        async with engine.connect() as conn:
+            if not await conn.scalar(select(func.pg_try_advisory_lock(SNAPSHOT_LOCK_KEY))):
+                await conn.commit()
+                return False
+            try:
+                latest = await conn.scalar(select(func.max(StockSnapshot.taken_at)))
+                await conn.commit()
+                if latest and datetime.now(timezone.utc) - latest < self.interval:
+                    return False
+                self.last_reconcile = await reconcile()
+                if self.last_reconcile["mismatches"]:
+                    print(f"[StockSnapshot] reconcile found {len(self.last_reconcile['mismatches'])} "
+                          f"mismatched rows since {self.last_reconcile['snapshotAt']}")
+                self.last_snapshot = await take_snapshot()
+                return True
+            finally:
+                await conn.rollback()  # 清理可能因异常中止的事务, 解锁语句才能执行
+                await conn.execute(select(func.pg_advisory_unlock(SNAPSHOT_LOCK_KEY)))
+                await conn.commit()
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[StockSnapshot] tick failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+
+snapshot_scheduler = SnapshotScheduler(
+    settings.STOCK_SNAPSHOT_INTERVAL_HOURS, settings.STOCK_SNAPSHOT_CHECK_INTERVAL
+)
@@ -0,0 +1,433 @@
+"""
+库存变动服务 — 所有出入库 / 调库都经由此处
+- 出库: 条件更新 UPDATE ... WHERE available >= qty RETURNING, 不足时更新 0 行, 无读-改-写竞态
+- 入库: INSERT ... ON CONFLICT (product_id, warehouse_id) DO UPDATE RETURNING, 首次入库自动建行
+- 调库: 先按仓库ID顺序对两行加锁 (避免对向调库死锁), 再出库 + 入库
+- StockLog 的 before_stock / after_stock 取自 RETURNING, 与库存更新处于同一事务
+- 预占: hold 只扣 available (同样是条件更新), consume_hold 发货时扣 current, unhold 归还
+- 每个条件更新同时 RETURNING (available, warning_value), 提交后由 stock_alerts 增量检测低库存
+- 批量: apply_batch 先校验全部行, 统一加锁后在快照上模拟, 再以单条多行 UPDATE + 批量 StockLog 插入落库
+调用方负责 commit; 失败抛出 StockError, 由调用方回滚并转换为 HTTP 400
+"""
+from dataclasses import dataclass
+
+from sqlalchemy import Integer, String, column, insert, select, tuple_, update
+from sqlalchemy import values as sa_values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+from app.models.stock import Stock, StockLog
+from app.models.warehouse import Warehouse
+from app.services.stock_alerts import record_levels
+
+STOCK_IN_TYPES = ("in", "return")
+STOCK_TYPES = ("in", "out", "transfer", "return")
+
+
+class StockError(Exception):
+    """库存操作失败 (库存不足 / 参数错误), message 可直接返回前端"""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+@dataclass(slots=True)
+class StockMovement:
+    before: int
+    after: int
+    log: StockLog
+
+
+async def increase(db: AsyncSession, product_id: str, warehouse_id: str, quantity: int) -> int:
+    """入库 upsert, 返回入库后的 current"""
+    stmt = pg_insert(Stock).values(
+        product_id=product_id,
+        warehouse_id=warehouse_id,
+        current=quantity,
+        available=quantity,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Stock.product_id, Stock.warehouse_id],
+        set_={
+            "current": Stock.current + stmt.excluded.current,
+            "available": Stock.available + stmt.excluded.available,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(Stock.current, Stock.available, Stock.warning_value)
+    current, available, warning = (await db.execute(stmt)).one()
+    record_levels(db, [(product_id, warehouse_id, available, warning)])
+    return current
+
+
+async def decrease(
+    db: AsyncSession, product_id: str, warehouse_id: str, quantity: int,
+    shortage_message: str = "可用库存不足",
+) -> int:
+    """条件出库, 返回出库后的 current; 可用库存不足时抛出 StockError"""
+    result = await db.execute(
+        update(Stock)
+        .where(
+            Stock.product_id == product_id,
+            Stock.warehouse_id == warehouse_id,
+            Stock.available >= quantity,
+        )
+        .values(current=Stock.current - quantity, available=Stock.available - quantity)
+        .returning(Stock.current, Stock.available, Stock.warning_value)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is not None:
+        record_levels(db, [(product_id, warehouse_id, row.available, row.warning_value)])
+        return row.current
+    # 仅失败路径多查一次, 区分 "无库存记录" 与 "数量不足"
+    exists = await db.execute(
+        select(Stock.id).where(Stock.product_id == product_id, Stock.warehouse_id == warehouse_id)
+    )
+    if exists.scalar_one_or_none() is None:
+        raise StockError("该仓库暂无该商品库存，无法操作")
+    raise StockError(shortage_message)
+
+
+async def lock_rows(
+    db: AsyncSession, keys: list[tuple[str, str]]
+) -> dict[tuple[str, str], tuple[int, int]]:
+    """
+    按 (product_id, warehouse_id) 排序后一次性 FOR UPDATE 锁定已存在的库存行,
+    返回 {(product_id, warehouse_id): (current, available)}
+    所有需要锁多行的操作都按同一顺序加锁, 不会互相死锁
+    """
+    if not keys:
+        return {}
+    # 按 (商品, 仓库) 对精确匹配; 两列各自 IN 会锁住整个笛卡尔积
+    result = await db.execute(
+        select(Stock.product_id, Stock.warehouse_id, Stock.current, Stock.available)
+        .where(tuple_(Stock.product_id, Stock.warehouse_id).in_(sorted(set(keys))))
+        .order_by(Stock.product_id, Stock.warehouse_id)
+        .with_for_update()
+    )
+    return {(row.product_id, row.warehouse_id): (row.current, row.available) for row in result}
+
+
+# ========== 预占 (订单) ==========
+
+async def hold(db: AsyncSession, product_id: str, quantity: int, attempts: int = 3) -> str:
+    """
+    从可用库存预占 quantity (只扣 available), 返回被占用的仓库ID
+    优先默认仓库, 其次可用量最大的仓库; 单仓满足, 不拆分
+    子查询选行 + 外层条件更新: 并发下外层 WHERE available >= qty 在行锁后重新判定,
+    被抢先扣减时更新 0 行, 以新快照重试
+    """
+    for _ in range(attempts):
+        candidate = (
+            select(Stock.id)
+            .join(Warehouse, Warehouse.id == Stock.warehouse_id)
+            .where(
+                Stock.product_id == product_id,
+                Stock.available >= quantity,
+                Warehouse.is_deleted == False,
+            )
+            .order_by(Warehouse.is_default.desc(), Stock.available.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            update(Stock)
+            .where(Stock.id == candidate, Stock.available >= quantity)
+            .values(available=Stock.available - quantity)
+            .returning(Stock.warehouse_id, Stock.available, Stock.warning_value)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one_or_none()
+        if row is not None:
+            record_levels(db, [(product_id, row.warehouse_id, row.available, row.warning_value)])
+            return row.warehouse_id
+        # 没有任何仓库满足时无需重试
+        exists = await db.execute(
+            select(Stock.id).where(Stock.product_id == product_id, Stock.available >= quantity).limit(1)
+        )
+        if exists.scalar_one_or_none() is None:
+            break
+    raise StockError("可用库存不足")
+
+
+async def unhold(db: AsyncSession, rows: list[tuple[str, str, int]]):
+    """归还预占 [(product_id, warehouse_id, quantity)] 到 available — 单条 UPDATE ... FROM (VALUES ...)"""
+    merged: dict[tuple[str, str], int] = {}
+    for p, w, q in rows:
+        merged[(p, w)] = merged.get((p, w), 0) + q
+    if not merged:
+        return
+    v = sa_values(
+        column("product_id", String),
+        column("warehouse_id", String),
+        column("delta", Integer),
+        name="v",
+    ).data([(p, w, q) for (p, w), q in sorted(merged.items())])
+    result = await db.execute(
+        update(Stock)
+        .where(Stock.product_id == v.c.product_id, Stock.warehouse_id == v.c.warehouse_id)
+        .values(available=Stock.available + v.c.delta)
+        .returning(Stock.product_id, Stock.warehouse_id, Stock.available, Stock.warning_value)
+        .execution_options(synchronize_session=False)
+    )
+    record_levels(db, result.all())
+
+
+async def consume_hold(db: AsyncSession, product_id: str, warehouse_id: str, quantity: int) -> int:
+    """预占转出库: available 已在预占时扣除, 此处只扣 current; 返回出库后的 current"""
+    result = await db.execute(
+        update(Stock)
+        .where(
+            Stock.product_id == product_id,
+            Stock.warehouse_id == warehouse_id,
+            Stock.current >= quantity,
+        )
+        .values(current=Stock.current - quantity)
+        .returning(Stock.current)
+        .execution_options(synchronize_session=False)
+    )
+    after = result.scalar_one_or_none()
+    if after is None:
+        raise StockError("当前库存不足，无法发货")
+    return after
+
+
+def validate(type: str, quantity: int, warehouse_id: str, target_warehouse_id: str | None):
+    if type not in STOCK_TYPES:
+        raise StockError(f"不支持的操作类型: {type}")
+    if quantity <= 0:
+        raise StockError("数量必须大于 0")
+    if type == "transfer":
+        if not target_warehouse_id:
+            raise StockError("必须指定目标仓库")
+        if target_warehouse_id == warehouse_id:
+            raise StockError("目标仓库不能与原仓库相同")
+
+
+async def apply_movement(
+    db: AsyncSession,
+    *,
+    type: str,
+    product_id: str,
+    warehouse_id: str,
+    quantity: int,
+    operator_id: str,
+    unit_price: float | None = None,
+    target_warehouse_id: str | None = None,
+    related_no: str | None = None,
+    remark: str | None = None,
+) -> StockMovement:
+    """
+    执行一笔库存变动并写入 StockLog (不提交)
+    调库的 before / after 记录原仓库数值, target_warehouse_id 记录目标仓库
+    """
+    validate(type, quantity, warehouse_id, target_warehouse_id)
+
+    if type in STOCK_IN_TYPES:
+        after = await increase(db, product_id, warehouse_id, quantity)
+        before = after - quantity
+    elif type == "out":
+        after = await decrease(db, product_id, warehouse_id, quantity)
+        before = after + quantity
+    else:
+        await lock_rows(db, [(product_id, warehouse_id), (product_id, target_warehouse_id)])
+        after = await decrease(db, product_id, warehouse_id, quantity, "原仓库库存不足")
+        before = after + quantity
+        await increase(db, product_id, target_warehouse_id, quantity)
+
+    log = StockLog(
+        product_id=product_id,
+        warehouse_id=warehouse_id,
+        type=type,
+        quantity=quantity,
+        before_stock=before,
+        after_stock=after,
+        unit_price=unit_price,
+        related_no=related_no,
+        target_warehouse_id=target_warehouse_id if type == "transfer" else None,
+        operator_id=operator_id,
+        remark=remark,
+    )
+    db.add(log)
+    return StockMovement(before, after, log)
+
+
+# ========== 批量变动 ==========
+
+@dataclass(slots=True)
+class BatchLine:
+    type: str
+    product_id: str
+    warehouse_id: str
+    quantity: int
+    unit_price: float | None = None
+    target_warehouse_id: str | None = None
+    related_no: str | None = None
+    remark: str | None = None
+
+
+@dataclass(slots=True)
+class LineResult:
+    index: int
+    ok: bool = False
+    skipped: bool = False
+    message: str | None = None
+    before: int | None = None
+    after: int | None = None
+
+    @property
+    def status(self) -> str:
+        return "ok" if self.ok else "skipped" if self.skipped else "failed"
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "status": self.status,
+            "message": self.message,
+            "beforeStock": self.before,
+            "afterStock": self.after,
+        }
+
+
+async def _check_references(db: AsyncSession, lines: list[BatchLine], results: list[LineResult]):
+    """商品 / 仓库存在性 — 各一次 IN 查询"""
+    product_ids = {line.product_id for line in lines}
+    warehouse_ids = {line.warehouse_id for line in lines} | {
+        line.target_warehouse_id for line in lines if line.target_warehouse_id
+    }
+    found_products = set((await db.execute(
+        select(Product.id).where(Product.id.in_(product_ids), Product.is_deleted == False)
+    )).scalars())
+    found_warehouses = set((await db.execute(
+        select(Warehouse.id).where(Warehouse.id.in_(warehouse_ids), Warehouse.is_deleted == False)
+    )).scalars())
+    for line, res in zip(lines, results):
+        if res.message:
+            continue
+        if line.product_id not in found_products:
+            res.message = "商品不存在"
+        elif line.warehouse_id not in found_warehouses:
+            res.message = "仓库不存在"
+        elif line.type == "transfer" and line.target_warehouse_id not in found_warehouses:
+            res.message = "目标仓库不存在"
+
+
+def _reject(results: list[LineResult]) -> tuple[bool, list[LineResult]]:
+    """atomic 模式整批拒绝: 未失败的行一律标记为未执行, 清除模拟得到的库存值"""
+    for res in results:
+        if not res.message:
+            res.ok = False
+            res.skipped = True
+            res.message = "未执行"
+            res.before = res.after = None
+    return False, results
+
+
+async def apply_batch(
+    db: AsyncSession, lines: list[BatchLine], operator_id: str, atomic: bool = True
+) -> tuple[bool, list[LineResult]]:
+    """
+    批量库存变动 (不提交), 返回 (是否有变更被应用, 逐行结果)
+    1. 先校验全部行 (参数 + 商品/仓库存在性)
+    2. 为入库目标补建空库存行, 再按统一顺序锁定所有涉及的行并读取当前值
+    3. 在锁定的快照上按行序模拟, 得到逐行 before / after 与每个 (商品, 仓库) 的净变化
+    4. 一条 UPDATE ... FROM (VALUES ...) 应用净变化, 一次批量插入 StockLog
+    atomic=True 时任一行失败则整批不执行, 仍会模拟完全部行以一次报告所有失败, 其余行标记为 skipped;
+    否则跳过失败行
+    """
+    results = [LineResult(index=i) for i in range(len(lines))]
+    for line, res in zip(lines, results):
+        try:
+            validate(line.type, line.quantity, line.warehouse_id, line.target_warehouse_id)
+        except StockError as e:
+            res.message = e.message
+    await _check_references(db, lines, results)
+
+    # atomic 模式下有行校验失败也继续模拟其余行, 以便一次报告全部库存不足
+    valid = [(line, res) for line, res in zip(lines, results) if not res.message]
+    if not valid:
+        return False, results
+
+    # 入库 / 调入目标可能尚无库存行 — 先补建 (已存在则忽略), 使其也能被锁定
+    inbound_keys = sorted({
+        (line.product_id, line.target_warehouse_id if line.type == "transfer" else line.warehouse_id)
+        for line, _ in valid if line.type != "out"
+    })
+    if inbound_keys:
+        await db.execute(
+            pg_insert(Stock)
+            .values([{"product_id": p, "warehouse_id": w, "current": 0, "available": 0}
+                     for p, w in inbound_keys])
+            .on_conflict_do_nothing(index_elements=[Stock.product_id, Stock.warehouse_id])
+        )
+
+    keys = {(line.product_id, line.warehouse_id) for line, _ in valid} | set(inbound_keys)
+    snapshot = await lock_rows(db, list(keys))
+    current = {k: v[0] for k, v in snapshot.items()}
+    available = {k: v[1] for k, v in snapshot.items()}
+    deltas: dict[tuple[str, str], int] = {}
+
+    def _shift(key, qty):
+        current[key] += qty
+        available[key] += qty
+        deltas[key] = deltas.get(key, 0) + qty
+
+    for line, res in valid:
+        key = (line.product_id, line.warehouse_id)
+        if line.type in STOCK_IN_TYPES:
+            res.before = current[key]
+            _shift(key, line.quantity)
+        else:
+            if key not in available:
+                res.message = "该仓库暂无该商品库存，无法操作"
+            elif available[key] < line.quantity:
+                res.message = "原仓库库存不足" if line.type == "transfer" else "可用库存不足"
+            if res.message:
+                continue
+            res.before = current[key]
+            _shift(key, -line.quantity)
+            if line.type == "transfer":
+                _shift((line.product_id, line.target_warehouse_id), line.quantity)
+        res.after = current[key]
+        res.ok = True
+
+    if atomic and any(r.message for r in results):
+        return _reject(results)
+
+    applied = [(line, res) for line, res in valid if res.ok]
+    changed = [(p, w, d) for (p, w), d in deltas.items() if d]
+    if changed:
+        v = sa_values(
+            column("product_id", String),
+            column("warehouse_id", String),
+            column("delta", Integer),
+            name="v",
+        ).data(changed)
+        result = await db.execute(
+            update(Stock)
+            .where(Stock.product_id == v.c.product_id, Stock.warehouse_id == v.c.warehouse_id)
+            .values(current=Stock.current + v.c.delta, available=Stock.available + v.c.delta)
+            .returning(Stock.product_id, Stock.warehouse_id, Stock.available, Stock.warning_value)
+            .execution_options(synchronize_session=False)
+        )
+        record_levels(db, result.all())
+    if applied:
+        await db.execute(insert(StockLog), [
+            {
+                "product_id": line.product_id,
+                "warehouse_id": line.warehouse_id,
+                "type": line.type,
+                "quantity": line.quantity,
+                "before_stock": res.before,
+                "after_stock": res.after,
+                "unit_price": line.unit_price,
+                "related_no": line.related_no,
+                "target_warehouse_id": line.target_warehouse_id if line.type == "transfer" else None,
+                "operator_id": operator_id,
+                "remark": line.remark,
+            }
+            for line, res in applied
+        ])
+    return bool(applied), results
@@ -0,0 +1,486 @@
+"""
+库存估值 — 移动加权平均 (wac) / 先进先出 (fifo), 基于 StockLog 向量化计算
+- 日志按列载入 NumPy 数组, 调库拆为 "原仓库出 + 目标仓库入" 两条事件
+- 入库计价: 有 unit_price 按其计价; 无单价的入库 / 退货 / 调入按当时的商品级移动平均成本计价,
+  商品无结存时退回 Product.cost
+- 移动加权平均: 结存金额满足线性递推 V_k = r_k * V_{k-1} + a_k
+  (计价入库 r=1, a=数量×单价; 出库及按均价入库 r=结存数量变化比, a=0),
+  以对数空间累乘 + logaddexp 累加一次求出, 结存归零处断开分段
+- 先进先出: 每个 (商品, 仓库) 的累计入库数量 / 金额构成分段线性的 "前 x 件成本" 曲线,
+  累计出库数量在曲线上插值 (np.interp, 内部 searchsorted) 即得累计出库成本; 各组平移到同一坐标轴一次插值
+- 缓存: 按自然月缓存期初状态与本期累计, 已确认水位随新日志增量推进 (只读取水位之后的日志, 以水位状态为种子).
+  created_at 在 flush 时取值而非提交时, 长事务提交的日志可能落在水位之前:
+  · 水位只推进到 now - VALUATION_LATE_WINDOW_SECONDS; 水位之后的尾部每次请求重新读取计算, 不并入缓存
+  · 每次请求核对本期 (期初, 水位] 的日志条数, 与已回放条数不符则作废本期及之后的缓存
+  · 每 VALUATION_REBUILD_HOURS 小时清空全部缓存 (含已结束月份与月初状态) 重新计算
+计算在线程池中执行, 不阻塞事件循环
+"""
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.product import Product
+from app.models.stock import StockLog
+
+settings = get_settings()
+
+Key = tuple[str, str]
+METHODS = ("wac", "fifo")
+# 每组结果列: 期初数量/金额, 入库数量/金额, 出库数量/金额, 期末数量/金额
+COLUMNS = ("openingQty", "openingValue", "inQty", "inValue", "outQty", "outValue", "closingQty", "closingValue")
+
+
+@dataclass
+class ValuationState:
+    """某一时点 (at, epoch 秒; 含该时点及之前的全部日志) 的结存"""
+    at: float = float("-inf")
+    product: dict[str, tuple[float, float]] = field(default_factory=dict)   # 商品级 (数量, 金额)
+    wac: dict[Key, tuple[float, float]] = field(default_factory=dict)       # (数量, 金额)
+    fifo: dict[Key, list[tuple[float, float]]] = field(default_factory=dict)  # 剩余批次 [(数量, 单价)]
+
+
+@dataclass
+class LogColumns:
+    product_id: list[str]
+    warehouse_id: list[str]
+    target_warehouse_id: list[str | None]
+    type: list[str]
+    quantity: np.ndarray
+    unit_price: np.ndarray  # 无单价为 nan
+    at: np.ndarray          # epoch 秒
+
+    def __len__(self):
+        return len(self.type)
+
+
+# ========== 向量化原语 ==========
+
+def _segment_starts(group: np.ndarray) -> np.ndarray:
+    start = np.ones(len(group), dtype=bool)
+    start[1:] = group[1:] != group[:-1]
+    return start
+
+
+def _segmented_cumsum(x: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """按 start 标记分段的前缀和"""
+    total = np.cumsum(x)
+    idx = np.flatnonzero(start)
+    offset = total[idx] - x[idx]
+    seg = np.cumsum(start) - 1
+    return total - offset[seg]
+
+
+def _linear_scan(r: np.ndarray, a: np.ndarray, reset: np.ndarray) -> np.ndarray:
+    """
+    求解 V_k = r_k * V_{k-1} + a_k, reset[k] 处 V_{k-1} 视为 0 (须 reset[0] = True)
+    V_k = P_k * Σ_{i∈段, i≤k} a_i / P_i, P 为段内 r 的累乘; 在对数空间计算避免长序列下溢:
+    log V_k = L_k + logcumsumexp(log a_i - L_i). 段间隔离: 第 s 段整体加 s×span,
+    使前段累计值相对当前段可忽略, 从而一次 logaddexp.accumulate 完成分段累加
+    """
+    n = len(r)
+    if n == 0:
+        return np.zeros(0)
+    safe_r = np.where(reset | (r <= 0), 1.0, r)
+    L = np.cumsum(np.log(safe_r))
+    seg = np.cumsum(reset)
+    # 以段首为零点, 缩小数值范围
+    L -= L[np.flatnonzero(reset)][seg - 1]
+    with np.errstate(divide="ignore"):
+        b = np.log(np.where(a > 0, a, 0.0)) - L
+    finite = np.isfinite(b)
+    if not finite.any():
+        return np.zeros(n)
+    span = b[finite].max() - b[finite].min() + 64.0
+    shifted = b + span * seg
+    acc = np.logaddexp.accumulate(shifted)
+    V = np.exp(acc - span * seg + L)
+    # 段内尚无 a > 0 时结果为 0 (累加值只来自前段)
+    has = _segmented_cumsum((a > 0).astype(np.int64), reset) > 0
+    return np.where(has, V, 0.0)
+
+
+def _stock_walk(group, dq, price, avg_mode, fallback):
+    """
+    单层 (商品级或仓库级) 移动加权平均
+    group: 已排序的分组码; dq: 数量变化 (入正出负, 中性事件 0)
+    price: 计价入库单价 (其余 nan); avg_mode: 按当前均价入库的事件
+    fallback: 结存为空时入库使用的单价
+    返回 (结存数量, 结存金额)
+    """
+    start = _segment_starts(group)
+    Qa = _segmented_cumsum(dq, start)
+    Qb = Qa - dq
+    inbound = dq > 0
+    priced = inbound & ~avg_mode
+    empty = Qb <= 0
+    reset = empty | (Qa <= 0) | start
+    in_price = np.where(np.isnan(price), fallback, price)
+    a = np.where(
+        empty,
+        np.where(inbound, np.maximum(Qa, 0) * in_price, 0.0),
+        np.where(priced, dq * in_price, 0.0),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(priced, 1.0, np.where(Qb > 0, np.maximum(Qa, 0) / Qb, 0.0))
+    return Qa, _linear_scan(r, a, reset)
+
+
+def _running_min(x: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """分段前缀最小值 — 后一段整体下移, 使前段的值不会成为最小值"""
+    seg = np.cumsum(start)
+    span = (x.max() - x.min() + 1.0) if len(x) else 1.0
+    return np.minimum.accumulate(x - seg * span) + seg * span
+
+
+def _fifo_walk(group, q_in, unit_cost, q_out):
+    """
+    单层先进先出; 输入已按 (组, 时间) 排序
+    超出结存的出库 (负库存) 不消耗之后的入库批次: 有效累计出库 = 累计出库 - 累计缺口,
+    缺口 = max(0, -min(累计入库 - 累计出库)), 与逐行 "批次用尽即止" 一致
+    返回 (逐行出库成本, 组码数组, 各组有效累计出库, 逐行累计入库)
+    """
+    start = _segment_starts(group)
+    CI = _segmented_cumsum(q_in, start)
+    CV = _segmented_cumsum(q_in * unit_cost, start)
+    CO = _segmented_cumsum(q_out, start)
+    shortfall = -np.minimum(_running_min(CI - CO, start), 0.0)
+    CE = CO - shortfall
+
+    codes, first = np.unique(group, return_index=True)
+    last = np.r_[first[1:], len(group)] - 1
+    TI, TV, TE = CI[last], CV[last], CE[last]
+    offQ = np.r_[0.0, np.cumsum(TI)[:-1]]
+    offV = np.r_[0.0, np.cumsum(TV)[:-1]]
+    pos = np.searchsorted(codes, group)
+
+    # 各组曲线平移到同一坐标轴: 组起点 (offQ, offV) + 每次入库后的累计点
+    layer = q_in > 0
+    xp = np.r_[offQ, offQ[pos[layer]] + CI[layer]]
+    fp = np.r_[offV, offV[pos[layer]] + CV[layer]]
+    order = np.argsort(xp, kind="stable")
+    xp, fp = xp[order], fp[order]
+
+    consumed = np.interp(offQ[pos] + CE, xp, fp) - offV[pos]
+    out_cost = consumed - np.where(start, 0.0, np.r_[0.0, consumed[:-1]])
+    return out_cost, codes, TE, CI
+
+
+# ========== 计算引擎 ==========
+
+def compute(state: ValuationState, logs: LogColumns, cost: dict[str, float], until: float):
+    """
+    以 state 为期初, 推进 logs (已按时间排序), 返回 (期末状态, {method: {key: [8 列]}})
+    纯 CPU 计算, 由 ValuationEngine 放到线程中执行
+    """
+    n = len(logs)
+    # ---- 事件展开: 调库拆成出 / 入两条, seq 保持日志顺序且调出先于调入 ----
+    types = np.asarray(logs.type, dtype=object)
+    is_transfer = types == "transfer"
+    is_in = (types == "in") | (types == "return")
+    xfer = np.flatnonzero(is_transfer)
+
+    ev_product = logs.product_id + [logs.product_id[i] for i in xfer]
+    ev_warehouse = logs.warehouse_id + [logs.target_warehouse_id[i] for i in xfer]
+    ev_seq = np.r_[np.arange(n) * 2, xfer * 2 + 1].astype(np.float64)
+    ev_qty = np.r_[logs.quantity, logs.quantity[xfer]].astype(np.float64)
+    ev_in = np.r_[is_in, np.ones(len(xfer), dtype=bool)]
+    ev_transfer = np.r_[is_transfer, np.ones(len(xfer), dtype=bool)]
+    ev_price = np.r_[np.where(is_in, logs.unit_price, np.nan), np.full(len(xfer), np.nan)]
+
+    # ---- 编码: 商品 / (商品, 仓库) ----
+    keys = sorted(set(zip(ev_product, ev_warehouse)) | state.wac.keys() | state.fifo.keys())
+    key_code = {k: i for i, k in enumerate(keys)}
+    products = sorted({k[0] for k in keys} | state.product.keys())
+    product_code = {p: i for i, p in enumerate(products)}
+    fallback_by_code = np.array([cost.get(p) or 0.0 for p in products]) if products else np.zeros(0)
+
+    ev_pc = np.array([product_code[p] for p in ev_product], dtype=np.int64)
+    ev_gc = np.array([key_code[k] for k in zip(ev_product, ev_warehouse)], dtype=np.int64)
+    m = len(ev_seq)
+
+    # ---- 第一层: 商品级移动加权平均 (调库为中性事件), 给无单价入库 / 调入定价 ----
+    # 种子 = 上一水位的结存, 作为首条事件 (负结存同样带入, 金额为 0)
+    seed_p = [(product_code[p], q, v) for p, (q, v) in state.product.items() if q != 0]
+    sp_pc = np.array([s[0] for s in seed_p], dtype=np.int64)
+    sp_q = np.array([s[1] for s in seed_p], dtype=np.float64)
+    sp_price = np.array([s[2] / s[1] if s[1] > 0 else np.nan for s in seed_p], dtype=np.float64)
+
+    p_group = np.r_[sp_pc, ev_pc]
+    p_seq = np.r_[np.full(len(seed_p), -1.0), ev_seq]
+    p_dq = np.r_[sp_q, np.where(ev_transfer, 0.0, np.where(ev_in, ev_qty, -ev_qty))]
+    p_price = np.r_[sp_price, ev_price]
+    p_avg = np.r_[np.zeros(len(seed_p), dtype=bool), ev_in & ~ev_transfer & np.isnan(ev_price)]
+    order = np.lexsort((p_seq, p_group))
+    g = p_group[order]
+    Qa, V = _stock_walk(g, p_dq[order], p_price[order], p_avg[order], fallback_by_code[g])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        u_after = np.where(Qa > 0, V / Qa, np.nan)
+    start = _segment_starts(g)
+    u_before = np.r_[np.nan, u_after[:-1]]
+    u_before = np.where(start | np.isnan(u_before), fallback_by_code[g], u_before)
+    unit_before = np.empty(len(order))
+    unit_before[order] = u_before
+    ev_unit = unit_before[len(seed_p):]  # 每个事件发生前的商品级均价
+
+    last = np.r_[np.flatnonzero(start[1:]), len(g) - 1] if len(g) else np.zeros(0, dtype=np.int64)
+    new_product = {products[g[i]]: (float(Qa[i]), float(V[i])) for i in last}
+
+    # ---- 第二层: (商品, 仓库) ----
+    ev_in_price = np.where(ev_in, np.where(np.isnan(ev_price), ev_unit, ev_price), np.nan)
+    ev_dq = np.where(ev_in, ev_qty, -ev_qty)
+    totals: dict[str, dict[Key, list[float]]] = {}
+    new_state = ValuationState(at=until, product=new_product)
+
+    # 移动加权平均
+    seed_w = [(key_code[k], q, v) for k, (q, v) in state.wac.items() if q != 0]
+    w_group = np.r_[np.array([s[0] for s in seed_w], dtype=np.int64), ev_gc]
+    w_seq = np.r_[np.full(len(seed_w), -1.0), ev_seq]
+    w_dq = np.r_[np.array([s[1] for s in seed_w], dtype=np.float64), ev_dq]
+    w_price = np.r_[np.array([s[2] / s[1] if s[1] > 0 else np.nan for s in seed_w], dtype=np.float64), ev_in_price]
+    w_seed = np.r_[np.ones(len(seed_w), dtype=bool), np.zeros(m, dtype=bool)]
+    order = np.lexsort((w_seq, w_group))
+    g = w_group[order]
+    dq = w_dq[order]
+    Qa, V = _stock_walk(g, dq, w_price[order], np.zeros(len(g), dtype=bool), np.zeros(len(g)))
+    start = _segment_starts(g)
+    dV = V - np.where(start, 0.0, np.r_[0.0, V[:-1]])
+    live = ~w_seed[order]
+    acc = np.zeros((len(keys), 8))
+    np.add.at(acc[:, 2], g[live & (dq > 0)], dq[live & (dq > 0)])
+    np.add.at(acc[:, 3], g[live & (dq > 0)], dV[live & (dq > 0)])
+    np.add.at(acc[:, 4], g[live & (dq < 0)], -dq[live & (dq < 0)])
+    np.add.at(acc[:, 5], g[live & (dq < 0)], -dV[live & (dq < 0)])
+    new_state.wac = {}
+    last = np.r_[np.flatnonzero(start[1:]), len(g) - 1] if len(g) else np.zeros(0, dtype=np.int64)
+    for i in last:
+        new_state.wac[keys[g[i]]] = (float(Qa[i]), float(V[i]))
+    totals["wac"] = _assemble(keys, acc, state.wac, new_state.wac)
+
+    # 先进先出
+    seed_f = [(key_code[k], q, c) for k, layers in state.fifo.items() for q, c in layers if q > 0]
+    f_group = np.r_[np.array([s[0] for s in seed_f], dtype=np.int64), ev_gc]
+    f_seq = np.r_[np.full(len(seed_f), -1.0), ev_seq]
+    f_in = np.r_[np.array([s[1] for s in seed_f], dtype=np.float64), np.where(ev_in, ev_qty, 0.0)]
+    f_cost = np.r_[np.array([s[2] for s in seed_f], dtype=np.float64), np.nan_to_num(ev_in_price)]
+    f_out = np.r_[np.zeros(len(seed_f)), np.where(ev_in, 0.0, ev_qty)]
+    f_seed = np.r_[np.ones(len(seed_f), dtype=bool), np.zeros(m, dtype=bool)]
+    order = np.lexsort((f_seq, f_group))
+    g, q_in, unit, q_out = f_group[order], f_in[order], f_cost[order], f_out[order]
+    acc = np.zeros((len(keys), 8))
+    new_state.fifo = {}
+    fifo_close = {}
+    if len(g):
+        out_cost, codes, TE, CI = _fifo_walk(g, q_in, unit, q_out)
+        live = ~f_seed[order]
+        np.add.at(acc[:, 2], g[live], q_in[live])
+        np.add.at(acc[:, 3], g[live], (q_in * unit)[live])
+        np.add.at(acc[:, 4], g[live], q_out[live])
+        np.add.at(acc[:, 5], g[live], out_cost[live])
+        pos = np.searchsorted(codes, g)
+        # 剩余批次: 每个入库批次中未被累计出库覆盖的部分
+        remain = np.clip(CI - np.maximum(TE[pos], CI - q_in), 0.0, q_in)
+        for i in np.flatnonzero((q_in > 0) & (remain > 0)):
+            new_state.fifo.setdefault(keys[g[i]], []).append((float(remain[i]), float(unit[i])))
+        for code in codes:
+            # 数量取实际结存 (可为负), 金额 = 剩余批次金额
+            key = keys[code]
+            layers = new_state.fifo.get(key, [])
+            fifo_close[key] = (new_state.wac.get(key, (0.0, 0.0))[0], float(sum(q * c for q, c in layers)))
+    totals["fifo"] = _assemble(
+        keys, acc,
+        {
+            k: (state.wac.get(k, (0.0, 0.0))[0], sum(q * c for q, c in state.fifo.get(k, [])))
+            for k in state.wac.keys() | state.fifo.keys()
+        },
+        fifo_close,
+    )
+    return new_state, totals
+
+
+def _assemble(keys, acc, opening, closing) -> dict[Key, list[float]]:
+    out = {}
+    for i, key in enumerate(keys):
+        oq, ov = opening.get(key, (0.0, 0.0))
+        cq, cv = closing.get(key, (oq, ov))
+        row = [oq, ov, *acc[i, 2:6], cq, cv]
+        if any(row):
+            out[key] = row
+    return out
+
+
+# ========== 按月缓存 + 增量推进 ==========
+
+@dataclass
+class PeriodResult:
+    period: str
+    start: float
+    end: float
+    opening: ValuationState
+    running: ValuationState                     # 水位 running.at 处的状态
+    totals: dict[str, dict[Key, list[float]]]   # 期初 → 水位的累计
+    logs: int = 0                               # (期初, 水位] 内已回放的日志条数
+
+    @property
+    def closed(self) -> bool:
+        return self.running.at >= self.end
+
+
+def period_bounds(period: str) -> tuple[float, float]:
+    """'2026-03' → 本地时区月初 / 下月初的 epoch 秒"""
+    year, month = (int(x) for x in period.split("-"))
+    start = datetime(year, month, 1).astimezone()
+    end = datetime(year + month // 12, month % 12 + 1, 1).astimezone()
+    return start.timestamp(), end.timestamp()
+
+
+def _merge_totals(base: dict, delta: dict) -> dict:
+    """累计合并: 期初取 base, 期末取 delta, 中间四列相加"""
+    merged = {}
+    for method in METHODS:
+        rows = {k: list(v) for k, v in base.get(method, {}).items()}
+        for key, row in delta.get(method, {}).items():
+            old = rows.get(key)
+            if old is None:
+                rows[key] = list(row)
+            else:
+                rows[key] = old[:2] + [old[i] + row[i] for i in range(2, 6)] + row[6:]
+        merged[method] = rows
+    return merged
+
+
+class ValuationEngine:
+    """全局单例 valuation_engine"""
+
+    def __init__(self, max_periods: int, late_window: float, rebuild_hours: float):
+        self.max_periods = max_periods
+        self.late_window = late_window
+        self.rebuild_interval = rebuild_hours * 3600
+        self._periods: OrderedDict[str, PeriodResult] = OrderedDict()
+        # 月初状态 (期初) — 计算更早月份或新月份时就近作为种子
+        self._boundaries: dict[float, ValuationState] = {}
+        self._built_at = datetime.now(timezone.utc).timestamp()
+        self._lock = asyncio.Lock()
+        self.logs_replayed = 0
+        self.invalidations = 0
+
+    def _invalidate(self, start: float = float("-inf")):
+        """作废 start 之后 (含) 开始的月份及晚于 start 的月初状态"""
+        for period in [p for p, r in self._periods.items() if r.start >= start]:
+            del self._periods[period]
+        for at in [at for at in self._boundaries if at > start]:
+            del self._boundaries[at]
+        self.invalidations += 1
+
+    async def _load(self, db: AsyncSession, after: float, until: float) -> LogColumns:
+        conds = [StockLog.created_at <= datetime.fromtimestamp(until, timezone.utc)]
+        if after != float("-inf"):
+            conds.append(StockLog.created_at > datetime.fromtimestamp(after, timezone.utc))
+        result = await db.execute(
+            select(
+                StockLog.product_id, StockLog.warehouse_id, StockLog.target_warehouse_id,
+                StockLog.type, StockLog.quantity, StockLog.unit_price, StockLog.created_at,
+            )
+            .where(*conds)
+            .order_by(StockLog.created_at, StockLog.id)
+        )
+        rows = result.all()
+        self.logs_replayed += len(rows)
+        if not rows:
+            return LogColumns([], [], [], [], np.zeros(0), np.zeros(0), np.zeros(0))
+        p, w, t, ty, q, price, at = zip(*rows)
+        return LogColumns(
+            product_id=list(p),
+            warehouse_id=list(w),
+            target_warehouse_id=list(t),
+            type=list(ty),
+            quantity=np.array(q, dtype=np.float64),
+            unit_price=np.array([np.nan if x is None else x for x in price], dtype=np.float64),
+            at=np.array([x.timestamp() for x in at], dtype=np.float64),
+        )
+
+    async def _advance(self, db, state, until, cost):
+        logs = await self._load(db, state.at, until)
+        new_state, totals = await asyncio.to_thread(compute, state, logs, cost, until)
+        return new_state, totals, len(logs)
+
+    async def _count(self, db: AsyncSession, after: float, until: float) -> int:
+        return await db.scalar(
+            select(func.count()).select_from(StockLog).where(
+                StockLog.created_at > datetime.fromtimestamp(after, timezone.utc),
+                StockLog.created_at <= datetime.fromtimestamp(until, timezone.utc),
+            )
+        )
+
+    async def _opening(self, db, start, cost) -> ValuationState:
+        # 期初: 就近取不晚于月初的已知状态, 只回放其后的日志
+        seeds = [at for at in self._boundaries if at <= start]
+        seed = self._boundaries[max(seeds)] if seeds else ValuationState()
+        opening, _, _ = await self._advance(db, seed, start, cost)
+        return opening
+
+    async def period(self, db: AsyncSession, period: str) -> PeriodResult:
+        start, end = period_bounds(period)
+        now = datetime.now(timezone.utc).timestamp()
+        settled = min(end, now - self.late_window)
+        async with self._lock:
+            if now - self._built_at >= self.rebuild_interval:
+                self._invalidate()
+                self._built_at = now
+            cost = dict((await db.execute(select(Product.id, Product.cost))).all())
+            if start > now:
+                state = ValuationState(at=start)
+                return PeriodResult(period, start, end, state, state, {})
+            if start > settled:
+                # 月初尚在迟到窗口内, 期初也未确认 — 整体现算, 不缓存
+                opening = await self._opening(db, start, cost)
+                running, totals, _ = await self._advance(db, opening, min(end, now), cost)
+                return PeriodResult(period, start, end, opening, running, totals)
+
+            result = self._periods.get(period)
+            if result is not None and result.logs != await self._count(db, start, result.running.at):
+                # 水位之前出现了迟到提交的日志
+                self._invalidate(start)
+                result = None
+            if result is None:
+                opening = self._boundaries.get(start) or await self._opening(db, start, cost)
+                self._boundaries[start] = opening
+                result = PeriodResult(period, start, end, opening, opening, {})
+                self._periods[period] = result
+            if not result.closed and result.running.at < settled:
+                running, delta, count = await self._advance(db, result.running, settled, cost)
+                result.totals = _merge_totals(result.totals, delta)
+                result.running = running
+                result.logs += count
+                if result.closed:
+                    self._boundaries.setdefault(end, running)
+            self._periods.move_to_end(period)
+            while len(self._periods) > self.max_periods:
+                self._periods.popitem(last=False)
+
+            if result.closed:
+                return result
+            # 尾部 (水位, now]: 每次重新计算, 迟到提交的日志下次请求自然计入
+            running, tail, _ = await self._advance(db, result.running, min(end, now), cost)
+            return PeriodResult(
+                period, start, end, result.opening, running,
+                _merge_totals(result.totals, tail), result.logs,
+            )
+
+    def stats(self) -> dict:
+        return {
+            "periods": list(self._periods),
+            "boundaries": len(self._boundaries),
+            "logsReplayed": self.logs_replayed,
+            "invalidations": self.invalidations,
+        }
+
+
+valuation_engine = ValuationEngine(
+    settings.VALUATION_CACHE_PERIODS, settings.VALUATION_LATE_WINDOW_SECONDS, settings.VALUATION_REBUILD_HOURS
+)
@@ -1,83 +1,423 @@
 """
-WebSocket 连接管理器 + 心跳 + 互踢
+WebSocket 连接管理器 + 心跳 + 互踢 + 超时清扫 + 帧合并 + 二进制编码 + 重连风暴保护
 对齐 BACKEND_CONTEXT.md § 4.4 / § 4.6
 """
+import asyncio
 import json
+import random
 import time
+from collections import deque
 from typing import Any
 
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.core.config import get_settings
+from app.core.metrics import registry
+from app.core.tracing import span
+
+try:
+    import msgpack
+except ImportError:  # 未安装时仅支持 JSON 文本帧
+    msgpack = None
+
+settings = get_settings()
+
+# 支持的帧编码: json → 文本帧, msgpack → 二进制帧
+WS_FORMATS = ("json", "msgpack") if msgpack is not None else ("json",)
+
+
+def encode_frame(event: dict, fmt: str = "json") -> str | bytes:
+    """按连接格式编码一帧 — JSON 与 starlette send_json 保持一致的紧凑输出"""
+    if fmt == "msgpack":
+        return msgpack.packb(event, use_bin_type=True)
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_frame(message: dict) -> dict:
+    """解析客户端入站帧 — 文本帧按 JSON, 二进制帧按 MessagePack"""
+    if message.get("bytes") is not None:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        return msgpack.unpackb(message["bytes"], raw=False)
+    return json.loads(message["text"])
+
+
+class TimerWheel:
+    """
+    单层时间轮 — 所有连接共用一个清扫任务, 而不是每个连接一个定时器
+    - 槽位按 tick 划分, 每个槽位保存截止时间落在该 tick 的 key 集合
+    - schedule / cancel 均为 O(1); advance 只扫描走过的槽位
+    - 超过一圈的截止时间放入最远槽位, 到期后由调用方按 last_seen 复核并重新登记
+    """
+
+    def __init__(self, tick: float, span: float):
+        self.tick = tick
+        self.size = int(span / tick) + 2
+        self.slots: list[set[str]] = [set() for _ in range(self.size)]
+        self.cursor = int(time.monotonic() / tick)
+        self._slot_of: dict[str, int] = {}
+
+    def schedule(self, key: str, deadline: float):
+        """登记 key 在 deadline (monotonic 秒) 到期"""
+        ticks = min(max(int(deadline / self.tick), self.cursor + 1), self.cursor + self.size - 1)
+        idx = ticks % self.size
+        old = self._slot_of.get(key)
+        if old is not None:
+            self.slots[old].discard(key)
+        self.slots[idx].add(key)
+        self._slot_of[key] = idx
+
+    def cancel(self, key: str):
+        idx = self._slot_of.pop(key, None)
+        if idx is not None:
+            self.slots[idx].discard(key)
+
+    def advance(self, now: float) -> list[str]:
+        """推进指针到 now, 返回走过的槽位中全部到期 key"""
+        target = int(now / self.tick)
+        # 清扫任务被长时间阻塞时, 最多转一圈即可覆盖全部槽位
+        steps = min(target - self.cursor, self.size)
+        expired: list[str] = []
+        for i in range(1, steps + 1):
+            idx = (self.cursor + i) % self.size
+            bucket = self.slots[idx]
+            if bucket:
+                self.slots[idx] = set()
+                for key in bucket:
+                    self._slot_of.pop(key, None)
+                expired.extend(bucket)
+        self.cursor = max(self.cursor, target)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+
+class Connection:
+    """
+    单个 WebSocket 连接的写端
+    - 默认模式: 每个事件立即发送一帧
+    - 批量模式 (?batch=true): 同一 tick 内排队的事件合并为一个 batch 帧
+      { type: "batch", data: [WSEvent, ...], timestamp }, 数组顺序即入队顺序
+    - fmt: json (文本帧, 默认) / msgpack (二进制帧, ?format=msgpack)
+    所有发往该连接的事件 (推送 / 广播 / pong / im.ack) 都必须经过 send, 才能保证顺序
+    """
+
+    __slots__ = ("user_id", "websocket", "batch", "fmt", "_pending", "_flush_task", "_on_broken")
+
+    def __init__(
+        self,
+        user_id: str,
+        websocket: WebSocket,
+        batch: bool = False,
+        fmt: str = "json",
+        on_broken=None,
+    ):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.batch = batch
+        self.fmt = fmt
+        self._pending: list[dict] = []
+        self._flush_task: asyncio.Task | None = None
+        self._on_broken = on_broken
+
+    async def send(self, event: dict, frames: dict[str, str | bytes] | None = None):
+        """
+        发送事件 — 批量模式下仅入队, 由 tick 定时器统一刷出
+        frames: 广播时共享的 {fmt: 已编码帧} 缓存, 同一事件每种格式只编码一次
+        """
+        WS_MESSAGES_SENT.inc(event.get("type", ""))
+        if not self.batch:
+            if frames is None:
+                await self._write(encode_frame(event, self.fmt))
+                return
+            frame = frames.get(self.fmt)
+            if frame is None:
+                frame = frames[self.fmt] = encode_frame(event, self.fmt)
+            await self._write(frame)
+            return
+        self._pending.append(event)
+        if len(self._pending) >= settings.WS_BATCH_MAX_EVENTS:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(settings.WS_BATCH_TICK_MS / 1000)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception:
+            if self._on_broken:
+                self._on_broken(self)
+
+    async def flush(self):
+        """立即刷出排队事件 — 单个事件按原格式发送, 多个事件合并为 batch 帧"""
+        events, self._pending = self._pending, []
+        if not events:
+            return
+        if len(events) == 1:
+            await self._write(encode_frame(events[0], self.fmt))
+            return
+        await self._write(encode_frame({
+            "type": "batch",
+            "data": events,
+            "timestamp": int(time.time() * 1000),
+        }, self.fmt))
+
+    async def _write(self, frame: str | bytes):
+        if isinstance(frame, bytes):
+            await self.websocket.send_bytes(frame)
+        else:
+            await self.websocket.send_text(frame)
+
+    async def receive(self) -> dict:
+        """读取一条客户端消息 — 兼容文本 / 二进制帧, 对端断开时抛出 WebSocketDisconnect"""
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        return decode_frame(message)
+
+    async def close(self, code: int = 1000):
+        """先刷出排队事件再关闭, 保证 sys.kick 等收尾事件送达"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        try:
+            await self.flush()
+        finally:
+            await self.websocket.close(code=code)
+
+    def discard(self):
+        """连接已失效 — 丢弃排队事件并取消定时刷出"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._pending = []
+
+
+class HandshakeGate:
+    """
+    WebSocket 握手准入控制 — 部署或网络抖动后所有客户端同时重连时保护事件循环和连接池
+    - 同时处理的握手数不超过 WS_HANDSHAKE_CONCURRENCY, 超出的最多排队 WS_HANDSHAKE_WAIT_MS
+    - 排队超时或排队过长直接拒绝, 由调用方以 1013 (Try Again Later) 关闭并附带建议重试延迟
+    - 记录最近的握手时间, 供 PresenceAnnouncer 判断是否处于风暴期
+    """
+
+    def __init__(self):
+        self.limit = settings.WS_HANDSHAKE_CONCURRENCY
+        self._sem = asyncio.Semaphore(self.limit)
+        self.waiting = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self._recent: deque[float] = deque()
+
+    async def acquire(self) -> bool:
+        """尝试获得握手名额 — 返回 False 表示应拒绝本次握手"""
+        if self._sem.locked() and self.waiting >= self.limit:
+            self.rejected_total += 1
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=settings.WS_HANDSHAKE_WAIT_MS / 1000)
+        except TimeoutError:
+            self.rejected_total += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.admitted_total += 1
+        self._recent.append(time.monotonic())
+        return True
+
+    def release(self):
+        self._sem.release()
+
+    def retry_after_ms(self) -> int:
+        """建议重试延迟 — 随排队压力线性放大, 再做 50%~100% 随机抖动, 打散下一波重连"""
+        pressure = 1 + self.waiting / self.limit
+        delay = min(settings.WS_RETRY_BASE_MS * pressure, settings.WS_RETRY_MAX_MS)
+        return int(random.uniform(delay / 2, delay))
+
+    def recent_handshakes(self) -> int:
+        """风暴窗口 (WS_STORM_WINDOW 秒) 内完成准入的握手数"""
+        cutoff = time.monotonic() - settings.WS_STORM_WINDOW
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+        return len(self._recent)
+
+    def storming(self) -> bool:
+        return self.recent_handshakes() >= settings.WS_STORM_THRESHOLD
+
+
+class PresenceAnnouncer:
+    """
+    上下线广播 (status.change) 节流
+    - 平时立即广播 (状态与上次已广播的相同则跳过)
+    - 风暴期只记录每个用户的最新状态, 握手平息 WS_PRESENCE_SETTLE 秒后统一广播;
+      期间 offline → online 的抖动互相抵消, 只广播与上次已广播状态不同的用户
+    """
+
+    def __init__(self, manager: "ConnectionManager", gate: HandshakeGate):
+        self.manager = manager
+        self.gate = gate
+        self._announced: dict[str, str] = {}
+        self._deferred: dict[str, str] = {}
+        self._flush_task: asyncio.Task | None = None
+        self.deferred_total = 0
+        self.suppressed_total = 0
+
+    async def announce(self, user_id: str, status: str):
+        if self._flush_task is None and not self.gate.storming():
+            if self._announced.get(user_id) == status:
+                # 互踢重连等场景, 状态未变化
+                self.suppressed_total += 1
+                return
+            await self._broadcast(user_id, status)
+            return
+        self._deferred[user_id] = status
+        self.deferred_total += 1
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_when_settled())
+
+    async def _flush_when_settled(self):
+        try:
+            # 等到窗口内的握手数回落到阈值以下, 再静默 settle 秒
+            while True:
+                await asyncio.sleep(settings.WS_PRESENCE_SETTLE)
+                if not self.gate.storming():
+                    break
+            pending, self._deferred = self._deferred, {}
+            for user_id, status in pending.items():
+                if self._announced.get(user_id) == status:
+                    self.suppressed_total += 1
+                    continue
+                await self._broadcast(user_id, status)
+        except Exception as e:
+            print(f"[WS] Presence flush error: {e}")
+        finally:
+            self._flush_task = None
+            # 刷出期间又有新的延迟事件
+            if self._deferred:
+                self._flush_task = asyncio.create_task(self._flush_when_settled())
+
+    async def _broadcast(self, user_id: str, status: str):
+        self._announced[user_id] = status
+        await self.manager.broadcast(
+            "status.change",
+            {"userId": user_id, "status": status},
+            exclude=user_id if status == "online" else None,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._deferred),
+            "deferredTotal": self.deferred_total,
+            "suppressedTotal": self.suppressed_total,
+        }
 
 
 class ConnectionManager:
     """
     单例连接管理器
-    - 维护 Dict[user_id, WebSocket] — 单设备在线 (§ 4.6)
-    - 心跳: 接收 ping 回复 pong (§ 4.4)
+    - 维护 Dict[user_id, Connection] — 单设备在线 (§ 4.6)
+    - 心跳: 接收 ping 回复 pong (§ 4.4), 任意入站帧都会刷新 last_seen
     - 互踢: 新连接建立时，旧连接收到 sys.kick 后关闭
+    - 超时清扫: 时间轮统一检查, 关闭超过 WS_HEARTBEAT_TIMEOUT 未收到任何帧的僵尸连接
+    - 帧合并: 连接以批量模式建立时, 由 Connection 按 tick 合并事件
+    - 编码: 每个连接独立选择 json / msgpack, 广播时每种格式只编码一次
+    - 重连风暴: 握手准入 (gate) + 上下线广播延迟合并 (presence)
     """
 
     def __init__(self):
-        # 单设备: Dict[user_id, WebSocket]
-        self.active_connections: dict[str, WebSocket] = {}
+        # 单设备: Dict[user_id, Connection]
+        self.active_connections: dict[str, Connection] = {}
+        # 最近一次收到客户端帧的时间 (monotonic)
+        self.last_seen: dict[str, float] = {}
+        self.heartbeat_timeout = settings.WS_HEARTBEAT_TIMEOUT
+        self.wheel = TimerWheel(settings.WS_REAPER_TICK, self.heartbeat_timeout)
+        # 清扫统计
+        self.reaped_total = 0
+        self.last_reaped = 0
+        # 重连风暴保护
+        self.gate = HandshakeGate()
+        self.presence = PresenceAnnouncer(self, self.gate)
 
-    async def connect(self, user_id: str, websocket: WebSocket):
-        """建立连接 — 若已有旧连接则互踢"""
+    async def connect(
+        self,
+        user_id: str,
+        websocket: WebSocket,
+        batch: bool = False,
+        fmt: str = "json",
+    ) -> Connection:
+        """建立连接 — 若已有旧连接则互踢, 返回该连接的写端"""
         await websocket.accept()
 
         # 互踢: 旧连接存在则发送 sys.kick 并关闭
-        if user_id in self.active_connections:
-            old_ws = self.active_connections[user_id]
+        old = self.active_connections.get(user_id)
+        if old is not None:
             try:
-                await old_ws.send_json(self._build_event(
+                await old.send(self._build_event(
                     event_type="sys.kick",
                     data={"reason": "logged_in_elsewhere"},
                 ))
-                await old_ws.close(code=1000)
+                await old.close(code=1000)
             except Exception:
-                pass  # 旧连接可能已断开
+                old.discard()  # 旧连接可能已断开
 
-        self.active_connections[user_id] = websocket
+        conn = Connection(user_id, websocket, batch=batch, fmt=fmt, on_broken=self._drop)
+        self.active_connections[user_id] = conn
+        now = time.monotonic()
+        self.last_seen[user_id] = now
+        self.wheel.schedule(user_id, now + self.heartbeat_timeout)
+        return conn
 
-    def disconnect(self, user_id: str):
-        """断开连接"""
-        self.active_connections.pop(user_id, None)
+    def disconnect(self, user_id: str, conn: Connection | None = None):
+        """
+        断开连接
+        传入 conn 时仅当它仍是该用户的当前连接才移除, 避免旧连接的收尾逻辑误删互踢后的新连接
+        """
+        current = self.active_connections.get(user_id)
+        if current is None or (conn is not None and current is not conn):
+            return
+        current.discard()
+        del self.active_connections[user_id]
+        self.last_seen.pop(user_id, None)
+        self.wheel.cancel(user_id)
+
+    def _drop(self, conn: Connection):
+        """Connection 后台刷出失败时的回调"""
+        self.disconnect(conn.user_id, conn)
+
+    def touch(self, user_id: str):
+        """刷新最近活跃时间 — 只写字典, 不动时间轮 (到期时再按 last_seen 复核)"""
+        if user_id in self.active_connections:
+            self.last_seen[user_id] = time.monotonic()
 
     async def send_personal(self, user_id: str, event_type: str, data: Any):
         """向指定用户发送消息"""
-        ws = self.active_connections.get(user_id)
-        if ws:
-            try:
-                await ws.send_json(self._build_event(event_type, data))
-            except Exception:
-                self.disconnect(user_id)
+        conn = self.active_connections.get(user_id)
+        if conn:
+            with span("ws.send_personal", type=event_type):
+                try:
+                    await conn.send(self._build_event(event_type, data))
+                except Exception:
+                    self.disconnect(user_id, conn)
 
     async def broadcast(self, event_type: str, data: Any, exclude: str | None = None):
-        """广播消息"""
+        """广播消息 — 事件体只构建一次, 每种编码格式只序列化一次"""
+        event = self._build_event(event_type, data)
+        frames: dict[str, str | bytes] = {}
         disconnected = []
-        for uid, ws in self.active_connections.items():
-            if uid == exclude:
-                continue
-            try:
-                await ws.send_json(self._build_event(event_type, data))
-            except Exception:
-                disconnected.append(uid)
-        for uid in disconnected:
-            self.disconnect(uid)
-
-    async def handle_heartbeat(self, websocket: WebSocket) -> bool:
-        """处理心跳: 收到 ping 回复 pong, 返回 True 继续, False 断开"""
-        try:
-            raw = await websocket.receive_text()
-            msg = json.loads(raw)
-
-            if msg.get("type") == "ping":
-                await websocket.send_json(self._build_event("pong", {}))
-                return True
-
-            return True
-        except Exception:
-            return False
+        with span("ws.broadcast", type=event_type, recipients=len(self.active_connections)):
+            for uid, conn in list(self.active_connections.items()):
+                if uid == exclude:
+                    continue
+                try:
+                    await conn.send(event, frames)
+                except Exception:
+                    disconnected.append((uid, conn))
+        for uid, conn in disconnected:
+            self.disconnect(uid, conn)
 
     def is_online(self, user_id: str) -> bool:
         return user_id in self.active_connections
@@ -85,19 +425,75 @@ class ConnectionManager:
     def online_users(self) -> list[str]:
         return list(self.active_connections.keys())
 
+    async def reap_idle(self) -> int:
+        """
+        推进时间轮并关闭超时连接, 返回本轮清扫数量
+        到期但期间有过入站帧的连接按 last_seen 重新登记, 不关闭
+        """
+        now = time.monotonic()
+        stale: list[Connection] = []
+        for uid in self.wheel.advance(now):
+            conn = self.active_connections.get(uid)
+            if conn is None:
+                continue
+            deadline = self.last_seen.get(uid, 0.0) + self.heartbeat_timeout
+            if deadline > now:
+                self.wheel.schedule(uid, deadline)
+                continue
+            stale.append(conn)
+
+        for conn in stale:
+            self.disconnect(conn.user_id, conn)
+        if stale:
+            # 对端可能已失联, 关闭握手设置上限, 避免拖住清扫任务
+            await asyncio.gather(
+                *(asyncio.wait_for(conn.websocket.close(code=1001), timeout=5) for conn in stale),
+                return_exceptions=True,
+            )
+
+        self.last_reaped = len(stale)
+        self.reaped_total += len(stale)
+        return len(stale)
+
+    async def run_reaper(self):
+        """后台清扫任务 — 由 main.lifespan 启动, 全进程唯一"""
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            try:
+                await self.reap_idle()
+            except Exception as e:
+                print(f"[WS] Reaper error: {e}")
+
+    def stats(self) -> dict:
+        """连接与清扫统计"""
+        return {
+            "connections": len(self.active_connections),
+            "batchConnections": sum(1 for c in self.active_connections.values() if c.batch),
+            "msgpackConnections": sum(1 for c in self.active_connections.values() if c.fmt == "msgpack"),
+            "scheduled": len(self.wheel),
+            "heartbeatTimeout": self.heartbeat_timeout,
+            "reapedTotal": self.reaped_total,
+            "lastReaped": self.last_reaped,
+            "handshakesWaiting": self.gate.waiting,
+            "handshakesAdmitted": self.gate.admitted_total,
+            "handshakesRejected": self.gate.rejected_total,
+            "storming": self.gate.storming(),
+            "presence": self.presence.stats(),
+        }
+
     async def kick_user(self, user_id: str, reason: str = "account_disabled"):
         """强制踢掉指定用户的 WebSocket 连接"""
-        ws = self.active_connections.get(user_id)
-        if ws:
+        conn = self.active_connections.get(user_id)
+        if conn:
             try:
-                await ws.send_json(self._build_event(
+                await conn.send(self._build_event(
                     event_type="sys.kick",
                     data={"reason": reason},
                 ))
-                await ws.close(code=1000)
+                await conn.close(code=1000)
             except Exception:
                 pass
-            self.disconnect(user_id)
+            self.disconnect(user_id, conn)
 
     @staticmethod
     def _build_event(event_type: str, data: Any, event_id: str | None = None) -> dict:
@@ -117,3 +513,37 @@ class ConnectionManager:
 
 # 全局单例
 manager = ConnectionManager()
+
+# ---------- 指标 (导出时取值) ----------
+WS_MESSAGES_SENT = registry.counter(
+    "netsale_ws_messages_sent_total", "WebSocket 下行事件数", ("type",)
+)
+WS_MESSAGES_RECEIVED = registry.counter(
+    "netsale_ws_messages_received_total", "WebSocket 上行消息数 (ws_connect 处理)", ("type",)
+)
+registry.gauge(
+    "netsale_ws_connections", "活跃 WebSocket 连接", ("format", "batch")
+).set_function(lambda: _connection_breakdown())
+registry.counter(
+    "netsale_ws_reaped_total", "心跳超时清扫的连接数"
+).set_function(lambda: manager.reaped_total)
+registry.counter(
+    "netsale_ws_handshakes_total", "WebSocket 握手准入结果", ("result",)
+).set_function(lambda: {
+    ("admitted",): manager.gate.admitted_total,
+    ("rejected",): manager.gate.rejected_total,
+})
+registry.gauge(
+    "netsale_ws_handshakes_waiting", "排队中的 WebSocket 握手"
+).set_function(lambda: manager.gate.waiting)
+registry.gauge(
+    "netsale_ws_storming", "重连风暴模式 (1 = 是)"
+).set_function(lambda: int(manager.gate.storming()))
+
+
+def _connection_breakdown() -> dict[tuple, float]:
+    counts: dict[tuple, float] = {}
+    for conn in manager.active_connections.values():
+        key = (conn.fmt, "true" if conn.batch else "false")
+        counts[key] = counts.get(key, 0) + 1
+    return counts or {("json", "false"): 0}
@@ -0,0 +1,94 @@
+"""
+登录吞吐基准 — bcrypt 内联执行 vs password_hasher 线程池
+运行: cd backend && python -m benchmarks.login_throughput [--logins 64] [--concurrency 32]
+
+- 模拟早高峰登录: 并发 N 个协程各做一次密码校验
+- 同时运行一个 10ms 周期的探针协程, 记录事件循环延迟 (实际唤醒时间 - 期望唤醒时间)
+- 输出: 总耗时 / 每秒登录数 / 探针延迟 p50 p99 max, 以及线程池指标
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.security import (
+    PasswordHasher,
+    PasswordHasherBusyError,
+    hash_password,
+    verify_password,
+)
+from app.core.config import get_settings
+
+settings = get_settings()
+
+PROBE_INTERVAL = 0.01
+
+
+async def probe(lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+
+async def run_mode(mode: str, hashed: str, logins: int, concurrency: int) -> dict:
+    hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+    sem = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with sem:
+            if mode == "inline":
+                verify_password("123456", hashed)
+                await asyncio.sleep(0)
+                return
+            try:
+                await hasher.verify("123456", hashed)
+            except PasswordHasherBusyError:
+                rejected += 1
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe_task
+    hasher.shutdown()
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "rate": logins / elapsed,
+        "p50": statistics.median(lags) if lags else 0,
+        "p99": lags[int(len(lags) * 0.99) - 1] if lags else 0,
+        "max": lags[-1] if lags else 0,
+        "rejected": rejected,
+        "stats": hasher.stats() if mode == "pool" else None,
+    }
+
+
+def run(logins: int, concurrency: int):
+    hashed = hash_password("123456")
+    print(f"logins={logins}  concurrency={concurrency}  "
+          f"workers={settings.PASSWORD_HASH_WORKERS}  rounds={settings.PASSWORD_BCRYPT_ROUNDS}")
+    print(f"{'mode':<8}{'total s':>10}{'login/s':>10}{'lag p50':>10}{'lag p99':>10}"
+          f"{'lag max':>10}{'rejected':>10}")
+    for mode in ("inline", "pool"):
+        r = asyncio.run(run_mode(mode, hashed, logins, concurrency))
+        print(f"{mode:<8}{r['elapsed']:>10.2f}{r['rate']:>10.1f}{r['p50']:>9.1f}ms"
+              f"{r['p99']:>9.1f}ms{r['max']:>9.1f}ms{r['rejected']:>10}")
+        if r["stats"]:
+            print(f"        pool stats: {r['stats']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="登录吞吐 / 事件循环延迟基准")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    run(args.logins, args.concurrency)
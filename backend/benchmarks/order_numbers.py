@@ -0,0 +1,148 @@
+"""
+订单号唯一性压测 — 旧方案 (秒级时间戳 + 4 位随机十六进制) vs 序列号段分配
+运行: cd backend && python -m benchmarks.order_numbers [--rate 1000] [--seconds 60] [--workers 8] [--database]
+
+- 模拟下单高峰: 每秒 rate 笔订单, 持续 seconds 秒, 均匀分布到 workers 个进程
+- 旧方案: 同一秒内的订单只靠 4 位随机数区分 (65536 种), 统计与已发放号码重复的次数
+- 新方案: 每个 worker 一个 OrderNumberAllocator, 共享一个内存模拟的步长序列; 统计重复次数与序列访问次数
+- --database: 改用真实 order_no_seq (需 DATABASE_URL 可连接), 并发领取并报告每秒分配数
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.models.order import ORDER_NO_BLOCK_SIZE, order_no_seq
+from app.services.order_numbers import OrderNumberAllocator, format_order_no
+
+
+def legacy_order_no(now: datetime) -> str:
+    """原 _generate_order_no 的生成规则"""
+    return f"NS{now.strftime('%Y%m%d%H%M%S')}{random.getrandbits(16):04X}"
+
+
+def run_legacy(rate: int, seconds: int) -> dict:
+    start = datetime(2024, 12, 31, 9, 0, 0)
+    issued: set[str] = set()
+    collisions = 0
+    seconds_hit = 0
+    for s in range(seconds):
+        now = start + timedelta(seconds=s)
+        hit = False
+        for _ in range(rate):
+            no = legacy_order_no(now)
+            if no in issued:
+                collisions += 1
+                hit = True
+            issued.add(no)
+        seconds_hit += hit
+    return {"orders": rate * seconds, "collisions": collisions, "seconds_hit": seconds_hit}
+
+
+class FakeSequence:
+    """与 order_no_seq 行为一致: 每次 nextval 前进 increment, 并发安全"""
+
+    def __init__(self, increment: int):
+        self.increment = increment
+        self.value = 1 - increment
+        self.calls = 0
+
+    async def nextval(self) -> int:
+        await asyncio.sleep(0)  # 模拟一次往返, 让其他 worker 有机会交错
+        self.value += self.increment
+        self.calls += 1
+        return self.value
+
+
+async def run_allocator(rate: int, seconds: int, workers: int) -> dict:
+    seq = FakeSequence(ORDER_NO_BLOCK_SIZE)
+    allocators = [OrderNumberAllocator() for _ in range(workers)]
+    issued: set[str] = set()
+    collisions = 0
+    non_monotonic = 0
+    last = [0] * workers
+
+    async def create(w: int):
+        nonlocal collisions, non_monotonic
+        serial = await allocators[w].next_serial(seq.nextval)
+        if serial <= last[w]:
+            non_monotonic += 1
+        last[w] = serial
+        no = format_order_no(serial)
+        if no in issued:
+            collisions += 1
+        issued.add(no)
+
+    start = time.perf_counter()
+    for _ in range(seconds):
+        # 每秒 rate 笔并发到达, 随机落到各 worker
+        await asyncio.gather(*(create(random.randrange(workers)) for _ in range(rate)))
+    elapsed = time.perf_counter() - start
+    return {
+        "orders": rate * seconds,
+        "collisions": collisions,
+        "non_monotonic": non_monotonic,
+        "sequence_calls": seq.calls,
+        "elapsed": elapsed,
+    }
+
+
+async def run_database(rate: int, seconds: int, workers: int) -> dict:
+    from app.db.session import AsyncSessionLocal, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: order_no_seq.create(c, checkfirst=True))
+
+    allocators = [OrderNumberAllocator() for _ in range(workers)]
+    issued: set[str] = set()
+    collisions = 0
+
+    async def worker(w: int, count: int):
+        nonlocal collisions
+        async with AsyncSessionLocal() as db:
+            for _ in range(count):
+                no = await allocators[w].next(db)
+                if no in issued:
+                    collisions += 1
+                issued.add(no)
+            await db.commit()
+
+    total = rate * seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w, total // workers) for w in range(workers)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    orders = total // workers * workers
+    return {
+        "orders": orders,
+        "collisions": collisions,
+        "sequence_calls": sum(a.blocks_fetched for a in allocators),
+        "elapsed": elapsed,
+        "per_second": orders / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="订单号唯一性压测")
+    parser.add_argument("--rate", type=int, default=1000, help="每秒订单数")
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--database", action="store_true", help="使用真实 order_no_seq")
+    args = parser.parse_args()
+
+    print(f"rate={args.rate}/s  seconds={args.seconds}  workers={args.workers}  "
+          f"block={ORDER_NO_BLOCK_SIZE}")
+    legacy = run_legacy(args.rate, args.seconds)
+    print(f"legacy     orders={legacy['orders']:>8}  collisions={legacy['collisions']:>6}  "
+          f"seconds with collision={legacy['seconds_hit']}/{args.seconds}")
+
+    alloc = asyncio.run(run_allocator(args.rate, args.seconds, args.workers))
+    print(f"allocator  orders={alloc['orders']:>8}  collisions={alloc['collisions']:>6}  "
+          f"non-monotonic={alloc['non_monotonic']}  nextval calls={alloc['sequence_calls']}  "
+          f"({alloc['elapsed']:.2f}s)")
+
+    if args.database:
+        db = asyncio.run(run_database(args.rate, args.seconds, args.workers))
+        print(f"database   orders={db['orders']:>8}  collisions={db['collisions']:>6}  "
+              f"nextval calls={db['sequence_calls']}  {db['per_second']:.0f} orders/s")
@@ -0,0 +1,128 @@
+"""
+WebSocket 帧编码基准 — JSON 文本 vs MessagePack 二进制, 各自有无 permessage-deflate
+运行: cd backend && python -m benchmarks.ws_encoding [--rounds 2000]
+
+- 负载: 大屏 V1 / V2 / 排行榜推送, IM 转发消息, pong
+- 压缩: 以 zlib raw deflate + 上下文接管模拟 permessage-deflate (与 websockets 默认参数一致),
+        小于 WS_DEFLATE_MIN_SIZE 的帧不压缩
+- 输出: 每种负载的平均帧字节数与单帧编码耗时 (μs)
+"""
+import argparse
+import asyncio
+import json
+import time
+import zlib
+
+import msgpack
+
+from app.core.config import get_settings
+from app.services.screen_service import screen_service
+from app.services.ws_manager import ConnectionManager, encode_frame
+
+settings = get_settings()
+
+IM_PAYLOAD = {
+    "id": "6f1c2d9e-8a4b-4c3d-9e2f-1a2b3c4d5e6f",
+    "conversationId": "0b8e7c6d-5a4f-4e3d-8c2b-1a0f9e8d7c6b",
+    "senderId": "9a8b7c6d-5e4f-4a3b-2c1d-0e9f8a7b6c5d",
+    "senderName": "张三",
+    "senderExt": "NS0012",
+    "senderDept": "销售一部",
+    "senderAvatar": "https://cdn.example.com/avatar/9a8b7c6d.png",
+    "direction": "received",
+    "type": "text",
+    "content": "王总, 这个客户的订单已经提交审核了, 麻烦尽快处理一下",
+    "time": "10:32",
+    "fileName": None,
+    "fileSize": None,
+}
+
+
+class DeflateStream:
+    """模拟单个连接的 permessage-deflate 发送端 (上下文接管, 同步刷新去掉 4 字节尾)"""
+
+    def __init__(self, min_size: int):
+        self.min_size = min_size
+        self.encoder = zlib.compressobj(
+            level=settings.WS_DEFLATE_LEVEL, wbits=-15, memLevel=5
+        )
+
+    def encode(self, data: bytes) -> bytes:
+        if len(data) < self.min_size:
+            return data
+        out = self.encoder.compress(data) + self.encoder.flush(zlib.Z_SYNC_FLUSH)
+        return out[:-4]
+
+
+async def build_events() -> dict[str, dict]:
+    build = ConnectionManager._build_event
+    return {
+        "screen.v1": build("screen.v1.update", await screen_service.get_v1_data()),
+        "screen.v2": build("screen.v2.update", await screen_service.get_v2_data()),
+        "ranking": build("screen.ranking.update", await screen_service.get_ranking_data()),
+        "im.message": build("im.message", IM_PAYLOAD),
+        "pong": build("pong", {}),
+    }
+
+
+def run(rounds: int):
+    events = asyncio.run(build_events())
+    modes = [
+        ("json", False),
+        ("json", True),
+        ("msgpack", False),
+        ("msgpack", True),
+    ]
+    header = f"{'payload':<12}" + "".join(
+        f"{fmt + ('+deflate' if deflate else ''):>26}" for fmt, deflate in modes
+    )
+    print(f"rounds={rounds}  deflate_min_size={settings.WS_DEFLATE_MIN_SIZE}B  "
+          f"level={settings.WS_DEFLATE_LEVEL}")
+    print("cell = avg bytes on wire (cold / steady) · avg μs per frame")
+    print("  cold   — 新连接的第一帧, 压缩字典为空")
+    print("  steady — 同一连接连续推送 (仅 timestamp 变化), 上下文接管生效")
+    print(header)
+    print("-" * len(header))
+
+    for name, event in events.items():
+        cells = []
+        for fmt, deflate in modes:
+            stream = DeflateStream(settings.WS_DEFLATE_MIN_SIZE) if deflate else None
+            cold = 0
+            total_bytes = 0
+            start = time.perf_counter()
+            for i in range(rounds):
+                frame = encode_frame({**event, "timestamp": event["timestamp"] + i}, fmt)
+                data = frame.encode() if isinstance(frame, str) else frame
+                if stream is not None:
+                    data = stream.encode(data)
+                if i == 0:
+                    cold = len(data)
+                total_bytes += len(data)
+            elapsed = time.perf_counter() - start
+            cells.append(
+                f"{cold:>4}/{total_bytes / rounds:>6.1f}B · {elapsed / rounds * 1e6:>5.1f}μs"
+            )
+        print(f"{name:<12}" + "".join(f"{c:>26}" for c in cells))
+
+    # 解码侧 (客户端 / 入站) 参考
+    print()
+    for name in ("screen.v1", "im.message"):
+        text = encode_frame(events[name], "json")
+        packed = encode_frame(events[name], "msgpack")
+        start = time.perf_counter()
+        for _ in range(rounds):
+            json.loads(text)
+        t_json = (time.perf_counter() - start) / rounds * 1e6
+        start = time.perf_counter()
+        for _ in range(rounds):
+            msgpack.unpackb(packed, raw=False)
+        t_mp = (time.perf_counter() - start) / rounds * 1e6
+        print(f"decode {name:<12} json {t_json:6.1f}μs   msgpack {t_mp:6.1f}μs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket 帧编码基准")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.rounds)
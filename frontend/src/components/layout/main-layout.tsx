@@ -37,6 +37,7 @@ import AccountSettingsModal from '../user/account-settings-modal';
 import FloatingChat from './floating-chat';
 import NotificationReminder from './notification-reminder';
 import request from '../../api/request';
+import { useWebSocket } from '../../hooks/use-websocket';
 
 const { Header, Sider, Content } = Layout;
 const { Text } = Typography;
@@ -99,6 +100,24 @@ const MainLayout: React.FC = () => {
         }
     }, [isLoggedIn, user]);
 
+    // 批量审核 / 发货 / 签收后服务端推送角标增量, 无需等待下次轮询
+    const { on: wsOn, off: wsOff } = useWebSocket();
+    useEffect(() => {
+        const handleBadgeDelta = (delta: Record<string, number>) => {
+            setBadgeCounts(prev => {
+                const next = { ...prev };
+                Object.entries(delta).forEach(([key, change]) => {
+                    if (key in next) {
+                        next[key as keyof typeof next] = Math.max(0, next[key as keyof typeof next] + change);
+                    }
+                });
+                return next;
+            });
+        };
+        wsOn('badge.delta', handleBadgeDelta);
+        return () => wsOff('badge.delta', handleBadgeDelta);
+    }, [wsOn, wsOff]);
+
     // 渲染带角标的菜单及
     const renderLabelWithBadge = (label: string, count: number) => {
         return (
@@ -65,6 +65,25 @@ function emitToListeners(type: string, data: any) {
     }
 }
 
+function dispatchEvent(msg: WSEvent) {
+    const { type, data } = msg;
+
+    // pong 心跳回复不需要分发
+    if (type === 'pong') return;
+
+    // 互踢通知
+    if (type === 'sys.kick') {
+        console.warn('[WS] 被踢下线:', data?.reason);
+        stopHeartbeat();
+        globalWs?.close();
+        emitToListeners('sys.kick', data);
+        return;
+    }
+
+    // 分发到所有监听器
+    emitToListeners(type, data);
+}
+
 function connectWebSocket(token: string) {
     if (isConnecting || (globalWs && globalWs.readyState === WebSocket.OPEN)) {
         return;
@@ -93,22 +112,13 @@ function connectWebSocket(token: string) {
     globalWs.onmessage = (event) => {
         try {
             const msg: WSEvent = JSON.parse(event.data);
-            const { type, data } = msg;
-
-            // pong 心跳回复不需要分发
-            if (type === 'pong') return;
 
-            // 互踢通知
-            if (type === 'sys.kick') {
-                console.warn('[WS] 被踢下线:', data?.reason);
-                stopHeartbeat();
-                globalWs?.close();
-                emitToListeners('sys.kick', data);
+            // 批量帧 (?batch=true): 按数组顺序逐个分发
+            if (msg.type === 'batch') {
+                (msg.data as WSEvent[]).forEach(dispatchEvent);
                 return;
             }
-
-            // 分发到所有监听器
-            emitToListeners(type, data);
+            dispatchEvent(msg);
         } catch (e) {
             console.error('[WS] 消息解析失败:', e);
         }
@@ -120,6 +130,13 @@ function connectWebSocket(token: string) {
         stopHeartbeat();
         emitToListeners('ws.disconnected', { code: event.code });
 
+        // 服务端握手限流 (1013): 按 reason 中的建议延迟重连
+        if (event.code === 1013) {
+            const match = /retry_after=(\d+)/.exec(event.reason);
+            scheduleReconnect(token, match ? Number(match[1]) : undefined);
+            return;
+        }
+
         // 非正常关闭/非互踢 → 自动重连
         if (event.code !== 1000) {
             scheduleReconnect(token);
@@ -132,9 +149,9 @@ function connectWebSocket(token: string) {
     };
 }
 
-function scheduleReconnect(token: string) {
+function scheduleReconnect(token: string, suggestedDelay?: number) {
     if (reconnectTimer) return;
-    const delay = Math.min(1000 * Math.pow(2, reconnectAttempt), MAX_RECONNECT_DELAY);
+    const delay = suggestedDelay ?? Math.min(1000 * Math.pow(2, reconnectAttempt), MAX_RECONNECT_DELAY);
     reconnectAttempt++;
     console.log(`[WS] ${delay / 1000}s 后重连 (第 ${reconnectAttempt} 次)`);
     reconnectTimer = setTimeout(() => {
@@ -25,6 +25,7 @@ const { Title, Text } = Typography;
 
 // 退货商品明细
 interface ReturnProduct {
+    productId?: string;
     productName: string;
     spec: string;
     quantity: number;
@@ -66,33 +67,53 @@ const mockData: ReturnOrderItem[] = [
 ];
 */
 
-// 仓库列表（与仓库设置保持一致）
-const warehouses = [
-    { id: 'WH001', name: '主仓', isDefault: true },
-    { id: 'WH002', name: '分仓1', isDefault: false },
-    { id: 'WH003', name: '分仓2', isDefault: false },
-    { id: 'WH004', name: '分仓3', isDefault: false },
-];
+interface WarehouseOption {
+    id: string;
+    name: string;
+    isDefault: boolean;
+}
 
 const ReturnStock: React.FC = () => {
     const [modalVisible, setModalVisible] = useState(false);
     const [selectedItem, setSelectedItem] = useState<ReturnOrderItem | null>(null);
     const [form] = Form.useForm();
     const [data, setData] = useState<ReturnOrderItem[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loading, setLoading] = useState(false);
+    const [warehouses, setWarehouses] = useState<WarehouseOption[]>([]);
 
     useEffect(() => {
         fetchData();
+        fetchWarehouses();
     }, []);
 
-    const fetchData = async () => {
+    // 键集分页: cursor 为空时重新加载第一页, 否则追加下一页
+    const fetchData = async (cursor?: string) => {
+        setLoading(true);
         try {
-            const res: any = await request.get('/warehouses/returns');
-            setData(Array.isArray(res) ? res : res?.data?.items || res?.data || []);
+            const res: any = await request.get('/warehouses/returns', { params: cursor ? { cursor } : {} });
+            const page = res?.items ? res : res?.data || {};
+            const items: ReturnOrderItem[] = page.items || [];
+            setData(prev => (cursor ? [...prev, ...items] : items));
+            setNextCursor(page.nextCursor || null);
         } catch (error) {
             console.error('Fetch returns failed', error);
+        } finally {
+            setLoading(false);
+        }
+    };
+
+    const fetchWarehouses = async () => {
+        try {
+            const res: any = await request.get('/warehouses');
+            setWarehouses(Array.isArray(res) ? res : res?.data || []);
+        } catch (error) {
+            console.error('Fetch warehouses failed', error);
         }
     };
 
+    const defaultWarehouseId = (warehouses.find(w => w.isDefault) || warehouses[0])?.id;
+
     // 打开入库弹窗
     const handleOpenModal = (item: ReturnOrderItem) => {
         setSelectedItem(item);
@@ -102,10 +123,27 @@ const ReturnStock: React.FC = () => {
 
     // 确认入库
     const handleConfirm = () => {
-        form.validateFields().then((values) => {
-            console.log('退货入库:', { ...selectedItem, ...values });
-            message.success('退货入库成功！');
-            setModalVisible(false);
+        form.validateFields().then(async (values) => {
+            if (!selectedItem) return;
+            try {
+                await request.post('/warehouses/returns/receive', {
+                    warehouseId: values.warehouseId,
+                    remark: values.remark,
+                    returns: [{
+                        returnId: selectedItem.id,
+                        products: selectedItem.products.map((p, idx) => ({
+                            productId: p.productId,
+                            quantity: values.products?.[idx]?.stockInQty ?? p.quantity,
+                            condition: values.products?.[idx]?.condition ?? 'good',
+                        })),
+                    }],
+                });
+                message.success('退货入库成功！');
+                setModalVisible(false);
+                fetchData();
+            } catch (error) {
+                console.error('Receive return failed', error);
+            }
         });
     };
 
@@ -225,6 +263,7 @@ const ReturnStock: React.FC = () => {
                     columns={columns}
                     dataSource={data}
                     rowKey="id"
+                    loading={loading}
                     pagination={{
                         total: data.length,
                         pageSize: 10,
@@ -232,6 +271,11 @@ const ReturnStock: React.FC = () => {
                     }}
                     scroll={{ x: 1300 }}
                 />
+                {nextCursor && (
+                    <div style={{ textAlign: 'center', marginTop: 16 }}>
+                        <Button loading={loading} onClick={() => fetchData(nextCursor)}>加载更多</Button>
+                    </div>
+                )}
             </Card>
 
             {/* 入库确认弹窗 */}
@@ -312,7 +356,7 @@ const ReturnStock: React.FC = () => {
                                     label="入库仓库"
                                     name="warehouseId"
                                     rules={[{ required: true, message: '请选择入库仓库' }]}
-                                    initialValue="WH001"
+                                    initialValue={defaultWarehouseId}
                                     style={{ marginTop: 16 }}
                                 >
                                     <Select